@@ -3,35 +3,41 @@ Spout: Synergistic Plugins Optimizing Usability of Transformers
 
 A modular framework for text processing and AI interaction.
 """
-# Import commonly used classes for easier access
-try:
-    from .core.converse.spout_converse import SpoutConverse
-    from .core.evaluate.spout_evaluate import SpoutEvaluate
-    from .core.generate.spout_generate import SpoutGenerate
-    from .core.imagine.spout_imagine import SpoutImagine
-    from .core.iterate.spout_iterate import SpoutIterate
-    from .core.parse.spout_parse import SpoutParse
-    from .shared.api_logging import APIMetricsLogger
-    from .shared.base_handler import BaseHandler
-    from .shared.connector import ConnectorEngine, ConnectorResult, ConnectorService
-    from .shared.plugin_options import PluginDefinition, PluginOption
-    from .shared.spout_base_functions import SpoutBaseFunctionHandler
+from spout.shared.lazy import lazy_imports
 
-    __all__ = [
-        'SpoutEvaluate',
-        'SpoutGenerate',
-        'SpoutIterate',
-        'SpoutImagine',
-        'SpoutParse',
-        'SpoutConverse',
-        'BaseHandler',
-        'SpoutBaseFunctionHandler',
-        'PluginDefinition',
-        'PluginOption',
-        'ConnectorEngine',
-        'ConnectorService',
-        'ConnectorResult',
-        'APIMetricsLogger'
-    ]
-except ImportError as e:
-    print(f"Warning: Not all modules could be imported: {e}")
\ No newline at end of file
+# Commonly used classes, imported on first access so `import spout` stays cheap
+_LAZY_IMPORTS = {
+    'SpoutConverse': '.core.converse.spout_converse',
+    'SpoutEvaluate': '.core.evaluate.spout_evaluate',
+    'SpoutGenerate': '.core.generate.spout_generate',
+    'SpoutImagine': '.core.imagine.spout_imagine',
+    'SpoutIterate': '.core.iterate.spout_iterate',
+    'SpoutParse': '.core.parse.spout_parse',
+    'APIMetricsLogger': '.shared.api_logging',
+    'BaseHandler': '.shared.base_handler',
+    'ConnectorEngine': '.shared.connector',
+    'ConnectorResult': '.shared.connector',
+    'ConnectorService': '.shared.connector',
+    'PluginDefinition': '.shared.plugin_options',
+    'PluginOption': '.shared.plugin_options',
+    'SpoutBaseFunctionHandler': '.shared.spout_base_functions',
+}
+
+__all__ = [
+    'SpoutEvaluate',
+    'SpoutGenerate',
+    'SpoutIterate',
+    'SpoutImagine',
+    'SpoutParse',
+    'SpoutConverse',
+    'BaseHandler',
+    'SpoutBaseFunctionHandler',
+    'PluginDefinition',
+    'PluginOption',
+    'ConnectorEngine',
+    'ConnectorService',
+    'ConnectorResult',
+    'APIMetricsLogger'
+]
+
+__getattr__, __dir__ = lazy_imports(__name__, globals(), _LAZY_IMPORTS)
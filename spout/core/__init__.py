@@ -1,14 +1,18 @@
 # spout/core/__init__.py
 
-# Import specific classes or functions from submodules
-from .converse.spout_converse import SpoutConverse
-from .evaluate.spout_evaluate import SpoutEvaluate
-from .generate.spout_generate import SpoutGenerate
-from .imagine.spout_imagine import SpoutImagine
-from .iterate.spout_iterate import SpoutIterate
-from .mutate.spout_mutate import SpoutMutate
-from .parse.spout_parse import SpoutParse
-from .translate.spout_translate import SpoutTranslate
+from spout.shared.lazy import lazy_imports
+
+# Handlers are imported on first access so loading one plugin does not load them all
+_LAZY_IMPORTS = {
+    "SpoutConverse": ".converse.spout_converse",
+    "SpoutEvaluate": ".evaluate.spout_evaluate",
+    "SpoutGenerate": ".generate.spout_generate",
+    "SpoutImagine": ".imagine.spout_imagine",
+    "SpoutIterate": ".iterate.spout_iterate",
+    "SpoutMutate": ".mutate.spout_mutate",
+    "SpoutParse": ".parse.spout_parse",
+    "SpoutTranslate": ".translate.spout_translate",
+}
 
 # Optionally, define what is available for import with *
 __all__ = [
@@ -22,6 +26,8 @@ __all__ = [
     "SpoutImagine"
 ]
 
+__getattr__, __dir__ = lazy_imports(__name__, globals(), _LAZY_IMPORTS)
+
 # You can also include any package-level documentation or metadata
 __version__ = "1.0.0"
 __author__ = "Your Name"
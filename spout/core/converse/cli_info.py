@@ -27,6 +27,18 @@ PLUGIN_DEFINITION = PluginDefinition(
             flags=["--model", "-m"],
             help="AI model to use for the conversation",
             default=None
+        ),
+        PluginOption(
+            name="history_tokens",
+            flags=["--history-tokens"],
+            help="Token budget for the recent history sent with the message (default 1000)",
+            required=False
+        ),
+        PluginOption(
+            name="session",
+            flags=["--session", "-s"],
+            help="Keep the history in the session store under this id instead of a file (see spout sessions)",
+            required=False
         )
     ],
     help_text="""
@@ -42,10 +54,13 @@ PLUGIN_DEFINITION = PluginDefinition(
 
     - Persistent conversation storage
 
-The conversation history can be saved to a file to maintain continuity across sessions. The primer helps establish the AI assistant's role and behavior. Different AI models can be selected based on needed capabilities.
+    - Many concurrent sessions in one SQLite store with --session
+
+The conversation history can be saved to a file to maintain continuity across sessions. Only the most recent whole turns that fit in --history-tokens are sent, read from the end of the file. The primer helps establish the AI assistant's role and behavior. Different AI models can be selected based on needed capabilities.
     """,
     examples=[
         "spout converse --primer 'You are a helpful assistant' --history_file 'chat_history.txt' --recent_message 'Hello'",
-        "spout converse -p 'You are a coding tutor' -f 'python_help.txt' -r 'How do I use lists?' -m gpt-4o"
+        "spout converse -p 'You are a coding tutor' -f 'python_help.txt' -r 'How do I use lists?' -m gpt-4o",
+        "spout converse -p 'You are a support agent' -s customer-4182 -r 'My order has not arrived'"
     ]
 )
\ No newline at end of file
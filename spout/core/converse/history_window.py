@@ -0,0 +1,91 @@
+import os
+import re
+from typing import List, Tuple
+
+from spout.shared.token_counter import count_tokens
+
+# A turn starts with <USER> or <ASSISTANT> at the beginning of a line
+_TURN_PATTERN = re.compile(rb"\n(?=<(?:USER|ASSISTANT)>)")
+_TURN_PREFIXES = (b"<USER>", b"<ASSISTANT>")
+
+BLOCK_SIZE = 64 * 1024
+# No single token spans more bytes than this, so a turn starting further back cannot fit
+MAX_BYTES_PER_TOKEN = 32
+
+
+def _decode(data: bytes) -> str:
+    for encoding in ['utf-8', 'windows-1252']:
+        try:
+            return data.decode(encoding)
+        except UnicodeDecodeError:
+            continue
+    return data.decode('iso-8859-1')
+
+
+def _tail_lines(data: bytes, token_budget: int) -> List[str]:
+    """Whole lines from the end of data under the budget, for histories without turn markers"""
+    lines = []
+    used = 0
+    for line in reversed(_decode(data).splitlines(keepends=True)):
+        tokens = count_tokens(line)
+        if used + tokens > token_budget:
+            break
+        lines.insert(0, line)
+        used += tokens
+    return lines
+
+
+def read_history_window(path: str, token_budget: int, block_size: int = BLOCK_SIZE) -> Tuple[str, bool]:
+    """Return (the most recent whole turns of a history file within token_budget, whether older ones were left out).
+
+    The file is read backwards in blocks and only turns that are candidates for the
+    window are decoded and counted, so the cost depends on the budget rather than the
+    size of the history.
+    """
+    selected: List[str] = []
+    used = 0
+    found_turns = False
+    with open(path, 'rb') as file:
+        position = file.seek(0, os.SEEK_END)
+        pending = b""
+        max_scan = token_budget * MAX_BYTES_PER_TOKEN + block_size
+        while position > 0:
+            read = min(block_size, position)
+            position -= read
+            file.seek(position)
+            data = file.read(read) + pending
+
+            # Everything from the first turn marker on is made of complete turns
+            starts = [match.end() for match in _TURN_PATTERN.finditer(data)]
+            if position == 0 and data.startswith(_TURN_PREFIXES):
+                starts.insert(0, 0)
+            for start, end in reversed(list(zip(starts, starts[1:] + [len(data)]))):
+                turn = _decode(data[start:end])
+                tokens = count_tokens(turn)
+                if used + tokens > token_budget:
+                    return "".join(selected).strip(), True
+                selected.insert(0, turn)
+                used += tokens
+            found_turns = found_turns or bool(starts)
+            pending = data[:starts[0]] if starts else data
+
+            if len(pending) > max_scan:
+                # The next turn back is larger than the whole budget and can never be included
+                break
+
+    if position > 0:
+        if not found_turns:
+            # No turn markers in sight: fall back to whole lines, starting at a line break
+            tail = pending[-max_scan:]
+            return "".join(_tail_lines(tail[tail.find(b"\n") + 1:], token_budget)).strip(), True
+        return "".join(selected).strip(), True
+
+    # The whole file was read; text before the first marker is a history started without one
+    head = _decode(pending)
+    if head.strip():
+        if not found_turns:
+            lines = _tail_lines(pending, token_budget)
+            return "".join(lines).strip(), len(lines) < len(head.splitlines(keepends=True))
+        if used + count_tokens(head) > token_budget:
+            return "".join(selected).strip(), True
+    return (head + "".join(selected)).strip(), False
@@ -0,0 +1,198 @@
+import configparser
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from spout.shared.token_counter import count_tokens
+
+ROLES = ("USER", "ASSISTANT")
+
+_TURN_PATTERN = re.compile(r"^<(USER|ASSISTANT)> ?", re.MULTILINE)
+
+
+def parse_turns(text: str) -> List[Tuple[str, str]]:
+    """Split the history text format into (role, content) turns.
+
+    Text before the first marker is kept with an empty role, so an export writes it back as is.
+    """
+    turns = []
+    matches = list(_TURN_PATTERN.finditer(text))
+    head = text[:matches[0].start()] if matches else text
+    if head.strip():
+        turns.append(("", head.strip()))
+    for match, following in zip(matches, matches[1:] + [None]):
+        content = text[match.end():following.start() if following else len(text)]
+        turns.append((match.group(1), content.strip()))
+    return turns
+
+
+def format_turn(role: str, content: str) -> str:
+    """One turn in the history text format, as converse appends it"""
+    return f"\n<{role}> {content}\n" if role else f"{content}\n"
+
+
+class SessionStore:
+    """SQLite store of conversation turns for many concurrent sessions.
+
+    Appends are a single indexed insert plus an update of the session's running
+    totals, recent turns are read newest-first through the (session, id) index, and
+    WAL mode lets several processes read and write at once.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=10, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS turns (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                session TEXT NOT NULL,
+                role TEXT NOT NULL,
+                content TEXT NOT NULL,
+                tokens INTEGER NOT NULL,
+                created REAL NOT NULL
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS turns_session ON turns (session, id)")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS sessions (
+                session TEXT PRIMARY KEY,
+                turns INTEGER NOT NULL,
+                tokens INTEGER NOT NULL,
+                created REAL NOT NULL,
+                updated REAL NOT NULL
+            )"""
+        )
+
+    def append(self, session: str, turns: List[Tuple[str, str]]) -> None:
+        """Add (role, content) turns to a session in one transaction"""
+        now = time.time()
+        rows = [(session, role, content, count_tokens(content), now) for role, content in turns]
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany(
+                    "INSERT INTO turns (session, role, content, tokens, created) VALUES (?, ?, ?, ?, ?)", rows
+                )
+                self._conn.execute(
+                    """INSERT INTO sessions VALUES (?, ?, ?, ?, ?)
+                       ON CONFLICT(session) DO UPDATE SET
+                           turns = turns + excluded.turns,
+                           tokens = tokens + excluded.tokens,
+                           updated = excluded.updated""",
+                    (session, len(rows), sum(row[3] for row in rows), now, now),
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def recent(self, session: str, limit: Optional[int] = None,
+               token_budget: Optional[int] = None) -> Tuple[List[Tuple[str, str]], bool]:
+        """The newest turns of a session, oldest first, and whether older turns were left out.
+
+        Stops at `limit` turns or at the first turn that would exceed `token_budget`.
+        """
+        turns = []
+        used = 0
+        page = min(limit or 50, 50)
+        last_id = None
+        with self._lock:
+            while True:
+                query = "SELECT id, role, content, tokens FROM turns WHERE session = ?"
+                params = [session]
+                if last_id is not None:
+                    query += " AND id < ?"
+                    params.append(last_id)
+                rows = self._conn.execute(query + " ORDER BY id DESC LIMIT ?", params + [page]).fetchall()
+                for turn_id, role, content, tokens in rows:
+                    if (limit is not None and len(turns) >= limit) or \
+                            (token_budget is not None and used + tokens > token_budget):
+                        turns.reverse()
+                        return turns, True
+                    turns.append((role, content))
+                    used += tokens
+                    last_id = turn_id
+                if len(rows) < page:
+                    break
+        turns.reverse()
+        return turns, False
+
+    def history_text(self, session: str, token_budget: int) -> Tuple[str, bool]:
+        """Recent whole turns within token_budget in the history text format"""
+        turns, truncated = self.recent(session, token_budget=token_budget)
+        return "".join(format_turn(role, content) for role, content in turns).strip(), truncated
+
+    def totals(self, session: str) -> Dict[str, float]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT turns, tokens, created, updated FROM sessions WHERE session = ?", (session,)
+            ).fetchone()
+        if row is None:
+            return {"turns": 0, "tokens": 0, "created": None, "updated": None}
+        return dict(zip(("turns", "tokens", "created", "updated"), row))
+
+    def sessions(self) -> List[Dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT session, turns, tokens, created, updated FROM sessions ORDER BY updated DESC"
+            ).fetchall()
+        return [dict(zip(("session", "turns", "tokens", "created", "updated"), row)) for row in rows]
+
+    def delete(self, session: str) -> None:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._conn.execute("DELETE FROM turns WHERE session = ?", (session,))
+            self._conn.execute("DELETE FROM sessions WHERE session = ?", (session,))
+            self._conn.execute("COMMIT")
+
+    def import_text(self, session: str, text: str) -> int:
+        """Append the turns of a history text file's contents; returns how many were added"""
+        turns = parse_turns(text)
+        if turns:
+            self.append(session, turns)
+        return len(turns)
+
+    def export_text(self, session: str, file) -> int:
+        """Write a session in the history text format, oldest turn first; returns the turn count"""
+        count = 0
+        last_id = 0
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT id, role, content FROM turns WHERE session = ? AND id > ? ORDER BY id LIMIT 500",
+                    (session, last_id),
+                ).fetchall()
+            for last_id, role, content in rows:
+                file.write(format_turn(role, content))
+                count += 1
+            if len(rows) < 500:
+                return count
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+_SESSION_STORE = None
+
+
+def get_session_store() -> SessionStore:
+    """Return the process-wide store at [Converse] SessionStore (default config/converse_sessions.sqlite)"""
+    global _SESSION_STORE
+    if _SESSION_STORE is None:
+        config = configparser.ConfigParser()
+        config_dir = Path(__file__).resolve().parent.parent.parent / 'config'
+        settings_path = config_dir / 'settings.ini'
+        if settings_path.exists():
+            with open(settings_path, "r", encoding="utf-8-sig") as config_file:
+                config.read_file(config_file)
+        _SESSION_STORE = SessionStore(
+            config.get("Converse", "SessionStore", fallback=str(config_dir / 'converse_sessions.sqlite'))
+        )
+    return _SESSION_STORE
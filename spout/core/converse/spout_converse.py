@@ -2,8 +2,13 @@ import asyncio
 import os
 import sys
 
+from spout.core.converse.history_window import read_history_window
+from spout.core.converse.session_store import get_session_store
 from spout.shared.base_handler import BaseHandler
 
+# Default size of the history window sent with each message
+HISTORY_TOKENS = 1000
+
 
 class SpoutConverse(BaseHandler):
     def read_file_with_fallback_encoding(self, file_path: str) -> str:
@@ -16,7 +21,15 @@ class SpoutConverse(BaseHandler):
                 continue
         raise ValueError(f"Unable to read the file {file_path} with any of the attempted encodings.")
 
-    async def converse(self, primer: str, history_file: str, recent_message: str, model: str = None, spoutlet: str = None):
+    def append_history(self, history_file: str, text: str) -> None:
+        with open(history_file, 'a', encoding='utf-8') as file:
+            file.write(text)
+
+    async def converse(self, primer: str, history_file: str, recent_message: str, model: str = None, spoutlet: str = None,
+                       history_tokens: str = None, session: str = None):
+        if session:
+            return await self.converse_session(primer, session, recent_message, model, spoutlet, history_tokens,
+                                               history_file)
         is_cli = 'python.exe' in sys.executable
         if is_cli and not history_file:
             # Get the current script's directory
@@ -25,16 +38,19 @@ class SpoutConverse(BaseHandler):
             history_file = os.path.join(current_dir, "options", "cli.txt")
             # Append the user message to the history file
             try:
-                with open(history_file, 'a', encoding='utf-8') as f:
-                    f.write(f"\n<USER> {recent_message}\n")
+                await self.run_blocking(self.append_history, history_file, f"\n<USER> {recent_message}\n")
             except Exception as e:
                 self.show_error_popup(f"Failed to append message to history file: {str(e)}")
                 sys.exit(1)
         try:
             # Check if history file is empty placeholder
-            history = "" if history_file in [" ", "_"] else self.read_file_with_fallback_encoding(history_file)
-            if len(history) > 3000:
-                history = "History concatenated to stay under token limit; most recent history: " + history[-3000:]
+            history = ""
+            if history_file not in [" ", "_"]:
+                # Only the tail of the file is read, in whole turns, however long the history grows
+                history, truncated = await self.run_blocking(read_history_window, history_file,
+                                                             int(history_tokens or HISTORY_TOKENS))
+                if truncated:
+                    history = "History concatenated to stay under token limit; most recent history: " + history
             result = await self.process_with_plugin(
                 plugin_name="converse",
                 primer=primer,
@@ -47,8 +63,7 @@ class SpoutConverse(BaseHandler):
             if is_cli and history_file not in [" ", "_"]:  # Only save history if not using placeholder
                 # Append the model's response to the history file
                 try:
-                    with open(history_file, 'a', encoding='utf-8') as f:
-                        f.write(f"\n<ASSISTANT> {result}\n")
+                    await self.run_blocking(self.append_history, history_file, f"\n<ASSISTANT> {result}\n")
                 except Exception as e:
                     self.show_error_popup(f"Failed to append response to history file: {str(e)}")
                     sys.exit(1)
@@ -58,6 +73,36 @@ class SpoutConverse(BaseHandler):
             self.show_error_popup(f"An error occurred: {str(e)}")
             sys.exit(1)
 
+    async def converse_session(self, primer: str, session: str, recent_message: str, model: str = None,
+                               spoutlet: str = None, history_tokens: str = None, history_file: str = None):
+        """Converse with history kept in the session store instead of a text file"""
+        try:
+            store = get_session_store()
+            if history_file and history_file not in [" ", "_"] and not (await self.run_blocking(store.totals, session))["turns"]:
+                # First use of a session started as a text file: carry its history over
+                text = await self.run_blocking(self.read_file_with_fallback_encoding, history_file)
+                await self.run_blocking(store.import_text, session, text)
+
+            history, truncated = await self.run_blocking(store.history_text, session,
+                                                         int(history_tokens or HISTORY_TOKENS))
+            if truncated:
+                history = "History concatenated to stay under token limit; most recent history: " + history
+            result = await self.process_with_plugin(
+                plugin_name="converse",
+                primer=primer,
+                history=history,
+                recent_message=recent_message,
+                model=model,
+                spoutlet=spoutlet
+            )
+            # Both turns are stored together, only once the reply has arrived
+            await self.run_blocking(store.append, session, [("USER", recent_message), ("ASSISTANT", str(result))])
+            print(result)
+            return result
+        except Exception as e:
+            self.show_error_popup(f"An error occurred: {str(e)}")
+            sys.exit(1)
+
 if __name__ == "__main__":
     try:
         if len(sys.argv) > 4:
@@ -29,6 +29,26 @@ PLUGIN_DEFINITION = PluginDefinition(
             help="Additional context or explanation for the evaluation",
             required=False,
             default=False
+        ),
+        PluginOption(
+            name="group_size",
+            flags=["--group-size", "-g"],
+            help="Tournament mode: judge the inputs in concurrent groups of at most this many",
+            required=False
+        ),
+        PluginOption(
+            name="workers",
+            flags=["--workers", "-w"],
+            help="Tournament mode: number of groups judged concurrently (default 4)",
+            default="4",
+            required=False
+        ),
+        PluginOption(
+            name="merge",
+            flags=["--merge"],
+            help="Tournament mode: 'bracket' (top half of each group advances) or 'normalize' (one round, scores normalised per group)",
+            default="bracket",
+            required=False
         )
     ],
     help_text="""
@@ -44,6 +64,9 @@ PLUGIN_DEFINITION = PluginDefinition(
 
     - JSON output with rankings, scores, and explanations
 
+    - Tournament mode (--group-size) for hundreds of inputs: groups are judged
+      concurrently and merged, and unchanged groups reuse cached results
+
     Output Format:
 
     - Rank: Numerical ranking from best to worst
@@ -58,6 +81,7 @@ PLUGIN_DEFINITION = PluginDefinition(
         "spout evaluate -i 'beonte@@onetuh@@tesknot@@romeniu@@zovesty' -c 'appropriateness as a first name'",
         "spout evaluate --combined_inputs 'sally sells wood chucks at the sea shore@@How many sea shells could sally sell to a wood chuck.' --separator '@@' --judging_criteria 'clarity:0.6,conciseness:0.4' --explanation false",
         "spout evaluate -i 'The cat sat on the mat@@A feline rested upon the floor covering@@The small cat positioned itself atop the mat' -c 'simplicity,directness' -e true",
-        "spout evaluate --combined_inputs 'Option A: Expand into new markets@@Option B: Focus on existing customer base@@Option C: Diversify product line' --separator '@@' --judging_criteria 'risk:0.3,potential_roi:0.4,feasibility:0.3' --explanation true"
+        "spout evaluate --combined_inputs 'Option A: Expand into new markets@@Option B: Focus on existing customer base@@Option C: Diversify product line' --separator '@@' --judging_criteria 'risk:0.3,potential_roi:0.4,feasibility:0.3' --explanation true",
+        "spout evaluate -i 'Nova@@Ember@@Quill@@...@@Zephyr' -c 'memorability as a brand name' -g 12 -w 8 --merge bracket"
     ]
 )
\ No newline at end of file
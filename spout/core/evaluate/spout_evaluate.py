@@ -1,20 +1,28 @@
 import asyncio
+import json
 import sys
 
+from spout.core.evaluate.tournament import EvaluateTournament
 from spout.shared.base_handler import BaseHandler
+from spout.shared.response_cache import get_response_cache
 
 
 class SpoutEvaluate(BaseHandler):
-    async def evaluate(self, combined_inputs: str, separator: str, judging_criteria: str, explanation: str, spoutlet: str = None):
+    async def evaluate(self, combined_inputs: str, separator: str, judging_criteria: str, explanation: str, spoutlet: str = None,
+                       group_size: str = None, workers: str = None, merge: str = None):
         try:
-            result = await self.process_with_plugin(
-                plugin_name="Evaluate",
-                CombinedInputs=combined_inputs,
-                Separator=separator if separator else "@@",
-                JudgingCriteria=judging_criteria if judging_criteria else "quality",
-                Explanation=explanation if explanation else "False",
-                spoutlet=spoutlet
-            )
+            if group_size:
+                result = await self.evaluate_tournament(combined_inputs, separator, judging_criteria, explanation,
+                                                        int(group_size), spoutlet, workers, merge)
+            else:
+                result = await self.process_with_plugin(
+                    plugin_name="Evaluate",
+                    CombinedInputs=combined_inputs,
+                    Separator=separator if separator else "@@",
+                    JudgingCriteria=judging_criteria if judging_criteria else "quality",
+                    Explanation=explanation if explanation else "False",
+                    spoutlet=spoutlet
+                )
             
             if 'python.exe' in sys.executable:
                 print(result)
@@ -25,6 +33,30 @@ class SpoutEvaluate(BaseHandler):
             self.show_error_popup(f"An error occurred: {str(e)}")
             sys.exit(1)
 
+    async def evaluate_tournament(self, combined_inputs: str, separator: str, judging_criteria: str, explanation: str,
+                                  group_size: int, spoutlet: str = None, workers: str = None, merge: str = None) -> str:
+        """Rank many inputs in concurrently judged groups; returns the same Rankings JSON as evaluate"""
+        separator = separator if separator else "@@"
+        candidates = [candidate for candidate in combined_inputs.split(separator) if candidate.strip()]
+        kernel, function = await self.load_plugin("Evaluate", spoutlet)
+        tournament = EvaluateTournament(
+            self,
+            kernel,
+            function,
+            settings={
+                "Separator": separator,
+                "JudgingCriteria": judging_criteria if judging_criteria else "quality",
+                "Explanation": explanation if explanation else "False",
+            },
+            group_size=group_size,
+            workers=int(workers or "4"),
+            merge=merge or "bracket",
+            cache=get_response_cache() if self.cache_mode != "off" else None,
+            refresh_cache=self.cache_mode == "refresh",
+            spoutlet=spoutlet,
+        )
+        return json.dumps(await tournament.run(candidates), indent=2, ensure_ascii=False)
+
 if __name__ == "__main__":
     try:
         if len(sys.argv) >= 5:
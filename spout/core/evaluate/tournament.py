@@ -0,0 +1,214 @@
+import hashlib
+import json
+import math
+import re
+import statistics
+from typing import Dict, List, Optional, Tuple
+
+from spout.shared.json_response import parse_json_response
+from spout.shared.response_cache import ResponseCache
+
+_LABEL_PATTERN = re.compile(r"^\s*--(.+?)--")
+
+
+def candidate_name(text: str, position: int) -> str:
+    """The Name the evaluate spoutlet gives an input: its --label--, the text if short, else 'Input N'"""
+    label = _LABEL_PATTERN.match(text)
+    if label:
+        return label.group(1).strip()
+    if len(text.strip()) <= 50:
+        return text.strip()
+    return f"Input {position}"
+
+
+def _digest(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def shard(candidates: List[str], group_size: int) -> List[List[int]]:
+    """Split candidate indices into groups of at most group_size.
+
+    Candidates are ordered by content hash and groups end where a candidate's hash
+    says so (once a group is half full), as in content-defined chunking. Adding or
+    dropping a candidate therefore changes only the group it lands in, and the other
+    groups keep their cached results across generations.
+    """
+    order = sorted(range(len(candidates)), key=lambda i: _digest(candidates[i]))
+    min_size = max(group_size // 2, 2)
+    groups, group = [], []
+    for index in order:
+        group.append(index)
+        boundary = int(_digest(candidates[index])[-8:], 16) % min_size == 0
+        if len(group) >= group_size or (len(group) >= min_size and boundary):
+            groups.append(group)
+            group = []
+    if group:
+        # Fold a short tail into the previous group when it fits
+        if groups and len(groups[-1]) + len(group) <= group_size:
+            groups[-1].extend(group)
+        else:
+            groups.append(group)
+    return groups
+
+
+class EvaluateTournament:
+    """Ranks more candidates than fit one evaluate prompt.
+
+    Candidates are sharded into groups that are judged concurrently. With the
+    "bracket" merge, the top half of every group advances to another round until one
+    group is left; its ranking heads the result, followed by the candidates knocked
+    out in earlier rounds. With the "normalize" merge there is a single round and
+    candidates are ordered by their score's z-score within their own group. Group
+    results are cached by the hash of the candidate set, so groups that did not change
+    between generations are not judged again, unless the spoutlet's settings keep it
+    out of the response cache.
+    """
+
+    def __init__(self, handler, kernel, function, settings: Dict[str, str], group_size: int = 10,
+                 workers: int = 4, merge: str = "bracket", cache: Optional[ResponseCache] = None,
+                 refresh_cache: bool = False, spoutlet: Optional[str] = None):
+        if merge not in ("bracket", "normalize"):
+            raise ValueError(f"Unknown merge '{merge}', expected bracket or normalize")
+        self.handler = handler
+        self.kernel = kernel
+        self.function = function
+        self.settings = settings
+        self.group_size = max(group_size, 2)
+        self.workers = max(workers, 1)
+        self.merge = merge
+        config = function.config
+        if cache is not None and not cache.accepts(config, config.get("execution_settings", {}).get("default", {})):
+            # "cache": false or sampling above MaxTemperature rules out group results too
+            cache = None
+        self.cache = cache
+        self.refresh_cache = refresh_cache
+        self.spoutlet = spoutlet or "default"
+        self.groups_judged = 0
+        self.groups_cached = 0
+
+    def _cache_key(self, texts: List[str]) -> str:
+        model = self.kernel.services["default"].model
+        identity = {
+            "candidates": _digest("\x00".join(texts)),
+            "criteria": self.settings.get("JudgingCriteria"),
+            "explanation": self.settings.get("Explanation"),
+            "spoutlet": self.spoutlet,
+        }
+        return ResponseCache.make_key(model, "evaluate-tournament-group", identity)
+
+    def _parse_group(self, result, texts: List[str]) -> List[Tuple[Optional[float], str]]:
+        """(score, explanation) per group position, from the spoutlet's Rankings"""
+        rankings = parse_json_response(str(result)).get("Rankings")
+        if not isinstance(rankings, list):
+            raise ValueError("Response has no Rankings list")
+        positions = {}
+        for position, text in enumerate(texts):
+            positions.setdefault(f"input {position + 1}", position)
+            positions.setdefault(candidate_name(text, position + 1).lower(), position)
+
+        scores: List[Tuple[Optional[float], str]] = [(None, "")] * len(texts)
+        for entry in rankings:
+            if not isinstance(entry, dict):
+                continue
+            position = positions.get(str(entry.get("Name", "")).strip().lower())
+            if position is None or scores[position][0] is not None:
+                continue
+            try:
+                score = float(entry.get("Score"))
+            except (TypeError, ValueError):
+                continue
+            scores[position] = (score, str(entry.get("Explanation", "")))
+        if all(score is None for score, _ in scores):
+            raise ValueError("Rankings do not name any of the inputs")
+        return scores
+
+    async def judge_group(self, texts: List[str]) -> List[Tuple[Optional[float], str]]:
+        key = self._cache_key(texts) if self.cache else None
+        if key and not self.refresh_cache:
+            cached = self.cache.get(key)
+            if cached:
+                self.groups_cached += 1
+                return [tuple(entry) for entry in json.loads(cached["content"])]
+
+        separator = self.settings.get("Separator", "@@")
+        last_error = None
+        for attempt in range(2):
+            result = await self.handler.invoke_logged(
+                self.kernel,
+                self.function,
+                refresh_cache=attempt > 0,
+                CombinedInputs=separator.join(texts),
+                **self.settings
+            )
+            try:
+                scores = self._parse_group(result, texts)
+                break
+            except ValueError as e:
+                last_error = e
+        else:
+            raise last_error
+
+        self.groups_judged += 1
+        if key:
+            self.cache.put(key, self.kernel.services["default"].model, json.dumps(scores),
+                           getattr(result, "input_tokens", None), getattr(result, "output_tokens", None))
+        return scores
+
+    async def _round(self, candidates: List[str], pool: List[int]) -> List[List[Tuple[int, Optional[float], str]]]:
+        """Judge `pool` (candidate indices) in groups; returns each group's (index, score, explanation)"""
+        groups = [[pool[i] for i in group] for group in shard([candidates[i] for i in pool], self.group_size)]
+        calls = ((self.judge_group, {"texts": [candidates[i] for i in group]}) for group in groups)
+        judged = []
+        async for number, scores in self.kernel.invoke_many(calls, self.workers, ordered=True):
+            if isinstance(scores, BaseException):
+                raise scores
+            judged.append([(index, score, explanation)
+                           for index, (score, explanation) in zip(groups[number], scores)])
+        return judged
+
+    @staticmethod
+    def _normalized(group: List[Tuple[int, Optional[float], str]]) -> List[Tuple[float, float, int, str]]:
+        """(z-score, score, index, explanation) per candidate; unranked candidates sort last"""
+        scores = [score for _, score, _ in group if score is not None]
+        mean = statistics.fmean(scores) if scores else 0.0
+        spread = statistics.pstdev(scores) if len(scores) > 1 else 0.0
+        entries = []
+        for index, score, explanation in group:
+            if score is None:
+                entries.append((-math.inf, -math.inf, index, explanation))
+            else:
+                entries.append(((score - mean) / spread if spread else 0.0, score, index, explanation))
+        return entries
+
+    async def rank(self, candidates: List[str]) -> List[Tuple[int, Optional[float], str]]:
+        """Candidate indices from best to worst, with the score and explanation they last got"""
+        pool = list(range(len(candidates)))
+        eliminated: List[List[Tuple[float, float, int, str]]] = []
+        while True:
+            groups = await self._round(candidates, pool)
+            if self.merge == "normalize" or len(groups) == 1:
+                final = sorted((entry for group in groups for entry in self._normalized(group)), reverse=True)
+                break
+            survivors, knocked_out = [], []
+            for group in groups:
+                ranked = sorted(self._normalized(group), reverse=True)
+                advance = max(len(ranked) // 2, 1)
+                survivors.extend(entry[2] for entry in ranked[:advance])
+                knocked_out.extend(ranked[advance:])
+            eliminated.append(sorted(knocked_out, reverse=True))
+            pool = survivors
+
+        # Later rounds outrank earlier ones
+        order = final + [entry for round_out in reversed(eliminated) for entry in round_out]
+        return [(index, None if score == -math.inf else score, explanation)
+                for _, score, index, explanation in order]
+
+    async def run(self, candidates: List[str]) -> Dict:
+        include_explanation = str(self.settings.get("Explanation", "")).strip().lower() == "true"
+        rankings = []
+        for rank, (index, score, explanation) in enumerate(await self.rank(candidates), start=1):
+            entry = {"Rank": rank, "Name": candidate_name(candidates[index], index + 1), "Score": score}
+            if include_explanation:
+                entry["Explanation"] = explanation
+            rankings.append(entry)
+        return {"Rankings": rankings}
@@ -29,6 +29,25 @@ PLUGIN_DEFINITION = PluginDefinition(
             help="List of already generated items to avoid duplicates",
             required=False,
             default=[]
+        ),
+        PluginOption(
+            name="count",
+            flags=["--count", "-n"],
+            help="Generate this many unique items using concurrent batches (batch size defaults to 10)",
+            required=False
+        ),
+        PluginOption(
+            name="workers",
+            flags=["--workers", "-w"],
+            help="With --count, number of batches generated concurrently (default 4)",
+            default="4",
+            required=False
+        ),
+        PluginOption(
+            name="output_file",
+            flags=["--output-file", "-O"],
+            help="With --count, write the items here, one per line, instead of stdout",
+            required=False
         )
     ],
     help_text="""
@@ -44,6 +63,9 @@ PLUGIN_DEFINITION = PluginDefinition(
 
     - Avoids duplicates with already generated content
 
+    - Produces large sets of unique items with --count, dropping exact and
+      near-duplicate results and reporting the unique yield of each batch
+
     This plugin is ideal for:
 
     - Creating variations of example content
@@ -58,6 +80,7 @@ PLUGIN_DEFINITION = PluginDefinition(
     examples=[
         "spout generate -d 'Product name for a coffee shop' -e 'Morning Brew'",
         "spout generate --description 'Blog title about AI' --example 'The Future of Machine Learning' --batch-size 3",
-        "spout generate -d 'Marketing slogan' -e 'Just Do It' -b 5 -a 'Be Bold, Think Different' "
+        "spout generate -d 'Marketing slogan' -e 'Just Do It' -b 5 -a 'Be Bold, Think Different' ",
+        "spout generate -d 'Creative writing prompt' -e 'A detective solves a case using only emojis' -n 500 -w 8 -O prompts.txt"
     ]
 )
\ No newline at end of file
@@ -0,0 +1,137 @@
+import asyncio
+import random
+import sys
+from typing import Dict, List, Optional, TextIO
+
+from spout.shared.dedup_index import DedupIndex
+from spout.shared.json_response import parse_json_response
+
+
+class GenerateRunner:
+    """Generates `target` unique items with several generate batches in flight.
+
+    Instead of the full history, each batch is shown a random sample of at most
+    `exclusion_size` items already produced, so the prompt stays the same size however
+    long the run. Every returned item goes through a DedupIndex (exact and near
+    duplicates) and only new ones are written. A line per batch on stderr reports how
+    many of its items were new.
+    """
+
+    def __init__(self, handler, kernel, function, settings: Dict[str, str], target: int, batch_size: int = 10,
+                 workers: int = 4, exclusion_size: int = 40, seed_items: Optional[List[str]] = None,
+                 max_stalled_batches: int = 5, report: TextIO = sys.stderr):
+        self.handler = handler
+        self.kernel = kernel
+        self.function = function
+        self.settings = settings
+        self.target = target
+        self.batch_size = max(batch_size, 1)
+        self.workers = max(workers, 1)
+        self.exclusion_size = exclusion_size
+        self.max_stalled_batches = max_stalled_batches
+        self.report = report
+        self.index = DedupIndex()
+        # Everything already produced, to sample exclusion lists from
+        self.known: List[str] = []
+        for item in seed_items or []:
+            if self.index.add(item):
+                self.known.append(item)
+        self.generated = 0
+        self.returned = 0
+        self.batches = 0
+        self.failed = 0
+
+    def _exclusions(self) -> str:
+        if len(self.known) <= self.exclusion_size:
+            sample = random.sample(self.known, len(self.known))
+        else:
+            sample = random.sample(self.known, self.exclusion_size)
+        return "\n".join(sample)
+
+    async def run_batch(self) -> List[str]:
+        result = await self.handler.invoke_logged(
+            self.kernel,
+            self.function,
+            # Each batch should be a fresh sample, never a replay of an earlier one
+            refresh_cache=True,
+            coalesce=False,
+            batch_size=str(self.batch_size),
+            already_gen=self._exclusions(),
+            **self.settings
+        )
+        items = parse_json_response(str(result)).get("generated_items")
+        if not isinstance(items, list):
+            raise ValueError("Response has no generated_items list")
+        return [str(item) for item in items]
+
+    def _accept(self, items: List[str], output: TextIO) -> int:
+        new = 0
+        self.returned += len(items)
+        for item in items:
+            if self.generated >= self.target:
+                break
+            if not self.index.add(item):
+                continue
+            self.known.append(item)
+            # One item per output line, with line breaks written as \n like the spoutlet examples
+            output.write(item.replace("\r", "").replace("\n", "\\n") + "\n")
+            self.generated += 1
+            new += 1
+        output.flush()
+        return new
+
+    def _wanted(self, in_flight: int) -> bool:
+        """Whether another batch is needed, expecting running ones to match the yield so far"""
+        if not self.known and in_flight:
+            # With nothing to exclude yet, parallel batches would all come back the same
+            return False
+        yield_rate = self.generated / self.returned if self.returned else 1.0
+        return self.generated + in_flight * self.batch_size * max(yield_rate, 0.1) < self.target
+
+    async def run(self, output: TextIO) -> Dict[str, int]:
+        pending = set()
+        stalled = 0
+        started = 0
+        # Stop eventually even if every batch keeps returning a few new items
+        max_batches = (self.target // self.batch_size + 1) * 5 + self.workers
+
+        while True:
+            while (len(pending) < self.workers and started < max_batches
+                   and stalled < self.max_stalled_batches and self._wanted(len(pending))):
+                pending.add(asyncio.ensure_future(self.run_batch()))
+                started += 1
+            if not pending:
+                break
+
+            finished, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in finished:
+                self.batches += 1
+                try:
+                    items = task.result()
+                except Exception as e:
+                    self.failed += 1
+                    stalled += 1
+                    print(f"Batch {self.batches}: failed: {e}", file=self.report)
+                    continue
+                new = self._accept(items, output)
+                stalled = 0 if new else stalled + 1
+                yield_rate = new / len(items) * 100 if items else 0.0
+                print(f"Batch {self.batches}: {new}/{len(items)} new ({yield_rate:.0f}%), "
+                      f"{self.generated}/{self.target} unique", file=self.report)
+
+            if self.generated >= self.target:
+                break
+
+        for task in pending:
+            task.cancel()
+        if self.generated < self.target:
+            reason = (f"{stalled} in a row added nothing new" if stalled >= self.max_stalled_batches
+                      else f"reached the limit of {max_batches} batches")
+            print(f"Stopped after {self.batches} batches: {reason}", file=self.report)
+        return {
+            "generated": self.generated,
+            "batches": self.batches,
+            "failed": self.failed,
+            "exact_duplicates": self.index.exact_duplicates,
+            "near_duplicates": self.index.near_duplicates,
+        }
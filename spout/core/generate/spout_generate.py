@@ -1,12 +1,16 @@
 import asyncio
 import sys
 
+from spout.core.generate.generate_runner import GenerateRunner
 from spout.shared.base_handler import BaseHandler
 
 
 class SpoutGenerate(BaseHandler):
-    async def generate(self, description: str, example: str, batch_size: str = "3", already_gen: str = None, spoutlet: str = None):
-        
+    async def generate(self, description: str, example: str, batch_size: str = "3", already_gen: str = None, spoutlet: str = None,
+                       count: str = None, workers: str = None, output_file: str = None):
+        if count:
+            return await self.generate_many(description, example, int(count), batch_size, already_gen, spoutlet,
+                                            workers, output_file)
         try:
             if already_gen is None:
                 already_gen = ""
@@ -27,6 +31,40 @@ class SpoutGenerate(BaseHandler):
             self.show_error_popup(f"An error occurred: {str(e)}")
             sys.exit(1)
 
+    async def generate_many(self, description: str, example: str, count: int, batch_size: str = None,
+                            already_gen: str = None, spoutlet: str = None, workers: str = None,
+                            output_file: str = None):
+        """Generate `count` unique items with concurrent batches, writing them one per line"""
+        # A long run is unattended, so errors go to stderr instead of a popup
+        self.interactive = False
+        try:
+            kernel, function = await self.load_plugin("Generate", spoutlet)
+            runner = GenerateRunner(
+                self,
+                kernel,
+                function,
+                settings={"description": description, "example": example or " "},
+                target=count,
+                batch_size=int(batch_size or "10"),
+                workers=int(workers or "4"),
+                seed_items=[line for line in (already_gen or "").splitlines() if line.strip()],
+            )
+
+            output = open(output_file, 'w', encoding='utf-8') if output_file else sys.stdout
+            try:
+                summary = await runner.run(output)
+            finally:
+                if output is not sys.stdout:
+                    output.close()
+
+            print(f"Generated {summary['generated']} unique items in {summary['batches']} batches "
+                  f"({summary['exact_duplicates']} exact and {summary['near_duplicates']} near duplicates dropped)",
+                  file=sys.stderr)
+            return summary
+        except Exception as e:
+            self.show_error_popup(f"An error occurred: {str(e)}")
+            sys.exit(1)
+
 if __name__ == "__main__":
     try:
         if len(sys.argv) >= 3:  # Only require description and example
@@ -0,0 +1,117 @@
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from spout.shared.token_counter import count_tokens
+
+
+class Sample:
+    __slots__ = ("name", "text", "tokens", "stamp")
+
+    def __init__(self, name: str, text: str, tokens: int, stamp: Tuple[float, int]):
+        self.name = name
+        self.text = text
+        self.tokens = tokens
+        self.stamp = stamp
+
+
+def _read_sample(path: str) -> Optional[str]:
+    for encoding in ['utf-8-sig', 'cp1252', 'latin-1']:
+        try:
+            with open(path, 'r', encoding=encoding) as f:
+                return f.read().strip()
+        except UnicodeDecodeError:
+            continue
+        except OSError:
+            return None
+    return None
+
+
+class SampleIndex:
+    """Decoded tests/samples files of every core module, with their token counts.
+
+    Built on first use and kept for the life of the process. Each lookup stats the
+    sample files and only re-reads those whose mtime or size changed, so new, edited
+    and deleted samples show up without walking and decoding everything again.
+    """
+
+    def __init__(self, core_dir: str):
+        self.core_dir = core_dir
+        self._modules: List[str] = []
+        self._modules_stamp: Optional[float] = None
+        self._samples: Dict[str, Dict[str, Sample]] = {}
+        self._lock = threading.Lock()
+
+    def modules(self) -> List[str]:
+        stamp = os.stat(self.core_dir).st_mtime
+        with self._lock:
+            if stamp != self._modules_stamp:
+                self._modules = sorted(
+                    name for name in os.listdir(self.core_dir)
+                    if not name.startswith('__') and os.path.isdir(os.path.join(self.core_dir, name))
+                )
+                self._modules_stamp = stamp
+            return self._modules
+
+    def samples(self, module: str) -> List[Sample]:
+        """The module's samples sorted by file name, refreshed from disk where they changed"""
+        samples_path = os.path.join(self.core_dir, module, 'tests', 'samples')
+        try:
+            names = sorted(os.listdir(samples_path))
+        except OSError:
+            return []
+
+        with self._lock:
+            cached = self._samples.get(module, {})
+            current = {}
+            for name in names:
+                path = os.path.join(samples_path, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                stamp = (stat.st_mtime, stat.st_size)
+                sample = cached.get(name)
+                if sample is None or sample.stamp != stamp:
+                    text = _read_sample(path)
+                    if not text:
+                        continue
+                    sample = Sample(name, text, count_tokens(text), stamp)
+                current[name] = sample
+            self._samples[module] = current
+            return list(current.values())
+
+
+def select_samples(groups: List[Tuple[str, List[Sample]]], token_budget: int) -> List[Tuple[str, List[Sample]]]:
+    """Pick samples from every group within token_budget.
+
+    Groups take turns, each contributing its next smallest sample, so one module
+    with many or long samples cannot crowd out the rest. Samples that do not fit are
+    skipped in favour of smaller ones. The result keeps group order and file order.
+    """
+    queues = [sorted(samples, key=lambda sample: sample.tokens) for _, samples in groups]
+    chosen = [set() for _ in groups]
+    used = 0
+    progress = True
+    while progress:
+        progress = False
+        for index, queue in enumerate(queues):
+            while queue:
+                sample = queue.pop(0)
+                if used + sample.tokens <= token_budget:
+                    chosen[index].add(sample.name)
+                    used += sample.tokens
+                    progress = True
+                    break
+    return [(group, [sample for sample in samples if sample.name in chosen[index]])
+            for index, (group, samples) in enumerate(groups)]
+
+
+_SAMPLE_INDEX = None
+
+
+def get_sample_index() -> SampleIndex:
+    global _SAMPLE_INDEX
+    if _SAMPLE_INDEX is None:
+        _SAMPLE_INDEX = SampleIndex(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    return _SAMPLE_INDEX
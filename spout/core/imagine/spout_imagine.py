@@ -1,10 +1,13 @@
 import asyncio
-import os
 import re
 import sys
 
+from spout.core.imagine.sample_index import get_sample_index, select_samples
 from spout.shared.base_handler import BaseHandler
 
+# Most sample tokens @Spout tags add to the context
+SAMPLE_TOKENS = 6000
+
 
 class SpoutImagine(BaseHandler):
     async def imagine(self, objective: str, context: str, output_format: str = "json", stipulations: str = "", spoutlet: str = None):
@@ -12,8 +15,8 @@ class SpoutImagine(BaseHandler):
         Generate a structured plan based on the provided parameters.
         """
         try:
-            # Process special tags in context
-            processed_context = self.process_special_tags(context)
+            # Process special tags in context; sample files are read off the event loop
+            processed_context = await self.run_blocking(self.process_special_tags, context)
             
             result = await self.process_with_plugin(
                 plugin_name="Imagine",
@@ -21,10 +24,12 @@ class SpoutImagine(BaseHandler):
                 context=processed_context,
                 output_format=output_format,
                 stipulations=stipulations if stipulations else "",
-                spoutlet=spoutlet
+                spoutlet=spoutlet,
+                stream=self.stream_output
             )
             
-            if 'python.exe' in sys.executable:
+            # Streamed output has already been written chunk by chunk
+            if 'python.exe' in sys.executable and not self.stream_output:
                 print(result)
             else:
                 return result
@@ -33,53 +38,35 @@ class SpoutImagine(BaseHandler):
             self.show_error_popup(f"An error occurred: {str(e)}")
             sys.exit(1)
 
-    def process_special_tags(self, context: str) -> str:
-        """Process special @Spout tags in the context."""
+    def process_special_tags(self, context: str, token_budget: int = SAMPLE_TOKENS) -> str:
+        """Process special @Spout tags in the context.
+
+        Sample text comes from the process-wide sample index, and at most
+        `token_budget` tokens of it are added however many samples the modules have.
+        """
         context_lower = context.lower()
         
         if '@spout' not in context_lower:
             return context
 
-        # Get the base directory for core modules
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        core_dir = os.path.join(os.path.dirname(os.path.dirname(current_dir)), "core")
-        
+        index = get_sample_index()
         additional_context = ""
 
         if '@spoutcli' in context_lower:
-            additional_context = "=== Spout CLI Examples ===\n\n"
             try:
-                for module in sorted(os.listdir(core_dir)):
-                    module_path = os.path.join(core_dir, module)
-                    if os.path.isdir(module_path) and not module.startswith('__'):
-                        samples_path = os.path.join(module_path, 'tests', 'samples')
-                        
-                        if os.path.exists(samples_path):
-                            default_files = [f for f in os.listdir(samples_path) 
-                                          if f.endswith('_default.txt')]
-                            
-                            if default_files:
-                                additional_context += f"--- {module.upper()} Module Examples ---\n"
-                                for sample in default_files:
-                                    sample_path = os.path.join(samples_path, sample)
-                                    content = None
-                                    
-                                    # Try different encodings
-                                    encodings = ['utf-8', 'utf-8-sig', 'latin-1', 'cp1252']
-                                    for encoding in encodings:
-                                        try:
-                                            with open(sample_path, 'r', encoding=encoding) as f:
-                                                content = f.read().strip()
-                                                break
-                                        except UnicodeDecodeError:
-                                            continue
-                                        except Exception:
-                                            break
-                                    
-                                    if content:
-                                        additional_context += f"{content}\n\n"
+                groups = [
+                    (module, [sample for sample in index.samples(module) if sample.name.endswith('_default.txt')])
+                    for module in index.modules()
+                ]
             except Exception:
                 return context
+
+            additional_context = "=== Spout CLI Examples ===\n\n"
+            for module, samples in select_samples(groups, token_budget):
+                if samples:
+                    additional_context += f"--- {module.upper()} Module Examples ---\n"
+                    for sample in samples:
+                        additional_context += f"{sample.text}\n\n"
             
             # Remove any other @Spout tags since @SpoutCLI takes precedence
             context = re.sub(r'@Spout\w+', '', context, flags=re.IGNORECASE)
@@ -90,22 +77,15 @@ class SpoutImagine(BaseHandler):
         
         else:
             # Handle individual module tags
-            for module in os.listdir(core_dir):
-                module_tag = f'@spout{module.lower()}'
-                if module_tag in context_lower:
-                    module_path = os.path.join(core_dir, module)
-                    samples_path = os.path.join(module_path, 'tests', 'samples')
-                    if os.path.exists(samples_path):
-                        additional_context += f"Spout {module} module examples:\n\n"
-                        for sample in os.listdir(samples_path):
-                            try:
-                                with open(os.path.join(samples_path, sample), 'r', encoding='utf-8') as f:
-                                    additional_context += f"{f.read()}\n"
-                            except Exception:
-                                continue
-                        additional_context += "\n"
-                    # Remove the processed tag
-                    context = re.sub(f'@Spout{module}', '', context, flags=re.IGNORECASE)
+            groups = [(module, index.samples(module)) for module in index.modules()
+                      if f'@spout{module.lower()}' in context_lower]
+            for module, samples in select_samples(groups, token_budget):
+                additional_context += f"Spout {module} module examples:\n\n"
+                for sample in samples:
+                    additional_context += f"{sample.text}\n"
+                additional_context += "\n"
+                # Remove the processed tag
+                context = re.sub(f'@Spout{module}', '', context, flags=re.IGNORECASE)
 
         # Remove any remaining @Spout tags
         context = re.sub(r'@Spout\w+', '', context, flags=re.IGNORECASE)
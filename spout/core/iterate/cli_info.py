@@ -25,15 +25,40 @@ PLUGIN_DEFINITION = PluginDefinition(
         PluginOption(
             name="lines_per_call",
             flags=["--lines-per-call", "-b"],
-            help="Number of lines to process in each API call",
+            help="Number of lines to process in each API call, or 'auto' to size batches to the token budget",
             default="1",
             required=False
         ),
         PluginOption(
             name="preprocessed_lines",
             flags=["--preprocessed-lines", "-l"],
-            help="Lines to be processed, separated by newlines",
-            required=True
+            help="Lines to be processed, separated by newlines (or use --input-file)",
+            required=False
+        ),
+        PluginOption(
+            name="input_file",
+            flags=["--input-file", "-f"],
+            help="File to process line by line in concurrent batches, instead of --preprocessed-lines",
+            required=False
+        ),
+        PluginOption(
+            name="output_file",
+            flags=["--output-file", "-O"],
+            help="With --input-file, write processed lines here instead of stdout",
+            required=False
+        ),
+        PluginOption(
+            name="workers",
+            flags=["--workers", "-w"],
+            help="With --input-file, number of batches processed concurrently (default 4)",
+            default="4",
+            required=False
+        ),
+        PluginOption(
+            name="checkpoint",
+            flags=["--checkpoint", "-c"],
+            help="With --input-file, checkpoint file used to resume an interrupted run",
+            required=False
         )
     ],
     help_text="""
@@ -49,6 +74,11 @@ PLUGIN_DEFINITION = PluginDefinition(
 
     - Maintains consistent transformation across all lines
 
+    - Streams large files with --input-file, running batches concurrently and
+      writing results in input order, resumable with --checkpoint
+
+    - Sizes batches automatically with --lines-per-call auto
+
     This plugin is ideal for:
 
     - Batch processing text transformations
@@ -70,6 +100,7 @@ PLUGIN_DEFINITION = PluginDefinition(
     examples=[
         "spout iterate -e 'data: 123' -o '123' -d 'Extract number' -l 'data: 456\\ndata: 789'",
         "spout iterate --example-preprocessed-line 'John Doe' --example-processed-line 'Doe, J.' --description 'Format as last name, first initial' --preprocessed-lines 'Jane Smith\\nBob Johnson' --lines-per-call 2",
-        "spout iterate -e 'buy milk' -o '- [ ] buy milk' -d 'Convert to checkbox task' -l 'walk dog\\ndo laundry'"
+        "spout iterate -e 'buy milk' -o '- [ ] buy milk' -d 'Convert to checkbox task' -l 'walk dog\\ndo laundry'",
+        "spout iterate -e 'John Doe' -o 'Doe, J.' -d 'Format as last name, first initial' -f names.txt -b auto -w 8 -O out.txt -c names.ckpt"
     ]
 )
\ No newline at end of file
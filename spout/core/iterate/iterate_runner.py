@@ -0,0 +1,245 @@
+import asyncio
+import codecs
+import json
+import os
+from typing import Dict, Iterator, List, Optional, TextIO, Tuple
+
+from spout.shared.json_response import parse_json_response
+from spout.shared.token_counter import count_tokens
+
+# JSON quoting and separators around each processed item
+ITEM_OVERHEAD_TOKENS = 3
+
+
+def detect_encoding(path: str) -> str:
+    """Pick the first of utf-8 / windows-1252 / iso-8859-1 that decodes the whole file"""
+    for encoding in ['utf-8', 'windows-1252']:
+        decoder = codecs.getincrementaldecoder(encoding)()
+        try:
+            with open(path, 'rb') as file:
+                for block in iter(lambda: file.read(1 << 20), b''):
+                    decoder.decode(block)
+                decoder.decode(b'', final=True)
+            return encoding
+        except UnicodeDecodeError:
+            continue
+    return 'iso-8859-1'
+
+
+class BatchSizer:
+    """Packs lines into batches whose expected output fills `target` of max_tokens.
+
+    The output of a batch is modelled as the fixed JSON wrapper plus `ratio` times the
+    tokens of its lines (with per-item overhead). The ratio starts from the example
+    line pair and is replaced by the one observed in completed batches as they come
+    in. Input is capped at `max_input_tokens` per request so a single batch never
+    grows past what the prompt preamble is worth amortising.
+    """
+
+    def __init__(self, fixed_input_tokens: int, max_tokens: int, initial_ratio: float = 1.0,
+                 target: float = 0.75, max_input_tokens: int = 16000, max_lines: int = 500):
+        self.fixed_input_tokens = fixed_input_tokens
+        self.fixed_output_tokens = count_tokens('{"processed_items": []}')
+        self.max_tokens = max_tokens
+        self.target = target
+        self.max_input_tokens = max_input_tokens
+        self.max_lines = max_lines
+        self.initial_ratio = initial_ratio
+        self.observed_input = 0
+        self.observed_output = 0
+        # Lowered whenever a batch has to be re-split, to the half that came back whole
+        self.max_batch_tokens = None
+
+    @classmethod
+    def for_function(cls, function, settings: Dict[str, str], **kwargs) -> "BatchSizer":
+        """Measure the spoutlet's prompt preamble and output limit"""
+        execution_settings = function.config.get("execution_settings", {}).get("default", {})
+        fixed_input = count_tokens(function.template.render({**settings, "lines_per_call": "1", "preprocessed_lines": ""}))
+        example_in = count_tokens(settings.get("example_preprocessed_line", ""))
+        example_out = count_tokens(settings.get("example_processed_line", ""))
+        # With no example to go on, assume the output is as long as the input
+        ratio = (example_out + ITEM_OVERHEAD_TOKENS) / (example_in + ITEM_OVERHEAD_TOKENS) if example_in else 1.0
+        return cls(fixed_input, int(execution_settings.get("max_tokens", 4096)), initial_ratio=ratio, **kwargs)
+
+    @property
+    def ratio(self) -> float:
+        if self.observed_input:
+            return self.observed_output / self.observed_input
+        # Until a batch has finished, leave headroom for a misleading example pair
+        return self.initial_ratio * 1.5
+
+    def line_tokens(self, line: str) -> int:
+        return count_tokens(line) + ITEM_OVERHEAD_TOKENS
+
+    def fits(self, input_tokens: int, lines: int) -> bool:
+        """Whether a batch of `lines` lines totalling input_tokens stays within budget"""
+        if lines > self.max_lines or self.fixed_input_tokens + input_tokens > self.max_input_tokens:
+            return False
+        if self.max_batch_tokens is not None and input_tokens > self.max_batch_tokens:
+            return False
+        return self.fixed_output_tokens + self.ratio * input_tokens <= self.target * self.max_tokens
+
+    def observe(self, input_tokens: int, output_tokens: Optional[int]) -> None:
+        """Learn from a batch whose every item came back"""
+        if output_tokens:
+            self.observed_input += input_tokens
+            self.observed_output += max(output_tokens - self.fixed_output_tokens, 0)
+
+    def shrink(self, input_tokens: int) -> None:
+        """A batch this size came back incomplete; keep later batches to half of it"""
+        limit = max(input_tokens // 2, 1)
+        if self.max_batch_tokens is None or limit < self.max_batch_tokens:
+            self.max_batch_tokens = limit
+
+
+class IterateFileRunner:
+    """Streams an input file through the iterate spoutlet in `lines_per_call` batches.
+
+    Batches run concurrently (up to `workers` at once) and their `processed_items` are
+    written in input order as soon as every earlier batch is done. With a checkpoint
+    file, the number of input lines consumed and the output offset are recorded after
+    each written batch, so a crashed run resumes from the last written line.
+
+    With a BatchSizer instead of a fixed `lines_per_call`, batches are packed to a token
+    budget. Either way, a batch whose `processed_items` comes back short or malformed
+    is split in half and each half is sent again, down to single lines.
+    """
+
+    def __init__(self, handler, kernel, function, settings: Dict[str, str], lines_per_call: int = 1,
+                 workers: int = 4, checkpoint_path: Optional[str] = None, retries: int = 2,
+                 sizer: Optional[BatchSizer] = None):
+        self.handler = handler
+        self.kernel = kernel
+        self.function = function
+        self.settings = settings
+        self.sizer = sizer
+        self.lines_per_call = max(lines_per_call, 1)
+        self.workers = max(workers, 1)
+        self.checkpoint_path = checkpoint_path
+        self.retries = retries
+        self.lines_written = 0
+        self.batches = 0
+        self.splits = 0
+
+    def _load_checkpoint(self, input_path: str) -> Dict:
+        if not self.checkpoint_path or not os.path.exists(self.checkpoint_path):
+            return {}
+        with open(self.checkpoint_path, 'r', encoding='utf-8') as file:
+            checkpoint = json.load(file)
+        if checkpoint.get('input') != os.path.abspath(input_path):
+            raise ValueError(f"Checkpoint {self.checkpoint_path} belongs to {checkpoint.get('input')}")
+        return checkpoint
+
+    def _save_checkpoint(self, input_path: str, lines_done: int, output_offset: Optional[int]) -> None:
+        checkpoint = {'input': os.path.abspath(input_path), 'lines_done': lines_done, 'output_offset': output_offset}
+        temp_path = f"{self.checkpoint_path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as file:
+            json.dump(checkpoint, file)
+        os.replace(temp_path, self.checkpoint_path)
+
+    def _batches(self, input_path: str, skip_lines: int, encoding: str) -> Iterator[Tuple[int, List[str]]]:
+        """Yield (input lines consumed so far, batch) without reading the whole file"""
+        batch = []
+        batch_tokens = 0
+        line_number = 0
+        with open(input_path, 'r', encoding=encoding, newline=None) as file:
+            for line in file:
+                line_number += 1
+                if line_number <= skip_lines:
+                    continue
+                line = line.rstrip('\n')
+                if not line.strip():
+                    continue  # blank lines carry nothing to process
+                if self.sizer:
+                    # Close the batch before the line that would push it over budget
+                    tokens = self.sizer.line_tokens(line)
+                    if batch and not self.sizer.fits(batch_tokens + tokens, len(batch) + 1):
+                        yield line_number - 1, batch
+                        batch, batch_tokens = [], 0
+                    batch.append(line)
+                    batch_tokens += tokens
+                    continue
+                batch.append(line)
+                if len(batch) >= self.lines_per_call:
+                    yield line_number, batch
+                    batch = []
+        if batch:
+            yield line_number, batch
+
+    def _parse_items(self, result, expected: int) -> List[str]:
+        items = parse_json_response(str(result)).get('processed_items')
+        if not isinstance(items, list):
+            raise ValueError("Response has no processed_items list")
+        if len(items) != expected:
+            raise ValueError(f"Expected {expected} processed items, got {len(items)}")
+        # One output line per item, as the spoutlet rules ask
+        return [str(item).replace('\r', ' ').replace('\n', ' ') for item in items]
+
+    async def _invoke(self, lines: List[str], refresh_cache: bool):
+        # Provider errors are retried by the service's RetryPolicy; only answers that do not
+        # parse or miscount the lines are sent again, by process_batch
+        return await self.handler.invoke_logged(
+            self.kernel,
+            self.function,
+            refresh_cache=refresh_cache,
+            lines_per_call=str(len(lines)),
+            preprocessed_lines="\n".join(lines),
+            **self.settings
+        )
+
+    async def process_batch(self, lines: List[str], attempt: int = 0) -> List[str]:
+        # A retry must not be answered by the cached response that just failed to parse
+        result = await self._invoke(lines, refresh_cache=attempt > 0)
+        try:
+            items = self._parse_items(result, len(lines))
+        except ValueError:
+            if len(lines) > 1:
+                # Usually a truncated or miscounted answer: smaller batches fix both
+                self.splits += 1
+                if self.sizer:
+                    self.sizer.shrink(sum(self.sizer.line_tokens(line) for line in lines))
+                middle = len(lines) // 2
+                first, second = await asyncio.gather(
+                    self.process_batch(lines[:middle]), self.process_batch(lines[middle:])
+                )
+                return first + second
+            if attempt < self.retries:
+                return await self.process_batch(lines, attempt + 1)
+            raise
+
+        if self.sizer:
+            self.sizer.observe(sum(self.sizer.line_tokens(line) for line in lines), getattr(result, "output_tokens", None))
+        return items
+
+    def _calls(self, batches: Iterator[Tuple[int, List[str]]], positions: List[int]):
+        for lines_done, lines in batches:
+            positions.append(lines_done)
+            yield self.process_batch, {'lines': lines}
+
+    async def run(self, input_path: str, output: TextIO) -> Dict[str, int]:
+        checkpoint = self._load_checkpoint(input_path)
+        skip_lines = checkpoint.get('lines_done', 0)
+        # Drop output written after the last checkpoint, so no line appears twice
+        if checkpoint.get('output_offset') is not None and output.seekable():
+            output.seek(checkpoint['output_offset'])
+            output.truncate()
+
+        # Detecting the encoding reads the whole file, which must not hold up the event loop
+        encoding = await asyncio.get_running_loop().run_in_executor(None, detect_encoding, input_path)
+        positions = []
+        calls = self._calls(self._batches(input_path, skip_lines, encoding), positions)
+        async for index, items in self.kernel.invoke_many(calls, self.workers, ordered=True):
+            if isinstance(items, BaseException):
+                # Later batches are not written, so the checkpoint stays at the last good line
+                first_line = (positions[index - 1] if index else skip_lines) + 1
+                raise RuntimeError(f"Batch for input lines {first_line}-{positions[index]} failed: {items}")
+
+            output.write("".join(item + "\n" for item in items))
+            output.flush()
+            self.lines_written += len(items)
+            self.batches += 1
+            if self.checkpoint_path:
+                offset = output.tell() if output.seekable() else None
+                self._save_checkpoint(input_path, positions[index], offset)
+
+        return {'lines': self.lines_written, 'batches': self.batches, 'splits': self.splits, 'resumed_from': skip_lines}
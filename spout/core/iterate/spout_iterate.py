@@ -1,6 +1,8 @@
 import asyncio
+import os
 import sys
 
+from spout.core.iterate.iterate_runner import BatchSizer, IterateFileRunner
 from spout.shared.base_handler import BaseHandler
 
 
@@ -16,8 +18,17 @@ class SpoutIterate(BaseHandler):
         raise ValueError(f"Unable to read the file {file_path} with any of the attempted encodings.")
 
     async def iterate(self, example_preprocessed_line: str, example_processed_line: str, 
-                     description: str, lines_per_call: str, preprocessed_lines: str, spoutlet: str = None):
+                     description: str, lines_per_call: str, preprocessed_lines: str = None, spoutlet: str = None,
+                     input_file: str = None, output_file: str = None, workers: str = None, checkpoint: str = None):
+        if input_file:
+            return await self.iterate_file(example_preprocessed_line, example_processed_line, description,
+                                           lines_per_call, input_file, spoutlet, output_file, workers, checkpoint)
         try:
+            if preprocessed_lines is None:
+                raise ValueError("Provide --preprocessed-lines or --input-file")
+            if lines_per_call == "auto":
+                # Lines given inline always go out in one call
+                lines_per_call = str(len([line for line in preprocessed_lines.splitlines() if line.strip()]))
             result = await self.process_with_plugin(
                 plugin_name="Iterate",
                 example_preprocessed_line=example_preprocessed_line,
@@ -36,6 +47,53 @@ class SpoutIterate(BaseHandler):
             self.show_error_popup(f"An error occurred: {str(e)}")
             sys.exit(1)
 
+    async def iterate_file(self, example_preprocessed_line: str, example_processed_line: str, description: str,
+                           lines_per_call: str, input_file: str, spoutlet: str = None, output_file: str = None,
+                           workers: str = None, checkpoint: str = None):
+        """Process a file of any size in concurrent batches, writing results in input order"""
+        # A file job runs unattended, so errors go to stderr instead of a popup
+        self.interactive = False
+        try:
+            kernel, function = await self.load_plugin("Iterate", spoutlet)
+            settings = {
+                "example_preprocessed_line": example_preprocessed_line,
+                "example_processed_line": example_processed_line,
+                "description": description,
+            }
+            auto = lines_per_call == "auto"
+            runner = IterateFileRunner(
+                self,
+                kernel,
+                function,
+                settings=settings,
+                lines_per_call=1 if auto else int(lines_per_call or "1"),
+                workers=int(workers or "4"),
+                checkpoint_path=checkpoint,
+                sizer=BatchSizer.for_function(function, settings) if auto else None,
+            )
+
+            if output_file:
+                # A resumed run continues the earlier output file instead of starting over
+                resuming = checkpoint and os.path.exists(checkpoint) and os.path.exists(output_file)
+                output = open(output_file, 'r+' if resuming else 'w', encoding='utf-8')
+                output.seek(0, os.SEEK_END)
+            else:
+                output = sys.stdout
+            try:
+                summary = await runner.run(input_file, output)
+            finally:
+                if output is not sys.stdout:
+                    output.close()
+
+            print(f"Processed {summary['lines']} lines in {summary['batches']} batches"
+                  + (f", {summary['splits']} re-split" if summary['splits'] else "")
+                  + (f" (resumed after line {summary['resumed_from']})" if summary['resumed_from'] else ""),
+                  file=sys.stderr)
+            return summary
+        except Exception as e:
+            self.show_error_popup(f"An error occurred: {str(e)}")
+            sys.exit(1)
+
 if __name__ == "__main__":
     try:
         if len(sys.argv) >= 6:  # Require all parameters including optional spoutlet
@@ -27,6 +27,12 @@ PLUGIN_DEFINITION = PluginDefinition(
             flags=["--input", "-i"],
             help="Text to modify. If not provided, will use clipboard content",
             required=False
+        ),
+        PluginOption(
+            name="workers",
+            flags=["--workers", "-w"],
+            help="Concurrent requests when more than 10 variants are split into shards (default: 4)",
+            required=False
         )
     ],
     help_text="""
@@ -55,12 +61,15 @@ PLUGIN_DEFINITION = PluginDefinition(
 
     5: Dramatic changes that may invert or radically change meaning
 
+    Counts above 10 are split into shards of 10 variants that are generated concurrently (several per request on providers with multi-candidate sampling), de-duplicated and merged into one variants list.
+
     If no input text is provided, the content will be read from your clipboard. Results are returned in JSON format with the original substring and variants.
     """,
     examples=[
         "spout mutate --input 'The quick brown fox jumps over the lazy dog' --substring 'jumps over' --num_variants 3 --mutation_level 1",
         "spout mutate -i 'The scientist conducted groundbreaking research' -s 'conducted groundbreaking research' -n 2 -l 3",
         "spout mutate --input 'Hello world' --num_variants 2 --mutation_level 4  # modifies entire text",
-        "spout mutate -i 'Important meeting tomorrow' -n 3 -l 2  # generates 3 variants of entire text"
+        "spout mutate -i 'Important meeting tomorrow' -n 3 -l 2  # generates 3 variants of entire text",
+        "spout mutate -i 'A portrait by John Singer Sargent' -s 'John Singer Sargent' -n 60 -l 2 -w 6  # 60 variants in concurrent shards"
     ]
 )
\ No newline at end of file
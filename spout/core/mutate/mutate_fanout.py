@@ -0,0 +1,112 @@
+import math
+from typing import Dict, List, Optional
+
+from spout.shared.dedup_index import DedupIndex
+from spout.shared.json_response import parse_json_response
+
+# Variants asked for per request; larger counts run into max_tokens and start repeating
+SHARD_SIZE = 10
+# Completions per request where the provider samples several at once (OpenAI `n`)
+MAX_CANDIDATES = 4
+
+
+class MutateFanout:
+    """Produces a large number of mutate variants from concurrent shards.
+
+    The count is split into shards of `shard_size` variants. On providers with
+    multi-candidate sampling several shards share one request; elsewhere every shard
+    is its own request, and up to `workers` run at once, so the wall-clock time is
+    about that of one shard rather than of one long generation. Variants from all
+    shards are de-duplicated on their normalised text, and when duplicates leave the
+    set short further rounds ask only for the missing ones.
+    """
+
+    def __init__(self, handler, kernel, function, settings: Dict[str, str], target: int,
+                 shard_size: int = SHARD_SIZE, workers: int = 4, max_rounds: int = 3):
+        self.handler = handler
+        self.kernel = kernel
+        self.function = function
+        self.settings = settings
+        self.target = target
+        self.shard_size = max(shard_size, 1)
+        self.workers = max(workers, 1)
+        self.max_rounds = max_rounds
+        service = kernel.services["default"]
+        self.candidates = MAX_CANDIDATES if service.native_candidates else 1
+        # Exact matches only: a low-level mutation differs from its siblings and the original
+        # by a word or two, which near-duplicate matching would throw away
+        self.index = DedupIndex(threshold=None)
+        # The text being replaced is not a variant of itself
+        self.index.add(settings.get("substring", ""))
+        self.requests = 0
+        self.failed = 0
+
+    async def run_request(self, shards: int, shard_size: int) -> List[Dict]:
+        result = await self.handler.invoke_logged(
+            self.kernel,
+            self.function,
+            # Every shard should be a fresh sample, never a replay of an earlier one
+            refresh_cache=True,
+            coalesce=False,
+            candidates=shards,
+            num_variants=str(shard_size),
+            **self.settings
+        )
+        responses = []
+        for content in result.candidates:
+            try:
+                response = parse_json_response(content)
+            except ValueError:
+                continue
+            if isinstance(response.get("variants"), list):
+                responses.append(response)
+        if not responses:
+            raise ValueError("No response had a variants list")
+        return responses
+
+    def _requests(self, missing: int, overshoot: float):
+        """(shards, variants per shard) per request for one round"""
+        shard_size = min(self.shard_size, missing)
+        shards = math.ceil(missing * overshoot / shard_size)
+        while shards > 0:
+            count = min(self.candidates, shards)
+            yield count, shard_size
+            shards -= count
+
+    async def run(self) -> Dict:
+        """The first response's JSON with `variants` replaced by the merged, de-duplicated list"""
+        merged: Optional[Dict] = None
+        variants: List[str] = []
+        last_error = None
+
+        for round_number in range(self.max_rounds):
+            missing = self.target - len(variants)
+            if missing <= 0:
+                break
+            # Ask for a few extra to cover duplicates, more once a round has come up short
+            overshoot = 1.2 if round_number == 0 else 1.5
+            calls = ((self.run_request, {"shards": shards, "shard_size": size})
+                     for shards, size in self._requests(missing, overshoot))
+            added = 0
+            async for _, responses in self.kernel.invoke_many(calls, self.workers, ordered=False):
+                self.requests += 1
+                if isinstance(responses, BaseException):
+                    self.failed += 1
+                    last_error = responses
+                    continue
+                for response in responses:
+                    if merged is None:
+                        merged = response
+                    for variant in response["variants"]:
+                        variant = str(variant).strip()
+                        if len(variants) < self.target and variant and self.index.add(variant):
+                            variants.append(variant)
+                            added += 1
+            if not added:
+                break
+
+        if merged is None:
+            raise last_error or ValueError("No variants were generated")
+        merged = dict(merged)
+        merged["variants"] = variants
+        return merged
@@ -1,29 +1,35 @@
 import asyncio
+import json
 import sys
 
 import pyperclip
 
+from spout.core.mutate.mutate_fanout import SHARD_SIZE, MutateFanout
 from spout.shared.base_handler import BaseHandler
 
 
 class SpoutMutate(BaseHandler):
-    async def mutate(self, num_variants: str = "2", substring: str = "*", mutation_level: str = "1", input: str = None, spoutlet: str = None):
+    async def mutate(self, num_variants: str = "2", substring: str = "*", mutation_level: str = "1", input: str = None, spoutlet: str = None,
+                     workers: str = None):
         try:
             if not input:
-                input = pyperclip.paste()
+                input = await self.run_blocking(pyperclip.paste)
             if not substring or substring == "*":
                 substring = input
             elif isinstance(substring, str) and isinstance(input, str) and substring not in input:
                 substring = input
-                
-            result = await self.process_with_plugin(
-                plugin_name="Mutate",
-                input=input,
-                num_variants=num_variants,
-                substring=substring,
-                mutation_level=mutation_level,
-                spoutlet=spoutlet
-            )
+
+            if num_variants and str(num_variants).isdigit() and int(num_variants) > SHARD_SIZE:
+                result = await self.mutate_many(int(num_variants), substring, mutation_level, input, spoutlet, workers)
+            else:
+                result = await self.process_with_plugin(
+                    plugin_name="Mutate",
+                    input=input,
+                    num_variants=num_variants,
+                    substring=substring,
+                    mutation_level=mutation_level,
+                    spoutlet=spoutlet
+                )
             
             if 'python.exe' in sys.executable:
                 print(result)
@@ -33,6 +39,28 @@ class SpoutMutate(BaseHandler):
             self.show_error_popup(f"An error occurred: {str(e)}")
             sys.exit(1)
 
+    async def mutate_many(self, num_variants: int, substring: str, mutation_level: str, input: str,
+                          spoutlet: str = None, workers: str = None) -> str:
+        """Generate a large variant count in concurrent shards merged into one variants JSON"""
+        kernel, function = await self.load_plugin("Mutate", spoutlet)
+        fanout = MutateFanout(
+            self,
+            kernel,
+            function,
+            settings={"input": input, "substring": substring, "mutation_level": mutation_level},
+            target=num_variants,
+            workers=int(workers or "4"),
+        )
+        merged = await fanout.run()
+        if len(merged["variants"]) < num_variants:
+            print(f"Only {len(merged['variants'])} of {num_variants} variants were unique "
+                  f"after {fanout.requests} requests", file=sys.stderr)
+
+        output = json.dumps(merged, indent=2, ensure_ascii=False)
+        if self.interactive:
+            await self.run_blocking(pyperclip.copy, output)
+        return output
+
 if __name__ == "__main__":
     try:
         if len(sys.argv) > 3:
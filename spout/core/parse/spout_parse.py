@@ -16,7 +16,7 @@ class SpoutParse(BaseHandler):
             # Use provided input or fallback to clipboard
             if input is None:
                 try:
-                    input = pyperclip.paste()
+                    input = await self.run_blocking(pyperclip.paste)
                     if not input:
                         raise ValueError("No input provided and clipboard is empty")
                 except Exception as clip_error:
@@ -31,7 +31,7 @@ class SpoutParse(BaseHandler):
             
             # Copy result to clipboard first
             try:
-                pyperclip.copy(result)
+                await self.run_blocking(pyperclip.copy, result)
             except Exception as clip_error:
                 print(f"Warning: Could not copy to clipboard: {str(clip_error)}")
             
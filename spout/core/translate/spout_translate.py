@@ -9,7 +9,7 @@ from spout.shared.base_handler import BaseHandler
 class SpoutTranslate(BaseHandler):
     async def translate(self, specification: str, spoutlet: str = None, input: str = None):
         # Use provided text or fallback to clipboard
-        input = input or pyperclip.paste()
+        input = input or await self.run_blocking(pyperclip.paste)
         result = await self.process_with_plugin(
             plugin_name="Translate",
             input=input,
@@ -21,7 +21,7 @@ class SpoutTranslate(BaseHandler):
         if 'python.exe' in sys.executable:
             print(result)  # Print to console
         else:
-            pyperclip.copy(result)  # Copy to clipboard
+            await self.run_blocking(pyperclip.copy, result)  # Copy to clipboard
 
 if __name__ == "__main__":
     try:
@@ -1,7 +1,17 @@
-from .api_logging import APIMetricsLogger
-from .base_handler import BaseHandler
-from .connector import ConnectorEngine, ConnectorResult, ConnectorService
-from .plugin_options import PluginDefinition, PluginOption
-from .spout_base_functions import SpoutBaseFunctionHandler
+from .lazy import lazy_imports
 
-__all__ = ['ConnectorEngine', 'ConnectorService', 'ConnectorResult', 'APIMetricsLogger', 'BaseHandler', 'SpoutBaseFunctionHandler', 'PluginOption', 'PluginDefinition']
\ No newline at end of file
+# Imported on first access, so plugin definitions can load without the provider SDKs
+_LAZY_IMPORTS = {
+    'APIMetricsLogger': '.api_logging',
+    'BaseHandler': '.base_handler',
+    'ConnectorEngine': '.connector',
+    'ConnectorResult': '.connector',
+    'ConnectorService': '.connector',
+    'PluginDefinition': '.plugin_options',
+    'PluginOption': '.plugin_options',
+    'SpoutBaseFunctionHandler': '.spout_base_functions',
+}
+
+__all__ = ['ConnectorEngine', 'ConnectorService', 'ConnectorResult', 'APIMetricsLogger', 'BaseHandler', 'SpoutBaseFunctionHandler', 'PluginOption', 'PluginDefinition']
+
+__getattr__, __dir__ = lazy_imports(__name__, globals(), _LAZY_IMPORTS)
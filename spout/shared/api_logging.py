@@ -1,10 +1,29 @@
 import configparser
-import csv
 import hashlib
 import os
 import time
-from functools import wraps
+from functools import partial, wraps
 from pathlib import Path
+from types import SimpleNamespace
+
+from spout.shared.metrics_writer import get_metrics_writer
+
+# Columns of api_metrics.csv; new ones are only ever appended, so older logs are a prefix
+METRICS_HEADER = [
+    "Start Time",
+    "Duration(s)",
+    "Model Id",
+    "Skill Name",
+    "Input Tokens",
+    "Output Tokens",
+    "Input Hash",
+    "Output Hash",
+    "Cache",
+    "Time To First Token(s)",
+    "Tokens/s",
+    "Error",
+    "Attempt",
+]
 
 
 class APIMetricsLogger:
@@ -12,16 +31,9 @@ class APIMetricsLogger:
         # Get the config directory path
         self.config_dir = self._get_config_dir()
         self.filename = os.path.join(self.config_dir, filename)
-        self.header = [
-            "Start Time",
-            "Duration(s)",
-            "Model Id",
-            "Skill Name",
-            "Input Tokens",
-            "Output Tokens",
-            "Input Hash",
-            "Output Hash",
-        ]
+        self.header = list(METRICS_HEADER)
+        # Rows are buffered and appended by a background thread shared per file
+        self.writer = get_metrics_writer(self.filename, self.header)
 
     def _get_config_dir(self):
         """Get or create the config directory path"""
@@ -53,14 +65,13 @@ class APIMetricsLogger:
             return str(config_dir)
 
     def _write_row(self, row_data):
-        with open(self.filename, "a+", newline="") as file:
-            writer = csv.writer(file)
-            file.seek(0)
-            if not file.read(1):  # File is empty, write header
-                writer.writerow(self.header)
-            writer.writerow(row_data)
-
-    def log_api_call(
+        self.writer.write(row_data)
+
+    def flush(self):
+        """Wait until all logged calls have been written to the CSV"""
+        self.writer.flush()
+
+    def _format_row(
         self,
         start_time,
         duration,
@@ -70,6 +81,10 @@ class APIMetricsLogger:
         output_tokens,
         input_hash,
         output_hash,
+        cache_status=None,
+        time_to_first_token=None,
+        error=None,
+        attempt=None,
     ):
         formatted_start_time = time.strftime(
             "%Y-%m-%d %H:%M:%S", time.localtime(start_time)
@@ -83,14 +98,25 @@ class APIMetricsLogger:
             output_tokens,
             input_hash,
             output_hash,
+            cache_status or "",
+            "" if time_to_first_token is None else round(time_to_first_token, 3),
+            self._tokens_per_second(duration, output_tokens, time_to_first_token),
+            error or "",
+            attempt or "",
         ]
-        self._write_row(data_row)
+        return data_row
+
+    def log_api_call(self, *args, **kwargs):
+        self._write_row(self._format_row(*args, **kwargs))
 
     def log_kernel_invoke(self, func):
         @wraps(func)
         async def wrapper(*args, **kwargs):
             start_time = time.time()
-            model_id = skill_name = input_tokens = output_tokens = input_hash = output_hash = None
+            model_id = skill_name = input_hash = output_hash = None
+            result = inner_content = None
+            cache_status = time_to_first_token = error = None
+            attempts = []
 
             try:
                 input_text = str(kwargs)
@@ -98,41 +124,110 @@ class APIMetricsLogger:
 
                 result = await func(*args, **kwargs)
                 inner_content = self._get_inner_content(result)
-                if hasattr(result, "input_tokens") and hasattr(result, "output_tokens"):
-                    input_tokens, output_tokens = (
-                        result.input_tokens,
-                        result.output_tokens,
-                    )
-                else:
-                    input_tokens, output_tokens = self._get_token_counts(
-                        inner_content, kwargs
-                    )
                 model_id = self._get_model_id(result, inner_content)
                 skill_name = self._get_skill_name(result, args, kwargs)
 
+                cache_status = getattr(result, "cache_status", None)
+                time_to_first_token = getattr(result, "time_to_first_token", None)
+                attempts = getattr(result, "attempts", None) or []
+
                 output_text = str(inner_content)
                 output_hash = self._compute_hash(output_text, method="md5")
 
                 return result
             except Exception as e:
                 output_hash = self._compute_hash(str(e), method="md5")
+                # Failed calls are logged too, so error rates can be tracked per model and spoutlet
+                error = type(e).__name__
+                attempts = getattr(e, "attempts", None) or []
+                failed_call = self._describe_failed_call(func, args)
+                if failed_call is not None:
+                    model_id = failed_call.model
+                    skill_name = self._get_skill_name(failed_call, args, kwargs)
                 raise
             finally:
-                duration = time.time() - start_time
+                # Cache hits cost no provider time, so they are logged with zero duration
+                duration = 0 if cache_status == "hit" else time.time() - start_time
                 if model_id and model_id != "none":
-                    self.log_api_call(
-                        start_time,
-                        duration,
-                        model_id,
-                        skill_name,
-                        input_tokens,
-                        output_tokens,
-                        input_hash,
-                        output_hash,
-                    )
+                    attempt = self._log_attempts(attempts, error, model_id, skill_name, input_hash)
+                    row = (start_time, duration, model_id, skill_name, input_hash, output_hash,
+                           cache_status, time_to_first_token, error, attempt)
+                    # Token counts the provider did not report are computed locally,
+                    # so the row is built on the writer thread, off the request path
+                    self._write_row(partial(self._result_row, result, inner_content, kwargs, row))
 
         return wrapper
 
+    def _log_attempts(self, attempts, error, model_id, skill_name, input_hash):
+        """Write a row for each retried or abandoned attempt; return the label of the one the call row is for"""
+        failed = [attempt for attempt in attempts if attempt.error]
+        if error:
+            # The call row reports the attempt whose error was raised
+            final = failed.pop() if failed else None
+        else:
+            answered = [attempt for attempt in attempts if not attempt.error]
+            final = answered[-1] if answered else None
+        for attempt in failed:
+            # "<label> failed" / "<label> cancelled" tell spout stats these are not calls of their own
+            outcome = "cancelled" if attempt.error == "Cancelled" else "failed"
+            self._write_row(self._format_row(
+                attempt.start, attempt.duration, model_id, skill_name, "", "", input_hash,
+                self._compute_hash(attempt.error, method="md5"), error=attempt.error,
+                attempt=f"{attempt.label} {outcome}",
+            ))
+        return final.label if final else None
+
+    def _result_row(self, result, inner_content, kwargs, row):
+        (start_time, duration, model_id, skill_name, input_hash, output_hash, cache_status,
+         time_to_first_token, error, attempt) = row
+        try:
+            if error:
+                input_tokens = output_tokens = ""
+            elif hasattr(result, "input_tokens") and hasattr(result, "output_tokens"):
+                input_tokens, output_tokens = result.input_tokens, result.output_tokens
+            else:
+                input_tokens, output_tokens = self._get_token_counts(inner_content, kwargs)
+        except Exception:
+            input_tokens = output_tokens = None
+
+        return self._format_row(
+            start_time,
+            duration,
+            model_id,
+            skill_name,
+            input_tokens,
+            output_tokens,
+            input_hash,
+            output_hash,
+            cache_status,
+            time_to_first_token,
+            error,
+            attempt,
+        )
+
+    def _describe_failed_call(self, func, args):
+        """Model and spoutlet of a call that raised, taken from the engine and the spoutlet function"""
+        function = args[0] if args else None
+        config = getattr(function, "config", None)
+        services = getattr(getattr(func, "__self__", None), "services", {})
+        if not isinstance(config, dict) or "default" not in services:
+            return None
+        return SimpleNamespace(
+            model=services["default"].model,
+            skill_name=config.get("skill_name"),
+            plugin_name=config.get("plugin_name"),
+            source=config.get("source"),
+        )
+
+    def _tokens_per_second(self, duration, output_tokens, time_to_first_token=None):
+        """Generation rate; for streamed calls the wait for the first token is excluded"""
+        if not isinstance(output_tokens, int) or not duration:
+            return ""
+        generation_time = duration
+        if time_to_first_token is not None and duration > time_to_first_token:
+            generation_time = duration - time_to_first_token
+        return round(output_tokens / generation_time, 1)
+
     def _get_inner_content(self, result):
         if hasattr(result, "get_inner_content"):
             return result.get_inner_content()
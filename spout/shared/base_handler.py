@@ -1,13 +1,17 @@
+import asyncio
 import configparser
-import tkinter as tk
+import contextvars
+import functools
+import sys
 from pathlib import Path
-from tkinter import messagebox
 from typing import Optional
 
 import pyperclip
 
 from spout.shared.api_logging import APIMetricsLogger
 from spout.shared.connector import ConnectorEngine, ConnectorService
+from spout.shared.rate_limiter import request_context
+from spout.shared.response_cache import get_response_cache
 
 
 class BaseHandler:
@@ -16,6 +20,21 @@ class BaseHandler:
         self.api_metrics_logger = APIMetricsLogger()
         self.config_dir = self._get_config_dir()
         self.preferred_spoutlets = {}
+        # "use" the response cache, bypass it ("off") or "refresh" the cached entries
+        self.cache_mode = "use"
+        # Non-interactive runs (e.g. batch jobs) report errors on stderr and leave the clipboard alone
+        self.interactive = True
+        # Write completion tokens to stdout as they arrive (set by the CLI for single-call commands)
+        self.stream_output = False
+        # Model to use instead of PreferredModel (e.g. "fake" for offline runs)
+        self.model = None
+        # Name the rate limiter queues this handler's requests under (defaults to the plugin name)
+        self.caller = None
+
+    @property
+    def priority(self) -> str:
+        """Rate limiter priority class: non-interactive runs queue behind interactive calls"""
+        return "interactive" if self.interactive else "batch"
         
     def _get_config_dir(self):
         """Get or create the config directory path"""
@@ -39,7 +58,7 @@ class BaseHandler:
         with open(settings_path, "r", encoding="utf-8-sig") as settings_file:
             settings.read_file(settings_file)
 
-        preferred_model = model if model else settings.get("General", "PreferredModel", fallback="gpt-3.5-turbo")
+        preferred_model = model or self.model or settings.get("General", "PreferredModel", fallback="gpt-3.5-turbo")
         
         # Get preferred spoutlets for each module from settings
         self.preferred_spoutlets = {}
@@ -49,7 +68,8 @@ class BaseHandler:
             except configparser.Error:
                 self.preferred_spoutlets[module] = "default"
 
-        kernel = ConnectorEngine()
+        cache = get_response_cache() if self.cache_mode != "off" else None
+        kernel = ConnectorEngine(cache=cache, refresh_cache=self.cache_mode == "refresh")
         
         if "gpt" in preferred_model.lower() or "o1-" in preferred_model.lower():
             api_key = settings.get("OpenAI", "ApiKey", fallback="")
@@ -76,41 +96,78 @@ class BaseHandler:
         return kernel
 
     def show_error_popup(self, message: str):
+        if not self.interactive:
+            print(f"Error: {message}", file=sys.stderr)
+            return
+        # Only GUI runs get here, so the CLI never pays for importing tkinter
+        import tkinter as tk
+        from tkinter import messagebox
         root = tk.Tk()
         root.withdraw()
         messagebox.showerror("Error", message)
         root.destroy()
 
-    async def process_with_plugin(self, plugin_name: str, spoutlet: str = None, **kwargs):
+    async def run_blocking(self, func, *args):
+        """Run clipboard or file work in a worker thread.
+
+        Under `spout serve` every request shares one event loop, so blocking calls made
+        on it would stall the other clients. Like asyncio.to_thread, the call keeps the
+        request's context, so its output still reaches the right client.
+        """
+        context = contextvars.copy_context()
+        return await asyncio.get_running_loop().run_in_executor(None, functools.partial(context.run, func, *args))
+
+    def _write_chunk(self, chunk: str):
+        sys.stdout.write(chunk)
+        sys.stdout.flush()
+
+    async def load_plugin(self, plugin_name: str, spoutlet: str = None, model: Optional[str] = None):
+        """Return (kernel, spoutlet function), for handlers that invoke one spoutlet many times"""
+        kernel = await self.initialize_kernel(model)
+        
+        # Convert plugin_name and spoutlet to lowercase for consistency
+        plugin_name = plugin_name.lower()
+        self.caller = self.caller or plugin_name
+        requested_spoutlet = spoutlet.lower() if spoutlet else "default"
+        
+        # Determine base plugin directory
+        core_plugins = ["translate", "generate", "iterate", "mutate", "imagine", "converse", 
+                       "search", "parse", "evaluate", "enhance", "expand", "search", "reduce", "expand"]
+        base_dir = "core" if plugin_name in core_plugins else "addons"
+        
+        # Get the parent directory for this plugin
+        base_path = Path(__file__).resolve().parent.parent
+        parent_dir = str(base_path / base_dir / plugin_name)
+        
+        plugin = kernel.add_plugin(
+            parent_directory=parent_dir,
+            plugin_name=requested_spoutlet
+        )
+        return kernel, plugin[requested_spoutlet]
+
+    async def invoke_logged(self, kernel: ConnectorEngine, function, **kwargs):
+        """Invoke a spoutlet function loaded with load_plugin, recording it in api_metrics.csv"""
+        logged_invoke = self.api_metrics_logger.log_kernel_invoke(kernel.invoke)
+        with request_context(self.priority, self.caller):
+            return await logged_invoke(function, **kwargs)
+
+    async def process_with_plugin(self, plugin_name: str, spoutlet: str = None, stream: bool = False, **kwargs):
         try:
-            kernel = await self.initialize_kernel(kwargs.get('model'))
-            
-            # Convert plugin_name and spoutlet to lowercase for consistency
-            plugin_name = plugin_name.lower()
-            requested_spoutlet = spoutlet.lower() if spoutlet else "default"
-            
-            # Determine base plugin directory
-            core_plugins = ["translate", "generate", "iterate", "mutate", "imagine", "converse", 
-                           "search", "parse", "evaluate", "enhance", "expand", "search", "reduce", "expand"]
-            base_dir = "core" if plugin_name in core_plugins else "addons"
-            
-            # Get the parent directory for this plugin
-            base_path = Path(__file__).resolve().parent.parent
-            parent_dir = str(base_path / base_dir / plugin_name)
-            
-            plugin = kernel.add_plugin(
-                parent_directory=parent_dir,
-                plugin_name=requested_spoutlet
-            )
+            kernel, function = await self.load_plugin(plugin_name, spoutlet, kwargs.get('model'))
 
-            logged_invoke = self.api_metrics_logger.log_kernel_invoke(kernel.invoke)
-            result = await logged_invoke(plugin[requested_spoutlet], **kwargs)
+            if stream:
+                logged_invoke = self.api_metrics_logger.log_kernel_invoke(kernel.invoke_stream)
+                with request_context(self.priority, self.caller):
+                    result = await logged_invoke(function, self._write_chunk, **kwargs)
+                self._write_chunk("\n")
+            else:
+                result = await self.invoke_logged(kernel, function, **kwargs)
              
             output = str(result)
             
             # Only copy to clipboard if not in CLI mode
-            if not kwargs.get('is_cli', False):
-                pyperclip.copy(output)
+            if not kwargs.get('is_cli', False) and self.interactive:
+                await self.run_blocking(pyperclip.copy, output)
                 
             return output
 
@@ -0,0 +1,134 @@
+import hashlib
+import io
+import json
+import os
+from typing import Dict, Iterable, Iterator, Optional, Set, TextIO, Tuple
+
+from spout.shared.connector import ConnectorEngine
+from spout.shared.output_capture import capture_output, route_output
+
+
+class BatchRunner:
+    """Runs JSONL requests through the regular plugin handlers on a single event loop.
+
+    Each input line is an object such as
+        {"module": "reduce", "spoutlet": "namer", "parameters": {"input": "..."}}
+    and produces one JSONL result line with the same "line" number and optional "id".
+    """
+
+    def __init__(self, registry, concurrency: int = 8, ordered: bool = True,
+                 checkpoint_path: Optional[str] = None, cache_mode: str = "use"):
+        self.registry = registry
+        self.concurrency = concurrency
+        self.ordered = ordered
+        self.checkpoint_path = checkpoint_path
+        self.cache_mode = cache_mode
+        self.succeeded = 0
+        self.failed = 0
+        self.skipped = 0
+        self._line_hashes = {}
+
+    @staticmethod
+    def _line_hash(line: str) -> str:
+        return hashlib.md5(line.encode("utf-8")).hexdigest()[:8]
+
+    def _load_checkpoint(self) -> Set[Tuple[int, str]]:
+        """Read the (line number, line hash) pairs that already completed successfully"""
+        done = set()
+        if self.checkpoint_path and os.path.exists(self.checkpoint_path):
+            with open(self.checkpoint_path, "r", encoding="utf-8") as f:
+                for entry in f:
+                    number, _, line_hash = entry.strip().partition(":")
+                    if number.isdigit():
+                        done.add((int(number), line_hash))
+        return done
+
+    def _parse_request(self, request: Dict) -> Dict:
+        module = str(request.get("module", "")).lower()
+        plugin = self.registry.plugins.get(module) or self.registry.addon_plugins.get(module)
+        if not plugin:
+            raise ValueError(f"Unknown module '{module}'")
+
+        # Start from every option unset, as the CLI does, then apply the given parameters
+        kwargs = {option.name: None for option in plugin.options}
+        for name, value in request.get("parameters", {}).items():
+            kwargs[name.replace("-", "_")] = value
+        if request.get("input") is not None and kwargs.get("input") is None:
+            kwargs["input"] = request["input"]
+        if request.get("spoutlet"):
+            kwargs["spoutlet"] = request["spoutlet"]
+        return {"module": module, "kwargs": kwargs}
+
+    async def _execute(self, line_number: int, line: str) -> Dict:
+        """Run one request through its plugin handler and return the result record"""
+        record = {"line": line_number}
+        try:
+            request = json.loads(line)
+            if request.get("id") is not None:
+                record["id"] = request["id"]
+            parsed = self._parse_request(request)
+        except (ValueError, AttributeError) as e:
+            record["error"] = f"Invalid request: {str(e)}"
+            return record
+
+        record["module"] = parsed["module"]
+        record["spoutlet"] = parsed["kwargs"].get("spoutlet") or "default"
+
+        handler = self.registry.get_handler(parsed["module"])()
+        handler.cache_mode = self.cache_mode
+        handler.interactive = False
+        # Jobs of one batch file take their turn together in the rate limiter's queue
+        handler.caller = "batch"
+
+        # Handlers print their result (and errors) as well as returning it, so keep each call's output separate
+        stdout, stderr = io.StringIO(), io.StringIO()
+        try:
+            with capture_output(stdout, stderr):
+                result = await self.registry.execute_plugin(parsed["module"], handler, **parsed["kwargs"])
+            output = result if isinstance(result, str) else stdout.getvalue().strip()
+            record["output"] = output
+        except (Exception, SystemExit) as e:
+            message = stderr.getvalue().strip() or str(e)
+            record["error"] = message or "Plugin execution failed"
+        return record
+
+    def _requests(self, lines: Iterable[str], done: Set[Tuple[int, str]]) -> Iterator:
+        for line_number, line in enumerate(lines, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            line_hash = self._line_hash(line)
+            if (line_number, line_hash) in done:
+                self.skipped += 1
+                continue
+            self._line_hashes[line_number] = line_hash
+            yield self._execute, {"line_number": line_number, "line": line}
+
+    async def run(self, lines: Iterable[str], output: TextIO) -> Dict[str, int]:
+        """Execute every request in `lines`, streaming result lines to `output`"""
+        route_output()
+        done = self._load_checkpoint()
+        checkpoint = open(self.checkpoint_path, "a", encoding="utf-8") if self.checkpoint_path else None
+        requests = self._requests(lines, done)
+
+        try:
+            async for _, record in ConnectorEngine().invoke_many(requests, self.concurrency, self.ordered):
+                if isinstance(record, BaseException):
+                    record = {"error": str(record)}
+                output.write(json.dumps(record, ensure_ascii=False) + "\n")
+                output.flush()
+
+                line_hash = self._line_hashes.pop(record.get("line"), None)
+                if "error" in record:
+                    self.failed += 1
+                else:
+                    self.succeeded += 1
+                    # Only successes are checkpointed, so a rerun retries failed and unfinished lines
+                    if checkpoint:
+                        checkpoint.write(f"{record['line']}:{line_hash}\n")
+                        checkpoint.flush()
+        finally:
+            if checkpoint:
+                checkpoint.close()
+
+        return {"succeeded": self.succeeded, "failed": self.failed, "skipped": self.skipped}
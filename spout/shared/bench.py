@@ -0,0 +1,234 @@
+import io
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from spout.shared.api_logging import APIMetricsLogger
+from spout.shared.connector import ConnectorEngine
+from spout.shared.fake_provider import FakeProvider, set_fake_provider
+from spout.shared.output_capture import capture_output, route_output
+from spout.shared.spoutlet_index import get_spoutlet_index
+from spout.shared.test_runner import SharedSpoutletTester
+from spout.shared.token_counter import count_tokens
+
+# Pipeline stages in request order; end-to-end calls are reported as "e2e.<module>"
+STAGES = ["cli_cold_start", "registry_load", "initialize_kernel", "add_plugin", "prompt_render",
+          "token_count", "metrics_write", "e2e"]
+
+SPOUT_ROOT = Path(__file__).resolve().parent.parent
+SAMPLE_TEXT = ("Spout turns short instructions into structured model calls. " * 40).strip()
+
+
+def summarize(times: List[float]) -> Dict[str, float]:
+    """Median, p95, min and mean of timings in seconds, as milliseconds"""
+    ms = sorted(t * 1000 for t in times)
+    return {
+        "runs": len(ms),
+        "median_ms": round(statistics.median(ms), 4),
+        "p95_ms": round(ms[min(len(ms) - 1, int(len(ms) * 0.95))], 4),
+        "min_ms": round(ms[0], 4),
+        "mean_ms": round(statistics.fmean(ms), 4),
+    }
+
+
+def _time(function: Callable, runs: int) -> List[float]:
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return times
+
+
+async def _time_async(factory: Callable, runs: int) -> List[float]:
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        await factory()
+        times.append(time.perf_counter() - start)
+    return times
+
+
+class PipelineBench:
+    """Times each stage of a spout request separately, against the fake provider.
+
+    Provider calls go to a FakeProvider with a fixed `latency` (0 by default, so
+    end-to-end timings are Spout's own overhead), the response cache is bypassed, and
+    metrics rows go to a temporary CSV rather than api_metrics.csv.
+    """
+
+    def __init__(self, registry_factory: Callable, runs: int = 20, latency: float = 0.0,
+                 cold_start_runs: int = 5):
+        self.registry_factory = registry_factory
+        self.runs = max(runs, 1)
+        self.latency = latency
+        self.cold_start_runs = max(min(cold_start_runs, self.runs), 1)
+        self._registry = None
+        self._logger = None
+
+    @property
+    def registry(self):
+        if self._registry is None:
+            self._registry = self.registry_factory()
+        return self._registry
+
+    def bench_cli_cold_start(self) -> List[float]:
+        env = dict(os.environ, SPOUT_NO_SERVER="1")
+        command = [sys.executable, "-m", "spout.spout_cli", "--help"]
+
+        def run():
+            subprocess.run(command, env=env, cwd=str(SPOUT_ROOT.parent), capture_output=True, check=True)
+        return _time(run, self.cold_start_runs)
+
+    def bench_registry_load(self) -> List[float]:
+        return _time(self.registry_factory, self.runs)
+
+    async def bench_initialize_kernel(self) -> List[float]:
+        handler = self.registry.get_handler("reduce")()
+        handler.model = "fake"
+        return await _time_async(handler.initialize_kernel, self.runs)
+
+    def bench_add_plugin(self) -> List[float]:
+        kernel = ConnectorEngine()
+        parent = str(SPOUT_ROOT / "core" / "reduce")
+        return _time(lambda: kernel.add_plugin(parent, "default"), self.runs)
+
+    def bench_prompt_render(self) -> List[float]:
+        entry = get_spoutlet_index().get(str(SPOUT_ROOT / "core" / "reduce"), "default")
+        variables = {var["name"]: var.get("defaultValue") for var in entry.config.get("input_variables", [])}
+        variables["input"] = SAMPLE_TEXT
+        return _time(lambda: entry.template.render(variables), self.runs)
+
+    def bench_token_count(self) -> List[float]:
+        count_tokens(SAMPLE_TEXT)  # the first call loads the encoding
+        return _time(lambda: count_tokens(SAMPLE_TEXT), self.runs)
+
+    def bench_metrics_write(self) -> List[float]:
+        row = (time.time(), 0.5, "fake", "reduce:default", 100, 20, "abcd1234", "ef567890", "miss", 0.1, None)
+        times = _time(lambda: self._logger.log_api_call(*row), self.runs)
+        self._logger.flush()
+        return times
+
+    async def bench_module(self, module: str) -> List[float]:
+        """End-to-end handler calls with the module's first test case as input"""
+        tester = SharedSpoutletTester(module, registry=self.registry)
+        cases = tester._load_test_cases()["test_cases"]
+        kwargs = tester._build_kwargs(cases[0])
+
+        async def call():
+            handler = self.registry.get_handler(module)()
+            handler.model = "fake"
+            handler.cache_mode = "off"
+            handler.interactive = False
+            handler.api_metrics_logger = self._logger
+            stdout, stderr = io.StringIO(), io.StringIO()
+            with capture_output(stdout, stderr):
+                try:
+                    await self.registry.execute_plugin(module, handler, **dict(kwargs))
+                except SystemExit:
+                    # A handler that failed fast would look quick; report it instead of timing it
+                    raise RuntimeError(stderr.getvalue().strip() or "Handler exited") from None
+
+        await call()  # warm up imports and the spoutlet index
+        return await _time_async(call, self.runs)
+
+    def modules(self) -> List[str]:
+        """Modules with test cases to take end-to-end inputs from"""
+        names = sorted(list(self.registry.plugins) + list(self.registry.addon_plugins))
+        return [name for name in names
+                if SharedSpoutletTester(name, registry=self.registry).test_cases_path.exists()]
+
+    async def run(self, stages: Optional[List[str]] = None, modules: Optional[List[str]] = None) -> Dict:
+        stages = [stage for stage in STAGES if not stages or stage in stages]
+        results: Dict[str, Dict] = {}
+        workdir = tempfile.mkdtemp(prefix="spout-bench-")
+        # An absolute filename puts the metrics CSV outside the config directory
+        self._logger = APIMetricsLogger(os.path.join(workdir, "bench_metrics.csv"))
+        set_fake_provider(FakeProvider(latency=f"fixed:{self.latency}"))
+        route_output()
+        try:
+            for stage in stages:
+                if stage == "e2e":
+                    for module in modules or self.modules():
+                        results[f"e2e.{module}"] = await self._measure(lambda: self.bench_module(module))
+                    continue
+                results[stage] = await self._measure(getattr(self, f"bench_{stage}"))
+        finally:
+            # The next use reloads the configured fake provider from settings.ini
+            set_fake_provider(None)
+            self._logger.flush()
+            shutil.rmtree(workdir, ignore_errors=True)
+
+        return {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": sys.version.split()[0],
+            "runs": self.runs,
+            "latency": self.latency,
+            "stages": results,
+        }
+
+    @staticmethod
+    async def _measure(bench: Callable) -> Dict:
+        """Summary of one stage's timings, or its error so the other stages still run"""
+        try:
+            timings = bench()
+            if hasattr(timings, "__await__"):
+                timings = await timings
+            return summarize(timings)
+        except Exception as e:
+            return {"error": f"{type(e).__name__}: {e}"}
+
+
+def compare(results: Dict, baseline: Dict, threshold: float = 0.2,
+            stage_thresholds: Optional[Dict[str, float]] = None, min_delta_ms: float = 0.05) -> List[Dict]:
+    """Compare median timings with a baseline run.
+
+    A stage regresses when its median grew by more than its threshold (a ratio, e.g.
+    0.2 for 20%) and by more than min_delta_ms, so sub-microsecond noise in the fast
+    stages is not reported.
+    """
+    stage_thresholds = stage_thresholds or {}
+    rows = []
+    for stage, current in results.get("stages", {}).items():
+        previous = baseline.get("stages", {}).get(stage)
+        if not previous or "median_ms" not in previous or "median_ms" not in current:
+            continue
+        limit = stage_thresholds.get(stage, stage_thresholds.get(stage.split(".")[0], threshold))
+        delta = current["median_ms"] - previous["median_ms"]
+        change = delta / previous["median_ms"] if previous["median_ms"] else 0.0
+        rows.append({
+            "stage": stage,
+            "baseline_ms": previous["median_ms"],
+            "current_ms": current["median_ms"],
+            "change": round(change, 4),
+            "threshold": limit,
+            "regressed": change > limit and delta > min_delta_ms,
+        })
+    return rows
+
+
+def format_table(results: Dict, comparison: Optional[List[Dict]] = None) -> str:
+    compared = {row["stage"]: row for row in comparison or []}
+    lines = [f"{'stage':<22}{'median ms':>12}{'p95 ms':>12}{'baseline':>12}{'change':>9}"]
+    for stage, summary in results["stages"].items():
+        if "error" in summary:
+            lines.append(f"{stage:<22}  {summary['error']}")
+            continue
+        row = compared.get(stage)
+        baseline = f"{row['baseline_ms']:>12.3f}" if row else f"{'-':>12}"
+        change = f"{row['change']:>+8.0%}" if row else f"{'-':>8}"
+        flag = "  REGRESSED" if row and row["regressed"] else ""
+        lines.append(f"{stage:<22}{summary['median_ms']:>12.3f}{summary['p95_ms']:>12.3f}{baseline} {change}{flag}")
+    return "\n".join(lines)
+
+
+def load_results(path: str) -> Dict:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
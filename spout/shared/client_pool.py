@@ -0,0 +1,212 @@
+import asyncio
+import configparser
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Optional, Union
+
+if TYPE_CHECKING:
+    import anthropic
+    import google.ai.generativelanguage as glm
+    import openai
+    import replicate
+
+
+class ClientPool:
+    """Process-wide cache of provider clients keyed by (provider, api key, base_url).
+
+    Reusing a client keeps its HTTP connections alive between calls, so repeated
+    requests skip TCP and TLS setup. Each SDK is imported the first time a client
+    for that provider is requested. Async clients are bound to the event loop that
+    first used them, so a new one is built if the running loop changes and the one
+    it replaces is closed.
+
+    Connections are counted through httpx request hooks, which only the OpenAI and
+    Anthropic clients are built with; Gemini (gRPC) and Replicate calls are reported
+    as unmeasured instead.
+    """
+
+    def __init__(self):
+        self._clients = {}
+        self._lock = threading.Lock()
+        self._closing = set()
+        self._settings = None
+        self._executor = None
+        # Hooks fire on every loop and thread that sends a request
+        self._stats_lock = threading.Lock()
+        self.stats = {
+            "clients_created": 0,
+            "clients_reused": 0,
+            "connections_opened": 0,
+            "requests_sent": 0,
+        }
+        self._unmeasured = set()
+
+    def _get_settings(self) -> Dict[str, float]:
+        """Read connection tuning from the [Connections] section of settings.ini"""
+        if self._settings is None:
+            config = configparser.ConfigParser()
+            settings_path = Path(__file__).resolve().parent.parent / 'config' / 'settings.ini'
+            if settings_path.exists():
+                with open(settings_path, "r", encoding="utf-8-sig") as config_file:
+                    config.read_file(config_file)
+            self._settings = {
+                "max_connections": config.getint("Connections", "MaxConnections", fallback=100),
+                "max_keepalive": config.getint("Connections", "MaxKeepalive", fallback=20),
+                "keepalive_expiry": config.getfloat("Connections", "KeepaliveExpiry", fallback=30.0),
+                "warm_up": config.getboolean("Connections", "WarmUp", fallback=False),
+                "max_blocking_calls": config.getint("Connections", "MaxBlockingCalls", fallback=16),
+            }
+        return self._settings
+
+    def _limits(self, sdk):
+        # Build the limits with the SDK's own httpx flavour rather than importing one ourselves
+        settings = self._get_settings()
+        return type(sdk.DEFAULT_CONNECTION_LIMITS)(
+            max_connections=settings["max_connections"],
+            max_keepalive_connections=settings["max_keepalive"],
+            keepalive_expiry=settings["keepalive_expiry"],
+        )
+
+    def _count(self, stat: str) -> None:
+        with self._stats_lock:
+            self.stats[stat] += 1
+
+    def _count_event(self, event_name: str, info) -> None:
+        # httpcore reports "connection.connect_tcp.complete" (or _unix_socket) for each new socket
+        if event_name.startswith("connection.connect_") and event_name.endswith(".complete"):
+            self._count("connections_opened")
+
+    async def _count_event_async(self, event_name: str, info) -> None:
+        self._count_event(event_name, info)
+
+    def _on_request(self, request) -> None:
+        self._count("requests_sent")
+        request.extensions["trace"] = self._count_event
+
+    async def _on_request_async(self, request) -> None:
+        self._count("requests_sent")
+        request.extensions["trace"] = self._count_event_async
+
+    def _get_or_create(self, key: tuple, factory, loop=None):
+        with self._lock:
+            entry = self._clients.get(key)
+            if entry is not None and (loop is None or (entry["loop"] is loop and not loop.is_closed())):
+                self._count("clients_reused")
+                return entry["client"]
+            client = factory()
+            self._clients[key] = {"client": client, "loop": loop}
+            self._count("clients_created")
+        if entry is not None:
+            # Release the connections of the client built for an earlier event loop
+            task = asyncio.ensure_future(self._close(key[0], entry["client"]))
+            self._closing.add(task)
+            task.add_done_callback(self._closing.discard)
+        return client
+
+    @staticmethod
+    async def _close(provider: str, client) -> None:
+        try:
+            if provider == "gemini":
+                await client.transport.close()
+            elif provider == "replicate":
+                client._client.close()
+                await client._async_client.aclose()
+            else:
+                await client.close()
+        except Exception as e:
+            print(f"Warning: could not close a replaced {provider} client: {e}")
+
+    def get_openai(self, api_key: str, base_url: Optional[str] = None) -> "openai.AsyncOpenAI":
+        import openai
+        loop = asyncio.get_running_loop()
+
+        def factory():
+            http_client = openai.DefaultAsyncHttpxClient(
+                limits=self._limits(openai),
+                event_hooks={"request": [self._on_request_async]},
+            )
+            return openai.AsyncOpenAI(api_key=api_key, base_url=base_url, http_client=http_client)
+
+        return self._get_or_create(("openai", api_key, base_url), factory, loop)
+
+    def get_anthropic(self, api_key: str, base_url: Optional[str] = None) -> "anthropic.AsyncAnthropic":
+        import anthropic
+        loop = asyncio.get_running_loop()
+
+        def factory():
+            http_client = anthropic.DefaultAsyncHttpxClient(
+                limits=self._limits(anthropic),
+                event_hooks={"request": [self._on_request_async]},
+            )
+            return anthropic.AsyncAnthropic(api_key=api_key, base_url=base_url, http_client=http_client)
+
+        return self._get_or_create(("anthropic", api_key, base_url), factory, loop)
+
+    def get_replicate(self, api_key: str, base_url: Optional[str] = None) -> "replicate.Client":
+        import replicate
+        loop = asyncio.get_running_loop()
+
+        def factory():
+            # Leave the SDK's default endpoint alone unless one was configured
+            return replicate.Client(api_token=api_key, **({"base_url": base_url} if base_url else {}))
+
+        # The SDK builds its own httpx clients, without our request hooks
+        self._unmeasured.add("replicate")
+        return self._get_or_create(("replicate", api_key, base_url), factory, loop)
+
+    def get_gemini(self, api_key: str) -> "glm.GenerativeServiceAsyncClient":
+        """The generative service client for one API key; requests are built with glm directly.
+
+        genai.configure() would switch the key of every model in the process, so each key
+        gets a client of its own.
+        """
+        import google.ai.generativelanguage as glm
+        loop = asyncio.get_running_loop()
+        factory = functools.partial(glm.GenerativeServiceAsyncClient, client_options={"api_key": api_key})
+        # gRPC channels have no request hooks to count connections with
+        self._unmeasured.add("gemini")
+        return self._get_or_create(("gemini", api_key, None), factory, loop)
+
+    async def run_blocking(self, func, *args, **kwargs):
+        """Run a synchronous SDK call on a bounded thread pool so the event loop keeps going"""
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self._get_settings()["max_blocking_calls"],
+                        thread_name_prefix="spout-provider",
+                    )
+        return await asyncio.get_running_loop().run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+
+    async def warm_up(self, provider: str, api_key: str, base_url: Optional[str] = None) -> None:
+        """Open a connection ahead of the first request so it does not pay for the handshake"""
+        if provider == "openai":
+            client = self.get_openai(api_key, base_url)
+            http_client, url = client._client, str(client.base_url)
+        elif provider == "anthropic":
+            client = self.get_anthropic(api_key, base_url)
+            http_client, url = client._client, str(client.base_url)
+        else:
+            return
+
+        try:
+            await http_client.head(url)
+        except Exception as e:
+            print(f"Warning: connection warm-up for {provider} failed: {e}")
+
+    def should_warm_up(self) -> bool:
+        return self._get_settings()["warm_up"]
+
+    def connection_stats(self) -> Dict[str, Union[int, List[str]]]:
+        """Counters for the OpenAI and Anthropic clients, plus the providers used that are not counted"""
+        with self._stats_lock:
+            stats = dict(self.stats)
+        stats["connections_reused"] = max(stats["requests_sent"] - stats["connections_opened"], 0)
+        stats["unmeasured"] = sorted(self._unmeasured)
+        return stats
+
+
+# Shared by every ConnectorService in the process
+CLIENT_POOL = ClientPool()
@@ -1,103 +1,226 @@
-import configparser
+import asyncio
+import copy
 import json
-import os
-import re
+import time
 from functools import partial
-from pathlib import Path
-from typing import Any, Callable, Dict
+from typing import Any, Callable, Dict, Iterable, List, Optional
 
-import anthropic
-import google.generativeai as genai
-import openai  # Add this import
-import replicate
-import tiktoken
+from spout.shared.client_pool import CLIENT_POOL
+from spout.shared.fake_provider import get_fake_provider
+from spout.shared.rate_limiter import RATE_LIMITS
+from spout.shared.response_cache import ResponseCache
+from spout.shared.retry_policy import get_retry_policy
+from spout.shared.spoutlet_index import PromptTemplate, get_spoutlet_index
+from spout.shared.token_counter import count_tokens, estimate_tokens, get_encoding
+
+# Provider SDKs are imported inside the methods that need them, so a process only
+# pays for the backend of the model it actually uses.
+
+def get_provider(model: str) -> str:
+    """Map a model name to the provider backend that serves it"""
+    model = model.lower()
+    if model == 'fake' or model.startswith('fake-'):
+        return 'fake'
+    elif 'gemini' in model:
+        return 'gemini'
+    elif 'claude' in model:
+        return 'anthropic'
+    elif 'gpt' in model or 'o1-' in model or 'deepseek' in model:
+        return 'openai'
+    return 'replicate'
+
+
+def get_tiktoken_encoding():
+    """Shared encoding for TokenCountModel; see spout.shared.token_counter"""
+    return get_encoding()
+
+
+def _usage_counts(usage, input_attr: str, output_attr: str):
+    """Token counts reported by the provider, or (None, None) to count locally later"""
+    if usage is None:
+        return None, None
+    return getattr(usage, input_attr, None), getattr(usage, output_attr, None)
+
+
+# Provider calls in progress, shared by every engine in the process so identical
+# concurrent requests from different handlers make one call
+_IN_FLIGHT: Dict[tuple, "asyncio.Future"] = {}
 
 
 class ConnectorEngine:
-    def __init__(self):
+    def __init__(self, cache=None, refresh_cache: bool = False, coalesce: bool = True):
         self.plugins = {}
         self.services = {}
+        # Optional ResponseCache consulted before every completion
+        self.cache = cache
+        self.refresh_cache = refresh_cache
+        # Join an identical request already in flight instead of making another provider call;
+        # a spoutlet opts out with "coalesce": false in config.json, a call with coalesce=False
+        self.coalesce = coalesce
 
     def add_plugin(
         self, parent_directory: str, plugin_name: str
     ) -> Dict[str, Callable]:
-        plugin_functions = {}
-        
         # Convert plugin_name to lowercase for consistency
         plugin_name = plugin_name.lower()
-        
-        # Get the base directory name (e.g., 'reduce')
-        base_name = os.path.basename(parent_directory)
-        parent_dir = os.path.dirname(parent_directory)
-        
-        # Check each plugin directory in order of precedence
-        for suffix in ["local", "pro", "plugins"]:
-            plugin_dir = os.path.join(parent_dir, base_name, f"{base_name}_{suffix}")
-            
-            if os.path.exists(plugin_dir):
-                spoutlet_dir = os.path.join(plugin_dir, plugin_name)
-                
-                if os.path.exists(spoutlet_dir):
-                    # Find all JSON and TXT files
-                    json_files = [f for f in os.listdir(spoutlet_dir) if f.endswith('.json')]
-                    txt_files = [f for f in os.listdir(spoutlet_dir) if f.endswith('.txt')]
-                    
-                    # Check for required files and warn about extras
-                    if not json_files or not txt_files:
-                        continue  # Skip if missing required files
-                    
-                    if len(json_files) > 1 or len(txt_files) > 1:
-                        print(f"Warning: Multiple JSON or TXT files found in {spoutlet_dir}. Using first files found.")
-                    
-                    config_path = os.path.join(spoutlet_dir, json_files[0])
-                    prompt_path = os.path.join(spoutlet_dir, txt_files[0])
-                    
-                    with open(config_path, "r") as config_file:
-                        config = json.load(config_file)
-                        config["plugin_name"] = base_name
-                        config["skill_name"] = plugin_name
-                        # Add source information
-                        config["source"] = suffix  # Store where we found the spoutlet
-                        
-                    with open(prompt_path, "r") as prompt_file:
-                        prompt = prompt_file.read()
-
-                    plugin_functions[plugin_name] = partial(
-                        self._run_function, config, prompt, plugin_name
-                    )
-                    break
 
-        if not plugin_functions:
-            raise FileNotFoundError(f"Plugin {plugin_name} not found in any directory")
+        # Resolved local > pro > plugins and cached across calls by the spoutlet index
+        entry = get_spoutlet_index().get(parent_directory, plugin_name)
+        plugin_functions = {
+            plugin_name: self.spoutlet_function(entry.config, entry.template, plugin_name)
+        }
 
         self.plugins[plugin_name] = plugin_functions
         return plugin_functions
 
+    def spoutlet_function(self, config: Dict[str, Any], template: PromptTemplate, skill_name: str):
+        """The callable add_plugin registers, with the spoutlet's .config and .template on it"""
+        function = partial(self._run_function, config, template, skill_name)
+        # Read by callers that size requests to the spoutlet, e.g. iterate's BatchSizer
+        function.config = config
+        function.template = template
+        return function
+
     def add_service(self, service):
         self.services[service.service_id] = service
 
     async def _run_function(
-        self, config: Dict[str, Any], prompt: str, skill_name: str, **kwargs
+        self, config: Dict[str, Any], prompt: PromptTemplate, skill_name: str,
+        on_chunk: Optional[Callable[[str], None]] = None, refresh_cache: bool = False,
+        candidates: int = 1, settings: Optional[Dict[str, Any]] = None, coalesce: bool = True, **kwargs
     ):
         service = self.services.get("default")
         if not service:
             raise ValueError("No default service configured")
 
         execution_settings = config.get("execution_settings", {}).get("default", {})
+        if settings:
+            # Per-call overrides of the spoutlet's execution settings, e.g. a higher temperature
+            execution_settings = {**execution_settings, **settings}
         input_variables = {
             var["name"]: kwargs.get(var["name"], var.get("defaultValue"))
             for var in config.get("input_variables", [])
         }
 
-        def replace_var(match):
-            var_name = match.group(1)
-            return str(input_variables.get(var_name, match.group(0)))
-
-        formatted_prompt = re.sub(r"\{\{\$(.*?)\}\}", replace_var, prompt)
+        formatted_prompt = prompt.render(input_variables)
+
+        if candidates > 1:
+            return await self._run_candidates(
+                config, service, formatted_prompt, skill_name, candidates, execution_settings, refresh_cache
+            )
+
+        cache_key = None
+        if self.cache and self.cache.accepts(config, execution_settings):
+            cache_key = self.cache.make_key(service.model, formatted_prompt, execution_settings)
+            # refresh_cache lets a caller retry past a cached response it could not use
+            cached = None if self.refresh_cache or refresh_cache else self.cache.get(cache_key)
+            if cached:
+                if on_chunk:
+                    on_chunk(cached["content"])
+                return ConnectorResult(
+                    cached["content"],
+                    model=service.model,
+                    skill_name=skill_name,
+                    input_tokens=cached["input_tokens"],
+                    output_tokens=cached["output_tokens"],
+                    plugin_name=config["plugin_name"],
+                    source=config.get("source"),
+                    cache_status="hit",
+                    prompt=formatted_prompt
+                )
+
+        flight_key = None
+        if self._may_coalesce(config, coalesce, refresh_cache):
+            flight_key = self._flight_key(service.model, formatted_prompt, execution_settings)
+            leader = _IN_FLIGHT.get(flight_key)
+            if leader is not None:
+                try:
+                    result = await asyncio.shield(leader)
+                except asyncio.CancelledError:
+                    if not leader.cancelled():
+                        raise
+                    # The caller that made the request went away; make our own
+                    leader = None
+                if leader is not None:
+                    if on_chunk:
+                        on_chunk(result.content)
+                    # A result of its own, so each caller's metrics row says it shared a request
+                    shared = copy.copy(result)
+                    shared.cache_status = "coalesced"
+                    shared.attempts = []
+                    return shared
+
+        if flight_key is None:
+            return await self._complete(config, service, formatted_prompt, skill_name, execution_settings,
+                                        cache_key, on_chunk)
+
+        future = asyncio.get_running_loop().create_future()
+        _IN_FLIGHT[flight_key] = future
+        try:
+            result = await self._complete(config, service, formatted_prompt, skill_name, execution_settings,
+                                          cache_key, on_chunk)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark it retrieved, so a request without waiters does not log "exception never retrieved"
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+        finally:
+            if _IN_FLIGHT.get(flight_key) is future:
+                del _IN_FLIGHT[flight_key]
+        return result
+
+    def _may_coalesce(self, config: Dict[str, Any], coalesce: bool, refresh_cache: bool) -> bool:
+        """Whether this request may share a provider call with an identical one in flight.
+
+        On unless the engine, the spoutlet ("coalesce": false) or the caller (coalesce=False,
+        e.g. fan-out shards that send one prompt several times for different samples) opts
+        out; a refresh always asks for a completion of its own.
+        """
+        return (self.coalesce and coalesce and config.get("coalesce", True)
+                and not (self.refresh_cache or refresh_cache))
+
+    @staticmethod
+    def _flight_key(model: str, formatted_prompt: str, execution_settings: Dict[str, Any]) -> tuple:
+        # Futures belong to one event loop, so identical requests on different loops are not shared
+        return id(asyncio.get_running_loop()), ResponseCache.make_key(model, formatted_prompt, execution_settings)
+
+    async def _complete(
+        self, config: Dict[str, Any], service: "ConnectorService", formatted_prompt: str, skill_name: str,
+        execution_settings: Dict[str, Any], cache_key: Optional[str], on_chunk: Optional[Callable[[str], None]]
+    ):
+        """One provider call for _run_function, stored in the response cache when cache_key is set"""
+        time_to_first_token = None
+        attempts = []
+        try:
+            if on_chunk:
+                start_time = time.perf_counter()
+
+                def record_chunk(chunk: str):
+                    nonlocal time_to_first_token
+                    if time_to_first_token is None:
+                        time_to_first_token = time.perf_counter() - start_time
+                    on_chunk(chunk)
+
+                content, input_tokens, output_tokens = await service.complete_stream(
+                    formatted_prompt, record_chunk, attempts=attempts, **execution_settings
+                )
+            else:
+                content, input_tokens, output_tokens = await service.complete(
+                    formatted_prompt, attempts=attempts, **execution_settings
+                )
+        except Exception as e:
+            # The metrics logger writes a row for each failed attempt
+            e.attempts = attempts
+            raise
 
-        content, input_tokens, output_tokens = await service.complete(
-            formatted_prompt, **execution_settings
-        )
+        if cache_key:
+            # Unreported counts are stored as NULL and counted when a hit needs them
+            self.cache.put(cache_key, service.model, content, input_tokens, output_tokens)
         
         return ConnectorResult(
             content,
@@ -106,12 +229,123 @@ class ConnectorEngine:
             input_tokens=input_tokens,
             output_tokens=output_tokens,
             plugin_name=config["plugin_name"],
-            source=config.get("source")
+            source=config.get("source"),
+            cache_status="miss" if cache_key else None,
+            time_to_first_token=time_to_first_token,
+            prompt=formatted_prompt,
+            attempts=attempts
+        )
+
+    async def _run_candidates(
+        self, config: Dict[str, Any], service: "ConnectorService", formatted_prompt: str, skill_name: str,
+        candidates: int, execution_settings: Dict[str, Any], refresh_cache: bool
+    ):
+        """Sample `candidates` completions of one prompt; they are on the result's .candidates"""
+        cache_key = None
+        if self.cache and self.cache.accepts(config, execution_settings):
+            cache_key = self.cache.make_key(
+                service.model, formatted_prompt, {**execution_settings, "candidates": candidates}
+            )
+            cached = None if self.refresh_cache or refresh_cache else self.cache.get(cache_key)
+            if cached:
+                contents = json.loads(cached["content"])
+                return ConnectorResult(
+                    contents[0],
+                    model=service.model,
+                    skill_name=skill_name,
+                    input_tokens=cached["input_tokens"],
+                    output_tokens=cached["output_tokens"],
+                    plugin_name=config["plugin_name"],
+                    source=config.get("source"),
+                    cache_status="hit",
+                    prompt=formatted_prompt,
+                    candidates=contents
+                )
+
+        attempts = []
+        try:
+            contents, input_tokens, output_tokens = await service.complete_candidates(
+                formatted_prompt, candidates, attempts=attempts, **execution_settings
+            )
+        except Exception as e:
+            e.attempts = attempts
+            raise
+        if cache_key:
+            self.cache.put(cache_key, service.model, json.dumps(contents), input_tokens, output_tokens)
+
+        result = ConnectorResult(
+            contents[0],
+            model=service.model,
+            skill_name=skill_name,
+            input_tokens=input_tokens,
+            output_tokens=output_tokens,
+            plugin_name=config["plugin_name"],
+            source=config.get("source"),
+            cache_status="miss" if cache_key else None,
+            prompt=formatted_prompt,
+            candidates=contents,
+            attempts=attempts
         )
+        if output_tokens is None:
+            result.output_tokens = sum(count_tokens(content) for content in contents)
+        return result
 
     async def invoke(self, function, **kwargs):
         return await function(**kwargs)
 
+    async def invoke_stream(self, function, on_chunk: Callable[[str], None], **kwargs):
+        """Like invoke, but hands each piece of the completion to on_chunk as it arrives"""
+        return await function(on_chunk=on_chunk, **kwargs)
+
+    def stream(self, function, **kwargs) -> "ConnectorStream":
+        """Async iterator over completion chunks; the ConnectorResult is on .result afterwards"""
+        return ConnectorStream(self, function, kwargs)
+
+    async def invoke_many(self, calls: Iterable, concurrency: int = 8, ordered: bool = True):
+        """Invoke many (function, kwargs) pairs with at most `concurrency` running at once.
+
+        Yields (index, result) pairs in input order, or as they finish when ordered is
+        False. A failed call yields its exception instead of a result. `calls` is consumed
+        lazily, so it can be a generator over a large input.
+        """
+        async def run(index, function, kwargs):
+            try:
+                return index, await function(**kwargs)
+            except (Exception, SystemExit) as e:
+                return index, e
+
+        calls = enumerate(calls)
+        pending = set()
+        buffered = {}
+        next_index = 0
+        exhausted = False
+        # Bound how far ahead of a slow call ordered mode may run
+        max_buffered = concurrency * 4
+
+        while True:
+            while not exhausted and len(pending) < concurrency and len(buffered) < max_buffered:
+                try:
+                    index, (function, kwargs) = next(calls)
+                except StopIteration:
+                    exhausted = True
+                    break
+                pending.add(asyncio.ensure_future(run(index, function, kwargs)))
+
+            if not pending:
+                break
+
+            finished, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in finished:
+                index, result = task.result()
+                if ordered:
+                    buffered[index] = result
+                else:
+                    yield index, result
+
+            while next_index in buffered:
+                yield next_index, buffered.pop(next_index)
+                next_index += 1
+
 
 class ConnectorService:
     def __init__(self, service_id: str, model: str, api_token: str, org_id: str = None, base_url: str = None):
@@ -119,49 +353,192 @@ class ConnectorService:
         self.model = model
         self.api_token = api_token
         self.base_url = base_url
-        self.encoding = self._get_tiktoken_encoding()
+        self.provider = get_provider(model)
         
-        # Initialize service clients
-        if 'gemini' in model.lower():
-            genai.configure(api_key=api_token)
-        elif 'claude' in model.lower():
-            self.anthropic_client = anthropic.Anthropic(api_key=api_token)
-        elif 'gpt' in model.lower() or 'o1-' in model.lower() or 'deepseek' in model.lower():
+        # Clients come from the process-wide pool so their connections are reused
+        if self.provider == 'openai':
+            import openai
             openai.api_key = api_token
             if org_id:  # Set organization ID if provided
                 openai.organization = org_id
 
-    def _get_tiktoken_encoding(self):
-        config = configparser.ConfigParser()
-        project_root = Path(__file__).resolve().parent.parent
-        settings_path = project_root / 'config' / 'settings.ini'
-        
-        # Create config directory if it doesn't exist
-        settings_path.parent.mkdir(parents=True, exist_ok=True)
-        
-        if not settings_path.exists():
-            # Create empty settings file if it doesn't exist
-            settings_path.write_text('')
-        
-        with open(settings_path, "r", encoding="utf-8-sig") as config_file:
-            config.read_file(config_file)
-        token_model = config.get("General", "TokenCountModel", fallback="gpt-3.5-turbo")
-        return tiktoken.encoding_for_model(token_model)
+    @property
+    def encoding(self):
+        # Loaded on first use; completions take token counts from the provider's usage instead
+        return get_tiktoken_encoding()
+
+    async def warm_up(self):
+        await CLIENT_POOL.warm_up(self.provider, self.api_token, self.base_url)
 
-    async def complete(self, prompt: str, **kwargs):
+    @property
+    def rate_limiter(self):
+        return RATE_LIMITS.get(self.provider, self.model)
+
+    @staticmethod
+    def estimate_cost(prompt: str, candidates: int = 1, **kwargs) -> int:
+        """Tokens a request may use: the rendered prompt plus max_tokens per completion"""
         try:
-            if 'gemini' in self.model.lower():
-                return await self._complete_with_gemini(prompt, **kwargs)
-            elif 'claude' in self.model.lower():
-                return await self._complete_with_anthropic(prompt, **kwargs)
-            elif 'gpt' in self.model.lower() or 'o1-' in self.model.lower() or 'deepseek' in self.model.lower():
-                return await self._complete_with_openai(prompt, **kwargs)
-            else:
-                return await self._complete_with_llm(prompt, **kwargs)
+            max_tokens = int(kwargs.get("max_tokens") or 1000)
+        except (TypeError, ValueError):
+            max_tokens = 1000
+        return estimate_tokens(prompt) + max_tokens * candidates
+
+    @staticmethod
+    def _used_tokens(result) -> Optional[int]:
+        _, input_tokens, output_tokens = result
+        if input_tokens is None or output_tokens is None:
+            return None
+        return input_tokens + output_tokens
+
+    async def _send(self, prompt: str, cost: int, call: Callable, timeout: Optional[float]):
+        """One rate-limited provider request, settled against the limiter however it ends"""
+        limiter = self.rate_limiter
+        await limiter.acquire(cost)
+        try:
+            result = await asyncio.wait_for(call(), timeout)
+        except BaseException:
+            # Failed, timed out or a cancelled hedge: the prompt was sent but nothing was generated
+            limiter.settle(cost, estimate_tokens(prompt))
+            raise
+        limiter.settle(cost, self._used_tokens(result))
+        return result
+
+    async def complete(self, prompt: str, attempts: Optional[list] = None, **kwargs):
+        """Complete a prompt under the retry policy; each provider request is appended to `attempts`"""
+        limiter = self.rate_limiter
+        cost = self.estimate_cost(prompt, **kwargs)
+
+        def request(timeout: Optional[float]):
+            return self._send(prompt, cost, partial(self._complete_unlimited, prompt, **kwargs), timeout)
+
+        try:
+            # A hedge adds load, so none while the rate limiter is already holding requests back
+            return await get_retry_policy().call(request, self.model, attempts, hedge=not limiter.queue_depth)
         except Exception as e:
             print(f"Error in complete method: {str(e)}")
             raise
 
+    async def _complete_unlimited(self, prompt: str, **kwargs):
+        # "fake" models, and every model while a cassette is replayed, are served offline
+        fake = get_fake_provider()
+        start_time = time.perf_counter()
+        if self.provider == 'fake' or fake.replaying:
+            return await fake.complete(self.model, prompt, **kwargs)
+        elif self.provider == 'gemini':
+            result = await self._complete_with_gemini(prompt, **kwargs)
+        elif self.provider == 'anthropic':
+            result = await self._complete_with_anthropic(prompt, **kwargs)
+        elif self.provider == 'openai':
+            result = await self._complete_with_openai(prompt, **kwargs)
+        else:
+            result = await self._complete_with_llm(prompt, **kwargs)
+
+        if fake.recording:
+            fake.cassette.record(self.model, prompt, *result, time.perf_counter() - start_time)
+        return result
+
+    async def complete_stream(self, prompt: str, on_chunk: Callable[[str], None],
+                              attempts: Optional[list] = None, **kwargs):
+        """Streaming variant of complete: on_chunk receives text as the provider produces it"""
+        cost = self.estimate_cost(prompt, **kwargs)
+        streamed = False
+
+        def record_chunk(chunk: str):
+            nonlocal streamed
+            streamed = True
+            on_chunk(chunk)
+
+        def request(timeout: Optional[float]):
+            return self._send(prompt, cost, partial(self._stream_unlimited, prompt, record_chunk, **kwargs), timeout)
+
+        try:
+            # Text already shown cannot be taken back, so a stream is only retried before its first chunk
+            return await get_retry_policy().call(request, self.model, attempts, hedge=False,
+                                                 can_retry=lambda: not streamed)
+        except Exception as e:
+            print(f"Error in complete_stream method: {str(e)}")
+            raise
+
+    async def _stream_unlimited(self, prompt: str, on_chunk: Callable[[str], None], **kwargs):
+        fake = get_fake_provider()
+        start_time = time.perf_counter()
+        time_to_first_token = None
+        if fake.recording:
+            stream_chunk = on_chunk
+
+            def on_chunk(chunk: str):
+                nonlocal time_to_first_token
+                if time_to_first_token is None:
+                    time_to_first_token = time.perf_counter() - start_time
+                stream_chunk(chunk)
+
+        if self.provider == 'fake' or fake.replaying:
+            return await fake.complete(self.model, prompt, on_chunk=on_chunk, **kwargs)
+        elif self.provider == 'gemini':
+            result = await self._stream_with_gemini(prompt, on_chunk, **kwargs)
+        elif self.provider == 'anthropic':
+            result = await self._stream_with_anthropic(prompt, on_chunk, **kwargs)
+        elif self.provider == 'openai':
+            result = await self._stream_with_openai(prompt, on_chunk, **kwargs)
+        else:
+            result = await self._stream_with_llm(prompt, on_chunk, **kwargs)
+
+        if fake.recording:
+            fake.cassette.record(self.model, prompt, *result, time.perf_counter() - start_time, time_to_first_token)
+        return result
+
+    @property
+    def native_candidates(self) -> bool:
+        """Whether one request can return several completions (OpenAI's `n`)"""
+        # Cassettes hold one completion per prompt, so recording and replaying sample one at a time
+        return (self.provider == 'openai' and 'deepseek' not in self.model.lower()
+                and get_fake_provider().cassette_mode == "off")
+
+    async def complete_candidates(self, prompt: str, candidates: int, attempts: Optional[list] = None, **kwargs):
+        """Return ([completion, ...], input_tokens, output_tokens) for `candidates` samples of one prompt.
+
+        Providers without multi-candidate sampling get that many concurrent requests instead.
+        """
+        if self.native_candidates:
+            cost = self.estimate_cost(prompt, candidates, **kwargs)
+
+            def request(timeout: Optional[float]):
+                call = partial(self._complete_candidates_with_openai, prompt, candidates, **kwargs)
+                return self._send(prompt, cost, call, timeout)
+
+            try:
+                return await get_retry_policy().call(request, self.model, attempts, hedge=False)
+            except Exception as e:
+                print(f"Error in complete_candidates method: {str(e)}")
+                raise
+
+        results = await asyncio.gather(*(self.complete(prompt, attempts=attempts, **kwargs)
+                                         for _ in range(candidates)))
+        contents = [content for content, _, _ in results]
+        input_counts = [count for _, count, _ in results]
+        output_counts = [count for _, _, count in results]
+        return (
+            contents,
+            None if None in input_counts else sum(input_counts),
+            None if None in output_counts else sum(output_counts),
+        )
+
+    def _gemini_request(self, prompt: str, generation_settings: Dict[str, Any]):
+        """A GenerateContentRequest for the pooled client, as GenerativeModel would build it"""
+        import google.ai.generativelanguage as glm
+        return glm.GenerateContentRequest(
+            model=self.model if self.model.startswith("models/") else f"models/{self.model}",
+            contents=[glm.Content(role="user", parts=[glm.Part(text=prompt)])],
+            generation_config=glm.GenerationConfig(candidate_count=1, **generation_settings),
+        )
+
+    @staticmethod
+    def _gemini_text(response) -> str:
+        """Text of the first candidate; stream chunks may have none"""
+        if not response.candidates:
+            return ""
+        return "".join(part.text for part in response.candidates[0].content.parts)
+
     async def _complete_with_gemini(self, prompt: str, **kwargs):
         supported_params = [
             "max_tokens",
@@ -174,23 +551,16 @@ class ConnectorService:
         
         filtered_kwargs = {k: v for k, v in kwargs.items() if k in supported_params}
 
-        input_tokens = len(self.encoding.encode(prompt))
+        client = CLIENT_POOL.get_gemini(self.api_token)
+        response = await client.generate_content(self._gemini_request(prompt, filtered_kwargs))
 
-        model = genai.GenerativeModel(self.model)
-        
-        generation_config = genai.types.GenerationConfig(
-            candidate_count=1,
-            **filtered_kwargs
-        )
-
-        response = model.generate_content(
-            prompt,
-            generation_config=generation_config
+        if not response.candidates:
+            raise ValueError(f"Gemini returned no candidates: {response.prompt_feedback}")
+        output = self._gemini_text(response)
+        input_tokens, output_tokens = _usage_counts(
+            getattr(response, "usage_metadata", None), "prompt_token_count", "candidates_token_count"
         )
 
-        output = response.text
-        output_tokens = len(self.encoding.encode(output))
-
         return output, input_tokens, output_tokens
 
     async def _complete_with_anthropic(self, prompt: str, **kwargs):
@@ -200,9 +570,8 @@ class ConnectorService:
         ]
         filtered_kwargs = {k: v for k, v in kwargs.items() if k in supported_params}
 
-        input_tokens = len(self.encoding.encode(prompt))
-
-        response = self.anthropic_client.messages.create(
+        client = CLIENT_POOL.get_anthropic(self.api_token, self.base_url)
+        response = await client.messages.create(
             model=self.model,
             max_tokens=filtered_kwargs.get("max_tokens", 1000),
             temperature=filtered_kwargs.get("temperature", 0.7),
@@ -212,7 +581,7 @@ class ConnectorService:
         )
 
         output = response.content[0].text
-        output_tokens = len(self.encoding.encode(output))
+        input_tokens, output_tokens = _usage_counts(response.usage, "input_tokens", "output_tokens")
 
         return output, input_tokens, output_tokens
 
@@ -226,12 +595,7 @@ class ConnectorService:
         ]
         filtered_kwargs = {k: v for k, v in kwargs.items() if k in supported_params}
 
-        input_tokens = len(self.encoding.encode(prompt))
-
-        client = openai.AsyncOpenAI(
-            api_key=self.api_token,
-            base_url=self.base_url if self.base_url else None
-        )
+        client = CLIENT_POOL.get_openai(self.api_token, self.base_url if self.base_url else None)
         response = await client.chat.completions.create(
             model=self.model,
             messages=[{"role": "user", "content": prompt}],
@@ -239,13 +603,11 @@ class ConnectorService:
         )
 
         output = response.choices[0].message.content
-        output_tokens = len(self.encoding.encode(output))
+        input_tokens, output_tokens = _usage_counts(response.usage, "prompt_tokens", "completion_tokens")
 
         return output, input_tokens, output_tokens
 
-    async def _complete_with_llm(self, prompt: str, **kwargs):
-        os.environ["REPLICATE_API_TOKEN"] = self.api_token
-
+    async def _complete_candidates_with_openai(self, prompt: str, candidates: int, **kwargs):
         supported_params = [
             "max_tokens",
             "temperature",
@@ -255,19 +617,160 @@ class ConnectorService:
         ]
         filtered_kwargs = {k: v for k, v in kwargs.items() if k in supported_params}
 
-        input_tokens = len(self.encoding.encode(prompt))
+        client = CLIENT_POOL.get_openai(self.api_token, self.base_url if self.base_url else None)
+        response = await client.chat.completions.create(
+            model=self.model,
+            messages=[{"role": "user", "content": prompt}],
+            n=candidates,
+            **filtered_kwargs
+        )
+
+        outputs = [choice.message.content for choice in response.choices]
+        input_tokens, output_tokens = _usage_counts(response.usage, "prompt_tokens", "completion_tokens")
+
+        return outputs, input_tokens, output_tokens
+
+    async def _complete_with_llm(self, prompt: str, **kwargs):
+        supported_params = [
+            "max_tokens",
+            "temperature",
+            "top_p",
+            "presence_penalty",
+            "frequency_penalty",
+        ]
+        filtered_kwargs = {k: v for k, v in kwargs.items() if k in supported_params}
 
         if 'mixtral' in self.model:
             if 'max_tokens' in filtered_kwargs:
                 filtered_kwargs['max_new_tokens'] = filtered_kwargs.pop('max_tokens')
-        response = replicate.run(
-            self.model, input={"prompt": prompt, **filtered_kwargs}
+        client = CLIENT_POOL.get_replicate(self.api_token, self.base_url if self.base_url else None)
+        model_input = {"prompt": prompt, **filtered_kwargs}
+        if hasattr(client, "async_run"):
+            response = await client.async_run(self.model, input=model_input)
+        else:
+            # Older replicate releases only ship the blocking client
+            response = await CLIENT_POOL.run_blocking(client.run, self.model, input=model_input)
+
+        if hasattr(response, "__aiter__"):
+            output = "".join([str(chunk) async for chunk in response])
+        else:
+            output = "".join(response)
+
+        # Replicate reports no usage; ConnectorResult counts the text locally if asked
+        return output, None, None
+
+    async def _stream_with_gemini(self, prompt: str, on_chunk: Callable[[str], None], **kwargs):
+        if 'max_tokens' in kwargs:
+            kwargs['max_output_tokens'] = kwargs.pop('max_tokens')
+        filtered_kwargs = {k: v for k, v in kwargs.items() if k in ["max_output_tokens", "temperature"]}
+
+        client = CLIENT_POOL.get_gemini(self.api_token)
+        response = await client.stream_generate_content(self._gemini_request(prompt, filtered_kwargs))
+
+        chunks = []
+        usage = None
+        async for part in response:
+            text = self._gemini_text(part)
+            if text:
+                chunks.append(text)
+                on_chunk(text)
+            # Every chunk carries the running totals, so the last one wins
+            usage = getattr(part, "usage_metadata", None) or usage
+
+        output = "".join(chunks)
+        input_tokens, output_tokens = _usage_counts(usage, "prompt_token_count", "candidates_token_count")
+
+        return output, input_tokens, output_tokens
+
+    async def _stream_with_anthropic(self, prompt: str, on_chunk: Callable[[str], None], **kwargs):
+        filtered_kwargs = {k: v for k, v in kwargs.items() if k in ["max_tokens", "temperature"]}
+
+        client = CLIENT_POOL.get_anthropic(self.api_token, self.base_url)
+        chunks = []
+        async with client.messages.stream(
+            model=self.model,
+            max_tokens=filtered_kwargs.get("max_tokens", 1000),
+            temperature=filtered_kwargs.get("temperature", 0.7),
+            messages=[
+                {"role": "user", "content": prompt}
+            ]
+        ) as stream:
+            async for text in stream.text_stream:
+                chunks.append(text)
+                on_chunk(text)
+            final_message = await stream.get_final_message()
+
+        output = "".join(chunks)
+        input_tokens, output_tokens = _usage_counts(final_message.usage, "input_tokens", "output_tokens")
+
+        return output, input_tokens, output_tokens
+
+    async def _stream_with_openai(self, prompt: str, on_chunk: Callable[[str], None], **kwargs):
+        supported_params = [
+            "max_tokens",
+            "temperature",
+            "top_p",
+            "presence_penalty",
+            "frequency_penalty",
+        ]
+        filtered_kwargs = {k: v for k, v in kwargs.items() if k in supported_params}
+
+        client = CLIENT_POOL.get_openai(self.api_token, self.base_url if self.base_url else None)
+        response = await client.chat.completions.create(
+            model=self.model,
+            messages=[{"role": "user", "content": prompt}],
+            stream=True,
+            stream_options={"include_usage": True},
+            **filtered_kwargs
         )
-        output = "".join(response)
-        output_tokens = len(self.encoding.encode(output))
+
+        chunks = []
+        usage = None
+        async for event in response:
+            # With include_usage the final event has no choices, only the usage totals
+            usage = getattr(event, "usage", None) or usage
+            if not event.choices:
+                continue
+            text = event.choices[0].delta.content
+            if text:
+                chunks.append(text)
+                on_chunk(text)
+
+        output = "".join(chunks)
+        input_tokens, output_tokens = _usage_counts(usage, "prompt_tokens", "completion_tokens")
 
         return output, input_tokens, output_tokens
 
+    async def _stream_with_llm(self, prompt: str, on_chunk: Callable[[str], None], **kwargs):
+        client = CLIENT_POOL.get_replicate(self.api_token, self.base_url if self.base_url else None)
+        if not hasattr(client, "async_stream"):
+            # Older replicate releases cannot stream, so deliver the whole output at once
+            output, input_tokens, output_tokens = await self._complete_with_llm(prompt, **kwargs)
+            on_chunk(output)
+            return output, input_tokens, output_tokens
+
+        supported_params = [
+            "max_tokens",
+            "temperature",
+            "top_p",
+            "presence_penalty",
+            "frequency_penalty",
+        ]
+        filtered_kwargs = {k: v for k, v in kwargs.items() if k in supported_params}
+
+        if 'mixtral' in self.model:
+            if 'max_tokens' in filtered_kwargs:
+                filtered_kwargs['max_new_tokens'] = filtered_kwargs.pop('max_tokens')
+
+        chunks = []
+        async for event in await client.async_stream(self.model, input={"prompt": prompt, **filtered_kwargs}):
+            text = str(event)
+            if text:
+                chunks.append(text)
+                on_chunk(text)
+
+        return "".join(chunks), None, None
+
 
 class ConnectorResult:
     def __init__(
@@ -278,18 +781,89 @@ class ConnectorResult:
         input_tokens: int,
         output_tokens: int,
         plugin_name: str,
-        source: str = None
+        source: str = None,
+        cache_status: str = None,
+        time_to_first_token: float = None,
+        prompt: str = None,
+        candidates: List[str] = None,
+        attempts: List[Any] = None
     ):
         self.content = content
         self.model = model
         self.skill_name = skill_name
-        self.input_tokens = input_tokens
-        self.output_tokens = output_tokens
+        # Counts the provider did not report are worked out from the text on first access
+        self._input_tokens = input_tokens
+        self._output_tokens = output_tokens
+        self._prompt = prompt
         self.plugin_name = plugin_name
         self.source = source
+        # "hit" when served from the response cache, "miss" when cacheable but fetched
+        self.cache_status = cache_status
+        # Seconds until the first streamed chunk; None for non-streamed calls
+        self.time_to_first_token = time_to_first_token
+        # Every sampled completion when the call asked for several; content is the first
+        self.candidates = candidates if candidates is not None else [content]
+        # Provider requests made for this call (retries and hedges included), for the metrics log
+        self.attempts = attempts or []
+
+    @property
+    def input_tokens(self) -> int:
+        if self._input_tokens is None and self._prompt is not None:
+            self._input_tokens = count_tokens(self._prompt)
+            self._prompt = None
+        return self._input_tokens
+
+    @input_tokens.setter
+    def input_tokens(self, value: int):
+        self._input_tokens = value
+
+    @property
+    def output_tokens(self) -> int:
+        if self._output_tokens is None and self.content is not None:
+            self._output_tokens = count_tokens(self.content)
+        return self._output_tokens
+
+    @output_tokens.setter
+    def output_tokens(self, value: int):
+        self._output_tokens = value
 
     def __str__(self):
         return self.content
 
     def get_inner_content(self):
-        return self.content
\ No newline at end of file
+        return self.content
+
+class ConnectorStream:
+    """Async iterator over the chunks of one completion.
+
+    The call runs as a task that feeds a queue; once iteration finishes the
+    ConnectorResult is available on `result`.
+    """
+
+    _DONE = object()
+
+    def __init__(self, engine: ConnectorEngine, function, kwargs: Dict[str, Any]):
+        self._engine = engine
+        self._function = function
+        self._kwargs = kwargs
+        self._queue = None
+        self._task = None
+        self.result = None
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> str:
+        if self._task is None:
+            self._queue = asyncio.Queue()
+            self._task = asyncio.ensure_future(
+                self._engine.invoke_stream(self._function, self._queue.put_nowait, **self._kwargs)
+            )
+            self._task.add_done_callback(lambda _: self._queue.put_nowait(self._DONE))
+
+        chunk = await self._queue.get()
+        if chunk is self._DONE:
+            # Re-raises the call's exception, if it failed
+            self.result = self._task.result()
+            raise StopAsyncIteration
+        return chunk
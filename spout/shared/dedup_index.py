@@ -0,0 +1,81 @@
+import hashlib
+import random
+import re
+from typing import Dict, List, Optional, Set, Tuple
+
+_WORD_PATTERN = re.compile(r"\w+")
+
+# Mersenne prime modulus for the MinHash permutations
+_PRIME = (1 << 61) - 1
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase words only, so case, punctuation and spacing differences compare equal"""
+    return " ".join(_WORD_PATTERN.findall(text.lower()))
+
+
+def _hash64(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class DedupIndex:
+    """Exact and near-duplicate detection over a growing set of generated items.
+
+    Exact duplicates are caught by a hash of the normalised text. Near duplicates are
+    items whose word sets have an estimated Jaccard similarity of at least `threshold`
+    with an indexed item, using MinHash signatures. Signatures are split into bands
+    (LSH), so a new item is only compared with items sharing a band, not all of them.
+    A threshold of None only catches exact duplicates.
+    """
+
+    def __init__(self, threshold: Optional[float] = 0.7, num_perm: int = 64, bands: int = 16):
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        # Fixed seed, so signatures are comparable across runs
+        rng = random.Random(1)
+        self._perms = [(rng.randrange(1, _PRIME), rng.randrange(0, _PRIME)) for _ in range(num_perm)]
+        self._exact: Set[bytes] = set()
+        self._signatures: List[Tuple[int, ...]] = []
+        self._buckets: List[Dict[Tuple[int, ...], List[int]]] = [{} for _ in range(bands)]
+        self.exact_duplicates = 0
+        self.near_duplicates = 0
+
+    def __len__(self) -> int:
+        return len(self._exact)
+
+    def signature(self, words: List[str]) -> Tuple[int, ...]:
+        hashes = [_hash64(word) for word in set(words)]
+        return tuple(min((a * h + b) % _PRIME for h in hashes) for a, b in self._perms)
+
+    def add(self, text: str) -> bool:
+        """Index text and return True, or return False if it duplicates an indexed item"""
+        normalized = normalize_text(text)
+        digest = hashlib.blake2b(normalized.encode("utf-8"), digest_size=16).digest()
+        if digest in self._exact:
+            self.exact_duplicates += 1
+            return False
+
+        words = normalized.split()
+        signature = None
+        # Word-set similarity says little about one- or two-word items; those only match exactly
+        if self.threshold is not None and len(words) >= 3:
+            signature = self.signature(words)
+            keys = [signature[band * self.rows:(band + 1) * self.rows] for band in range(self.bands)]
+            candidates = set()
+            for band, key in enumerate(keys):
+                candidates.update(self._buckets[band].get(key, ()))
+            for candidate in candidates:
+                other = self._signatures[candidate]
+                if sum(x == y for x, y in zip(signature, other)) >= self.threshold * self.num_perm:
+                    self.near_duplicates += 1
+                    return False
+
+        self._exact.add(digest)
+        if signature is not None:
+            position = len(self._signatures)
+            self._signatures.append(signature)
+            for band, key in enumerate(keys):
+                self._buckets[band].setdefault(key, []).append(position)
+        return True
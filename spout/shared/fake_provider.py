@@ -0,0 +1,313 @@
+import asyncio
+import configparser
+import hashlib
+import json
+import random
+import re
+import threading
+from pathlib import Path
+from string import Template
+from typing import Callable, Dict, List, Optional, Tuple
+
+from spout.shared.token_counter import estimate_tokens
+
+DEFAULT_RESPONSE = "Fake response $digest"
+
+
+class FakeProviderError(Exception):
+    """An error injected by the fake provider"""
+
+
+class FakeRateLimitError(FakeProviderError):
+    """An injected rate-limit (HTTP 429) error"""
+
+
+class CassetteMiss(LookupError):
+    """Replay found no recorded response for a prompt"""
+
+
+def parse_latency(spec: str) -> Callable[[random.Random], float]:
+    """Sampler for a latency spec in seconds.
+
+    Specs are "fixed:0.2", "uniform:0.1,0.5", "normal:0.3,0.05", "lognormal:MU,SIGMA"
+    (of the log of the latency) or "exponential:0.3" (the mean). A bare number is fixed.
+    """
+    name, _, args = spec.strip().partition(":")
+    try:
+        if not args:
+            value = float(name)
+            return lambda rng: value
+        values = [float(value) for value in args.split(",")]
+        if len(values) != (1 if name in ("fixed", "exponential") else 2):
+            raise ValueError
+        if name == "fixed":
+            return lambda rng: values[0]
+        if name == "uniform":
+            return lambda rng: rng.uniform(values[0], values[1])
+        if name == "normal":
+            return lambda rng: max(rng.gauss(values[0], values[1]), 0.0)
+        if name == "lognormal":
+            return lambda rng: rng.lognormvariate(values[0], values[1])
+        if name == "exponential":
+            return lambda rng: rng.expovariate(1 / values[0]) if values[0] > 0 else 0.0
+    except (ValueError, IndexError):
+        pass
+    raise ValueError(f"Invalid latency '{spec}'")
+
+
+def _prompt_key(model: str, prompt: str) -> str:
+    return hashlib.sha256(f"{model}\x00{prompt}".encode("utf-8")).hexdigest()
+
+
+def _chunks(content: str) -> List[str]:
+    """Split a completion into word-sized stream chunks"""
+    return re.findall(r"\s*\S+\s*|\s+", content) or [content]
+
+
+class Cassette:
+    """JSONL file of real completions keyed by model and formatted prompt.
+
+    Recording appends one line per completion with its token counts, duration and
+    time to first token. Replaying returns the recorded completion after the recorded
+    duration divided by `speed` (0 replays instantly). Repeated prompts replay their
+    recordings in turn.
+    """
+
+    def __init__(self, path: str, speed: float = 1.0):
+        self.path = Path(path)
+        self.speed = speed
+        self._entries: Optional[Dict[str, List[Dict]]] = None
+        self._replayed: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def _load(self) -> Dict[str, List[Dict]]:
+        if self._entries is None:
+            entries: Dict[str, List[Dict]] = {}
+            if self.path.exists():
+                with open(self.path, "r", encoding="utf-8") as f:
+                    for line in f:
+                        if line.strip():
+                            entry = json.loads(line)
+                            entries.setdefault(entry["key"], []).append(entry)
+            self._entries = entries
+        return self._entries
+
+    def record(self, model: str, prompt: str, content: str, input_tokens: Optional[int],
+               output_tokens: Optional[int], duration: float, time_to_first_token: Optional[float] = None) -> None:
+        entry = {
+            "key": _prompt_key(model, prompt),
+            "model": model,
+            "content": content,
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "duration": round(duration, 4),
+            "time_to_first_token": None if time_to_first_token is None else round(time_to_first_token, 4),
+        }
+        with self._lock:
+            self._load().setdefault(entry["key"], []).append(entry)
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+    def lookup(self, model: str, prompt: str) -> Dict:
+        key = _prompt_key(model, prompt)
+        with self._lock:
+            recordings = self._load().get(key)
+            if not recordings:
+                raise CassetteMiss(f"No recorded response for this {model} prompt in {self.path}")
+            turn = self._replayed.get(key, 0)
+            self._replayed[key] = turn + 1
+        return recordings[turn % len(recordings)]
+
+    async def replay(self, model: str, prompt: str,
+                     on_chunk: Optional[Callable[[str], None]] = None) -> Tuple[str, Optional[int], Optional[int]]:
+        entry = self.lookup(model, prompt)
+        scale = 1 / self.speed if self.speed > 0 else 0.0
+        duration = entry["duration"] * scale
+        if on_chunk:
+            first = (entry.get("time_to_first_token") or 0.0) * scale
+            await asyncio.sleep(first)
+            chunks = _chunks(entry["content"])
+            gap = max(duration - first, 0.0) / len(chunks)
+            for chunk in chunks:
+                on_chunk(chunk)
+                await asyncio.sleep(gap)
+        else:
+            await asyncio.sleep(duration)
+        return entry["content"], entry["input_tokens"], entry["output_tokens"]
+
+
+class FakeProvider:
+    """Offline stand-in for the provider APIs.
+
+    Serves models named "fake" or "fake-*" and, with a replay cassette, every model.
+    Each call waits for a latency drawn from the configured distribution (streamed
+    calls spread it over word chunks at `tokens_per_second` after the first token),
+    may fail with an injected error, and returns the first canned response whose
+    pattern matches the prompt (at its last match), rendered as a string.Template with $model, $digest,
+    $call, $prompt_tokens, $last_line and the pattern's named groups. Randomness is
+    seeded from the seed, model, prompt and how often that prompt was sent, so runs
+    are reproducible.
+    """
+
+    def __init__(self, latency: str = "fixed:0", tokens_per_second: float = 0.0, error_rate: float = 0.0,
+                 error_kinds: Tuple[str, ...] = ("error",), seed: str = "0",
+                 responses: Optional[List[Dict]] = None, default_response: str = DEFAULT_RESPONSE,
+                 cassette: Optional[Cassette] = None, cassette_mode: str = "off"):
+        if cassette_mode not in ("off", "record", "replay"):
+            raise ValueError(f"Unknown cassette mode '{cassette_mode}', expected off, record or replay")
+        self.latency = parse_latency(latency)
+        self.tokens_per_second = tokens_per_second
+        self.error_rate = error_rate
+        self.error_kinds = tuple(error_kinds) or ("error",)
+        self.seed = seed
+        self.responses = [(re.compile(entry["match"], re.DOTALL), entry["response"], entry.get("model"))
+                          for entry in responses or []]
+        self.default_response = default_response
+        self.cassette = cassette
+        self.cassette_mode = cassette_mode if cassette else "off"
+        self._calls: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def recording(self) -> bool:
+        return self.cassette_mode == "record"
+
+    @property
+    def replaying(self) -> bool:
+        return self.cassette_mode == "replay"
+
+    def _rng(self, model: str, prompt: str) -> Tuple[random.Random, int]:
+        key = _prompt_key(model, prompt)
+        with self._lock:
+            call = self._calls.get(key, 0) + 1
+            self._calls[key] = call
+        return random.Random(f"{self.seed}:{key}:{call}"), call
+
+    def render(self, model: str, prompt: str, call: int = 1) -> str:
+        lines = [line for line in prompt.strip().splitlines() if line.strip()]
+        values = {
+            "model": model,
+            "digest": hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:8],
+            "call": str(call),
+            "prompt_tokens": str(estimate_tokens(prompt)),
+            "last_line": lines[-1] if lines else "",
+        }
+        for pattern, response, response_model in self.responses:
+            if response_model and response_model != model:
+                continue
+            # The last match, since prompt templates show their examples before the actual input
+            match = None
+            for match in pattern.finditer(prompt):
+                pass
+            if match:
+                values.update({name: value or "" for name, value in match.groupdict().items()})
+                return Template(response).safe_substitute(values)
+        return Template(self.default_response).safe_substitute(values)
+
+    def _inject_error(self, rng: random.Random) -> Optional[str]:
+        if self.error_rate > 0 and rng.random() < self.error_rate:
+            return rng.choice(self.error_kinds)
+        return None
+
+    @staticmethod
+    def _raise(kind: str):
+        if kind == "timeout":
+            raise TimeoutError("Fake provider timed out")
+        if kind == "ratelimit":
+            raise FakeRateLimitError("Fake provider rate limit exceeded (429)")
+        raise FakeProviderError("Fake provider error (500)")
+
+    async def complete(self, model: str, prompt: str, on_chunk: Optional[Callable[[str], None]] = None,
+                       **kwargs) -> Tuple[str, int, int]:
+        if self.replaying:
+            return await self.cassette.replay(model, prompt, on_chunk)
+
+        rng, call = self._rng(model, prompt)
+        latency = self.latency(rng)
+        error = self._inject_error(rng)
+        if error:
+            # A timed-out request takes its whole latency before failing; others fail early
+            await asyncio.sleep(latency if error == "timeout" else latency / 2)
+            self._raise(error)
+
+        content = self.render(model, prompt, call)
+        if "max_tokens" in kwargs and kwargs["max_tokens"]:
+            # Truncate like a provider that hit max_tokens, at a chunk boundary
+            chunks, budget = [], int(kwargs["max_tokens"]) * 4
+            for chunk in _chunks(content):
+                if budget - len(chunk) < 0:
+                    break
+                chunks.append(chunk)
+                budget -= len(chunk)
+            content = "".join(chunks) if chunks else content
+
+        await asyncio.sleep(latency)
+        if on_chunk:
+            chunks = _chunks(content)
+            gap = 1 / self.tokens_per_second if self.tokens_per_second > 0 else 0.0
+            for chunk in chunks:
+                on_chunk(chunk)
+                await asyncio.sleep(gap)
+        elif self.tokens_per_second > 0:
+            await asyncio.sleep(estimate_tokens(content) / self.tokens_per_second)
+        return content, estimate_tokens(prompt), estimate_tokens(content)
+
+
+def load_fake_provider(settings_path: Optional[Path] = None) -> FakeProvider:
+    """Build the fake provider from the [Fake] section of settings.ini"""
+    config = configparser.ConfigParser(interpolation=None)
+    config_dir = Path(__file__).resolve().parent.parent / 'config'
+    settings_path = settings_path or config_dir / 'settings.ini'
+    if settings_path.exists():
+        with open(settings_path, "r", encoding="utf-8-sig") as config_file:
+            config.read_file(config_file)
+
+    responses = None
+    responses_path = config.get("Fake", "Responses", fallback="")
+    if responses_path:
+        path = Path(responses_path)
+        if not path.is_absolute():
+            path = config_dir / path
+        with open(path, "r", encoding="utf-8") as f:
+            responses = json.load(f)
+
+    cassette = None
+    cassette_path = config.get("Fake", "Cassette", fallback="")
+    if cassette_path:
+        path = Path(cassette_path)
+        cassette = Cassette(str(path if path.is_absolute() else config_dir / path),
+                            speed=config.getfloat("Fake", "ReplaySpeed", fallback=1.0))
+
+    return FakeProvider(
+        latency=config.get("Fake", "Latency", fallback="fixed:0"),
+        tokens_per_second=config.getfloat("Fake", "TokensPerSecond", fallback=0.0),
+        error_rate=config.getfloat("Fake", "ErrorRate", fallback=0.0),
+        error_kinds=tuple(kind.strip() for kind in config.get("Fake", "ErrorKinds", fallback="error").split(",")
+                          if kind.strip()),
+        seed=config.get("Fake", "Seed", fallback="0"),
+        responses=responses,
+        default_response=config.get("Fake", "Response", fallback=DEFAULT_RESPONSE),
+        cassette=cassette,
+        cassette_mode=config.get("Fake", "CassetteMode", fallback="off").lower(),
+    )
+
+
+_FAKE_PROVIDER = None
+_FAKE_LOCK = threading.Lock()
+
+
+def get_fake_provider() -> FakeProvider:
+    """Return the process-wide fake provider configured in settings.ini"""
+    global _FAKE_PROVIDER
+    if _FAKE_PROVIDER is None:
+        with _FAKE_LOCK:
+            if _FAKE_PROVIDER is None:
+                _FAKE_PROVIDER = load_fake_provider()
+    return _FAKE_PROVIDER
+
+
+def set_fake_provider(provider: Optional[FakeProvider]) -> None:
+    """Replace the process-wide fake provider (None reloads it from settings.ini on next use)"""
+    global _FAKE_PROVIDER
+    _FAKE_PROVIDER = provider
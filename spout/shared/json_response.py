@@ -0,0 +1,27 @@
+import json
+import re
+from typing import Any, Dict
+
+_FENCE_PATTERN = re.compile(r"^\s*```(?:json)?\s*(.*?)\s*```\s*$", re.DOTALL)
+
+
+def parse_json_response(text: str) -> Dict[str, Any]:
+    """Parse the JSON object a spoutlet was asked to return.
+
+    Models sometimes wrap the object in a ```json fence or add a sentence around it,
+    so fall back to the outermost {...} span before giving up.
+    """
+    text = text.strip()
+    fenced = _FENCE_PATTERN.match(text)
+    if fenced:
+        text = fenced.group(1)
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError:
+        start, end = text.find("{"), text.rfind("}")
+        if start == -1 or end <= start:
+            raise ValueError("Response does not contain a JSON object")
+        data = json.loads(text[start:end + 1])
+    if not isinstance(data, dict):
+        raise ValueError("Response JSON is not an object")
+    return data
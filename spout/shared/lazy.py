@@ -0,0 +1,22 @@
+import importlib
+from typing import Callable, Dict, Tuple
+
+
+def lazy_imports(package: str, namespace: dict, imports: Dict[str, str]) -> Tuple[Callable, Callable]:
+    """Module-level __getattr__ and __dir__ for a package that imports its names on first access.
+
+    `imports` maps each name to the module it comes from, relative to `package`. A name
+    is imported the first time it is read and then kept in `namespace` (the package's
+    globals()), so later reads do not come back here.
+    """
+    def __getattr__(name):
+        if name in imports:
+            value = getattr(importlib.import_module(imports[name], package), name)
+            namespace[name] = value
+            return value
+        raise AttributeError(f"module {package!r} has no attribute {name!r}")
+
+    def __dir__():
+        return sorted(set(namespace) | set(imports))
+
+    return __getattr__, __dir__
@@ -0,0 +1,391 @@
+import csv
+import datetime
+import math
+import os
+import re
+import sqlite3
+import time
+from array import array
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from spout.shared.api_logging import METRICS_HEADER
+
+# Columns a stats row is reduced to; older logs without the later columns read as blanks
+FIELDS = ["start", "duration", "model", "spoutlet", "input_tokens", "output_tokens", "cache", "ttft", "error",
+          "attempt"]
+
+# CSV header names, in FIELDS order
+_COLUMNS = {
+    "Start Time": "start",
+    "Duration(s)": "duration",
+    "Model Id": "model",
+    "Skill Name": "spoutlet",
+    "Input Tokens": "input_tokens",
+    "Output Tokens": "output_tokens",
+    "Cache": "cache",
+    "Time To First Token(s)": "ttft",
+    "Error": "error",
+    "Attempt": "attempt",
+}
+
+GROUP_KEYS = ["model", "spoutlet", "window"]
+
+_DURATION_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800}
+
+
+def parse_duration(text: str) -> int:
+    """'90s', '15m', '1h', '7d' or '2w' in seconds"""
+    match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([smhdw])\s*", text or "")
+    if not match:
+        raise ValueError(f"Invalid duration '{text}', expected e.g. 15m, 1h or 7d")
+    return int(float(match.group(1)) * _DURATION_UNITS[match.group(2)])
+
+
+def parse_since(text: str) -> float:
+    """A relative duration ('24h') or an absolute 'YYYY-MM-DD[ HH:MM]' as an epoch timestamp"""
+    try:
+        return time.time() - parse_duration(text)
+    except ValueError:
+        pass
+    for fmt in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M", "%Y-%m-%d"):
+        try:
+            return time.mktime(time.strptime(text, fmt))
+        except ValueError:
+            continue
+    raise ValueError(f"Invalid --since value '{text}', expected e.g. 24h or 2025-02-01")
+
+
+class _TimestampParser:
+    """Converts the logger's local 'YYYY-MM-DD HH:MM:SS' strings to epoch seconds.
+
+    mktime per row is slow over millions of rows, so the epoch of each minute is cached.
+    """
+
+    def __init__(self):
+        self._minutes = {}
+
+    def __call__(self, text: str) -> Optional[float]:
+        minute = text[:16]
+        base = self._minutes.get(minute)
+        if base is None:
+            try:
+                base = time.mktime(time.strptime(minute, "%Y-%m-%d %H:%M"))
+            except ValueError:
+                return None
+            self._minutes[minute] = base
+        try:
+            return base + int(text[17:19])
+        except ValueError:
+            return base
+
+
+def _number(value) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _positions(header: List[str]) -> List[Optional[int]]:
+    return [header.index(column) if column in header else None for column in _COLUMNS]
+
+
+def _row_parser(header: List[str]):
+    """Build a function turning a CSV record with this header into a FIELDS tuple (or None)"""
+    positions = _positions(header)
+    # Older versions kept appending rows under the header the file was created with. Columns
+    # are only ever added at the end, so longer rows under an old header are read by position.
+    legacy = None
+    if len(header) < len(METRICS_HEADER) and header == METRICS_HEADER[:len(header)]:
+        legacy = _positions(METRICS_HEADER)
+    parse_time = _TimestampParser()
+
+    def parse(record: List[str]) -> Optional[tuple]:
+        columns = legacy if legacy and len(record) > len(header) else positions
+        values = [record[i] if i is not None and i < len(record) else "" for i in columns]
+        start = parse_time(values[0])
+        if start is None:
+            return None
+        return (start, _number(values[1]), values[2], values[3], _number(values[4]),
+                _number(values[5]), values[6], _number(values[7]), values[8], values[9])
+
+    return parse
+
+
+def read_csv_rows(paths: Iterable[str]) -> Iterator[tuple]:
+    """Stream FIELDS tuples from metric CSVs, one row at a time"""
+    for path in paths:
+        if not os.path.exists(path):
+            continue
+        with open(path, "r", newline="", encoding="utf-8", errors="replace") as file:
+            reader = csv.reader(file)
+            header = next(reader, None)
+            if not header:
+                continue
+            parse = _row_parser(header)
+            for record in reader:
+                row = parse(record)
+                if row is not None:
+                    yield row
+
+
+_INSERT = f"INSERT INTO calls ({', '.join(FIELDS)}, source) VALUES ({', '.join('?' * (len(FIELDS) + 1))})"
+
+
+def is_superseded(attempt: Optional[str]) -> bool:
+    """Whether a row is for a failed or cancelled attempt that a call's own row supersedes"""
+    return bool(attempt) and attempt.endswith((" failed", " cancelled"))
+
+
+def _source(path: str) -> Optional[str]:
+    """Identity of a log file that survives its rotation (a rename), or None when it is missing"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return f"{stat.st_dev}:{stat.st_ino}"
+
+
+class MetricsIndex:
+    """SQLite sidecar holding parsed metric rows, updated incrementally from the CSVs.
+
+    Each log file is tracked by its identity with the byte offset reached in it, so each
+    update only parses rows appended since the last one. A rotated log keeps its identity,
+    so rows appended to it just before the rotation are still picked up once the rotated
+    file is passed to update(), and rows() only returns rows from the files asked for.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn = sqlite3.connect(path, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(calls)")]
+        if columns and "source" not in columns:
+            # Indexes built before rows were tied to their log file are rebuilt from the logs
+            self._conn.execute("DROP TABLE calls")
+            self._conn.execute("DROP TABLE IF EXISTS state")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS calls (
+                start REAL, duration REAL, model TEXT, spoutlet TEXT,
+                input_tokens REAL, output_tokens REAL, cache TEXT, ttft REAL, error TEXT, attempt TEXT,
+                source TEXT
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS calls_start ON calls (start)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS files (source TEXT PRIMARY KEY, header TEXT, offset INTEGER)")
+
+    def update(self, csv_paths: Iterable[str]) -> int:
+        """Index rows appended to each CSV since the last update; returns how many were added"""
+        added = sum(self._update_file(path) for path in csv_paths)
+        self._conn.commit()
+        return added
+
+    def _update_file(self, csv_path: str) -> int:
+        source = _source(csv_path)
+        if source is None:
+            return 0
+        # Binary mode, so tell() is a plain byte offset that can be compared with the file size
+        with open(csv_path, "rb") as file:
+            header_line = file.readline().decode("utf-8", errors="replace")
+            known = self._conn.execute("SELECT header, offset FROM files WHERE source = ?", (source,)).fetchone()
+            if known and known[0] == header_line and known[1] <= os.fstat(file.fileno()).st_size:
+                offset = known[1]
+            else:
+                if known:
+                    # A new file that reuses a deleted log's identity
+                    self._conn.execute("DELETE FROM calls WHERE source = ?", (source,))
+                offset = file.tell()
+            file.seek(offset)
+
+            parse = _row_parser(next(csv.reader([header_line]), []))
+
+            added = 0
+            batch = []
+            while True:
+                line = file.readline()
+                # Stop before a partially written last line; it is picked up next time
+                if not line or not line.endswith(b"\n"):
+                    break
+                offset = file.tell()
+                row = parse(next(csv.reader([line.decode("utf-8", errors="replace")]), []))
+                if row is None:
+                    continue
+                batch.append(row + (source,))
+                if len(batch) >= 5000:
+                    self._conn.executemany(_INSERT, batch)
+                    added += len(batch)
+                    batch = []
+
+        self._conn.executemany(_INSERT, batch)
+        added += len(batch)
+        self._conn.execute("INSERT OR REPLACE INTO files VALUES (?, ?, ?)", (source, header_line, offset))
+        return added
+
+    def rows(self, csv_paths: Iterable[str], since: Optional[float] = None) -> Iterator[tuple]:
+        """Indexed rows of the given CSVs"""
+        sources = [source for source in map(_source, csv_paths) if source]
+        if not sources:
+            return
+        query = f"SELECT {', '.join(FIELDS)} FROM calls WHERE source IN ({', '.join('?' * len(sources))})"
+        if since is not None:
+            yield from self._conn.execute(query + " AND start >= ?", (*sources, since))
+        else:
+            yield from self._conn.execute(query, sources)
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+def _percentile(sorted_values, fraction: float) -> Optional[float]:
+    """Nearest-rank percentile"""
+    if not sorted_values:
+        return None
+    rank = max(int(math.ceil(fraction * len(sorted_values))), 1)
+    return sorted_values[rank - 1]
+
+
+class _LocalWindows:
+    """Maps a timestamp to the start of its window, with windows aligned to local midnight.
+
+    localtime per row is slow over millions of rows, so the UTC offset is cached per
+    quarter hour (the granularity of DST changes).
+    """
+
+    def __init__(self, window: int):
+        self.window = window
+        self._offsets = {}
+
+    def __call__(self, start: float) -> float:
+        quarter = int(start // 900)
+        offset = self._offsets.get(quarter)
+        if offset is None:
+            offset = self._offsets[quarter] = time.localtime(start).tm_gmtoff
+        return start - (start + offset) % self.window
+
+
+class _Group:
+    __slots__ = ("calls", "errors", "cache_hits", "coalesced", "superseded", "durations", "input_tokens",
+                 "output_tokens", "generation_time")
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.cache_hits = 0
+        self.coalesced = 0
+        self.superseded = 0
+        self.durations = array("d")  # compact: 8 bytes per call
+        self.input_tokens = 0.0
+        self.output_tokens = 0.0
+        self.generation_time = 0.0
+
+
+def aggregate(rows: Iterable[tuple], group_by: List[str], window: int = 3600,
+              since: Optional[float] = None, model: Optional[str] = None,
+              spoutlet: Optional[str] = None) -> List[Dict]:
+    """Summarise metric rows per group: counts, error rate, latency percentiles and tokens/sec.
+
+    Cache hits are counted but left out of latency and throughput, since they never
+    reached a provider. Calls that shared another caller's request ("coalesced") count
+    towards latency, as their callers waited for it, but not towards tokens. Rows for
+    attempts that were retried or lost a hedge race are only counted as "superseded";
+    the call they belong to has a row of its own.
+    """
+    groups: Dict[Tuple, _Group] = {}
+    window_start = _LocalWindows(window)
+    for start, duration, row_model, row_spoutlet, input_tokens, output_tokens, cache, ttft, error, attempt in rows:
+        if since is not None and start < since:
+            continue
+        if model and row_model != model:
+            continue
+        if spoutlet and row_spoutlet != spoutlet:
+            continue
+
+        key = []
+        for name in group_by:
+            if name == "model":
+                key.append(row_model)
+            elif name == "spoutlet":
+                key.append(row_spoutlet)
+            else:
+                key.append(window_start(start))
+        group = groups.get(tuple(key))
+        if group is None:
+            group = groups[tuple(key)] = _Group()
+
+        if is_superseded(attempt):
+            group.superseded += 1
+            continue
+        group.calls += 1
+        if error:
+            group.errors += 1
+            continue
+        if cache == "hit":
+            group.cache_hits += 1
+            continue
+        if cache == "coalesced":
+            group.coalesced += 1
+            if duration is not None:
+                group.durations.append(duration)
+            continue
+        if duration is not None:
+            group.durations.append(duration)
+            if output_tokens:
+                # Streamed calls exclude the wait for the first token, as in the Tokens/s column
+                generation_time = duration - ttft if ttft is not None and duration > ttft else duration
+                group.output_tokens += output_tokens
+                group.generation_time += generation_time
+        group.input_tokens += input_tokens or 0
+
+    results = []
+    for key in sorted(groups, key=lambda k: tuple(str(part) if not isinstance(part, float) else part for part in k)):
+        group = groups[key]
+        durations = sorted(group.durations)
+        entry = {}
+        for name, value in zip(group_by, key):
+            if name == "window":
+                value = datetime.datetime.fromtimestamp(value).strftime("%Y-%m-%d %H:%M")
+            entry[name] = value
+        entry.update({
+            "calls": group.calls,
+            "errors": group.errors,
+            "error_rate": round(group.errors / group.calls, 4) if group.calls else 0.0,
+            "cache_hits": group.cache_hits,
+            "coalesced": group.coalesced,
+            "superseded": group.superseded,
+            "p50": _percentile(durations, 0.50),
+            "p95": _percentile(durations, 0.95),
+            "p99": _percentile(durations, 0.99),
+            "tokens_per_sec": round(group.output_tokens / group.generation_time, 1) if group.generation_time else None,
+            "input_tokens": int(group.input_tokens),
+            "output_tokens": int(group.output_tokens),
+        })
+        results.append(entry)
+    return results
+
+
+def format_table(results: List[Dict], group_by: List[str]) -> str:
+    columns = group_by + ["calls", "errors", "error_rate", "cache_hits", "p50", "p95", "p99", "tokens_per_sec"]
+    titles = {"error_rate": "err%", "cache_hits": "cached", "tokens_per_sec": "tok/s", "p50": "p50(s)",
+              "p95": "p95(s)", "p99": "p99(s)"}
+
+    def cell(column, value):
+        if value is None:
+            return "-"
+        if column == "error_rate":
+            return f"{value * 100:.1f}"
+        if column in ("p50", "p95", "p99"):
+            return f"{value:.3f}"
+        return str(value)
+
+    table = [[titles.get(column, column) for column in columns]]
+    table += [[cell(column, entry.get(column)) for column in columns] for entry in results]
+    widths = [max(len(row[i]) for row in table) for i in range(len(columns))]
+    lines = []
+    for row in table:
+        # Group columns are left aligned, numbers right aligned
+        lines.append("  ".join(
+            value.ljust(widths[i]) if i < len(group_by) else value.rjust(widths[i])
+            for i, value in enumerate(row)
+        ))
+    lines.insert(1, "  ".join("-" * width for width in widths))
+    return "\n".join(lines)
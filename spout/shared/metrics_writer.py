@@ -0,0 +1,178 @@
+import atexit
+import configparser
+import csv
+import os
+import queue
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Union
+
+if os.name == "nt":
+    import msvcrt
+else:
+    import fcntl
+
+
+def _lock(file) -> None:
+    if os.name == "nt":
+        file.seek(0)
+        msvcrt.locking(file.fileno(), msvcrt.LK_LOCK, 1)
+    else:
+        fcntl.flock(file.fileno(), fcntl.LOCK_EX)
+
+
+def _unlock(file) -> None:
+    if os.name == "nt":
+        file.seek(0)
+        msvcrt.locking(file.fileno(), msvcrt.LK_UNLCK, 1)
+    else:
+        fcntl.flock(file.fileno(), fcntl.LOCK_UN)
+
+
+def _get_settings() -> Dict[str, float]:
+    """Read buffering and rotation limits from the [Metrics] section of settings.ini"""
+    config = configparser.ConfigParser()
+    settings_path = Path(__file__).resolve().parent.parent / 'config' / 'settings.ini'
+    if settings_path.exists():
+        with open(settings_path, "r", encoding="utf-8-sig") as config_file:
+            config.read_file(config_file)
+    return {
+        "flush_rows": config.getint("Metrics", "FlushRows", fallback=50),
+        "flush_interval": config.getfloat("Metrics", "FlushInterval", fallback=2.0),
+        "max_size_mb": config.getfloat("Metrics", "MaxSizeMB", fallback=10),
+        "backup_count": config.getint("Metrics", "BackupCount", fallback=3),
+    }
+
+
+# A row, or a callable that builds one on the writer thread (e.g. to count tokens)
+Row = Union[List, Callable[[], List]]
+
+
+class MetricsWriter:
+    """Appends CSV rows from a background thread in batches.
+
+    Rows are flushed once `flush_rows` are waiting, every `flush_interval` seconds and
+    at interpreter exit. Each flush takes an exclusive lock on the file so several
+    spout processes can share one CSV without interleaving rows, and the file is
+    rotated to `<name>.1`, `<name>.2`, ... once it grows past `max_size_mb`.
+
+    Columns are only ever added at the end, so a file started by an older version
+    under a shorter header is appended to as it is; readers take the longer rows by
+    position. A file with an unrelated header is moved aside to `<name>.1` first,
+    even when `backup_count` would otherwise discard rotated logs.
+    """
+
+    def __init__(self, filename: str, header: List[str], flush_rows: int = 50, flush_interval: float = 2.0,
+                 max_size_mb: float = 10, backup_count: int = 3):
+        self.filename = filename
+        self.header = header
+        self.flush_rows = max(flush_rows, 1)
+        self.flush_interval = flush_interval
+        self.max_bytes = int(max_size_mb * 1024 * 1024)
+        self.backup_count = backup_count
+        # The header on disk is checked once per writer, not on every flush
+        self._header_checked = False
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="spout-metrics", daemon=True)
+        self._thread.start()
+        atexit.register(self.flush)
+
+    def write(self, row: Row) -> None:
+        self._queue.put(row)
+
+    def flush(self, timeout: float = 10.0) -> None:
+        """Block until every row submitted so far is on disk"""
+        if not self._thread.is_alive():
+            return
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait(timeout)
+
+    def _run(self) -> None:
+        buffer = []
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            try:
+                item = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+            except queue.Empty:
+                item = None
+
+            waiter = None
+            if isinstance(item, threading.Event):
+                waiter = item
+            elif item is not None:
+                try:
+                    buffer.append(item() if callable(item) else item)
+                except Exception as e:
+                    print(f"Warning: could not record API metrics: {e}", file=sys.stderr)
+
+            if buffer and (waiter or len(buffer) >= self.flush_rows or time.monotonic() >= deadline):
+                try:
+                    self._append(buffer)
+                except OSError as e:
+                    print(f"Warning: could not write API metrics: {e}", file=sys.stderr)
+                buffer = []
+            if waiter:
+                waiter.set()
+            if time.monotonic() >= deadline:
+                deadline = time.monotonic() + self.flush_interval
+
+    def _append(self, rows: List[List]) -> None:
+        # Lock a sidecar file rather than the CSV itself, so rotation can rename the CSV
+        # (Windows refuses to rename open files) while other processes wait their turn
+        with open(f"{self.filename}.lock", "a+") as lock_file:
+            _lock(lock_file)
+            try:
+                if not self._header_checked:
+                    header = self._header_on_disk()
+                    if header is not None and header != self.header[:len(header)]:
+                        # Rows under this header would be read with the wrong column names
+                        self._rotate(keep=True)
+                    self._header_checked = True
+                with open(self.filename, "a", newline="") as file:
+                    writer = csv.writer(file)
+                    if file.tell() == 0:  # File is empty, write header
+                        writer.writerow(self.header)
+                    writer.writerows(rows)
+                    size = file.tell()
+                if self.max_bytes and size >= self.max_bytes:
+                    self._rotate()
+            finally:
+                _unlock(lock_file)
+
+    def _header_on_disk(self):
+        """The CSV's first row, or None when the file is missing or empty"""
+        try:
+            with open(self.filename, "r", newline="", encoding="utf-8", errors="replace") as file:
+                return next(csv.reader(file), None)
+        except OSError:
+            return None
+
+    def _rotate(self, keep: bool = False) -> None:
+        """Shift name.1 -> name.2 ... and move the full log to name.1 (called with the lock held).
+
+        Without backups the log is deleted, unless `keep` asks for it to be kept as name.1.
+        """
+        backup_count = max(self.backup_count, 1) if keep else self.backup_count
+        if backup_count <= 0:
+            os.remove(self.filename)
+            return
+        for index in range(backup_count - 1, 0, -1):
+            source = f"{self.filename}.{index}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.filename}.{index + 1}")
+        os.replace(self.filename, f"{self.filename}.1")
+
+
+_WRITERS: Dict[str, MetricsWriter] = {}
+_WRITERS_LOCK = threading.Lock()
+
+
+def get_metrics_writer(filename: str, header: List[str]) -> MetricsWriter:
+    """One writer per file per process, shared by every logger instance"""
+    with _WRITERS_LOCK:
+        if filename not in _WRITERS:
+            _WRITERS[filename] = MetricsWriter(filename, header, **_get_settings())
+        return _WRITERS[filename]
@@ -0,0 +1,97 @@
+import contextlib
+import contextvars
+import io
+import sys
+
+# Per-task output targets; unset means "write to the real stream"
+_STDOUT_TARGET = contextvars.ContextVar("spout_stdout_target", default=None)
+_STDERR_TARGET = contextvars.ContextVar("spout_stderr_target", default=None)
+_STDIN_SOURCE = contextvars.ContextVar("spout_stdin_source", default=None)
+
+
+class _OutputRouter(io.TextIOBase):
+    """Stands in for sys.stdout/sys.stderr and routes writes to the current task's target"""
+
+    def __init__(self, fallback, target: contextvars.ContextVar):
+        self._fallback = fallback
+        self._target = target
+
+    @property
+    def _stream(self):
+        return self._target.get() or self._fallback
+
+    @property
+    def encoding(self):
+        return "utf-8"
+
+    @property
+    def errors(self):
+        return "strict"
+
+    def writable(self):
+        return True
+
+    def write(self, text):
+        return self._stream.write(text)
+
+    def flush(self):
+        self._stream.flush()
+
+    def isatty(self):
+        return self._target.get() is None and self._fallback.isatty()
+
+
+class _InputRouter(io.TextIOBase):
+    """Stands in for sys.stdin and reads from the current task's source"""
+
+    def __init__(self, fallback):
+        self._fallback = fallback
+
+    @property
+    def _stream(self):
+        # pythonw has no stdin at all; read it as empty
+        return _STDIN_SOURCE.get() or self._fallback or io.StringIO()
+
+    @property
+    def encoding(self):
+        return "utf-8"
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        return self._stream.read(size)
+
+    def readline(self, size=-1):
+        return self._stream.readline(size)
+
+    def isatty(self):
+        return self._stream.isatty()
+
+
+def route_output() -> None:
+    """Install the routers on sys.stdout, sys.stderr and sys.stdin (safe to call more than once)"""
+    if not isinstance(sys.stdout, _OutputRouter):
+        sys.stdout = _OutputRouter(sys.stdout, _STDOUT_TARGET)
+    if not isinstance(sys.stderr, _OutputRouter):
+        sys.stderr = _OutputRouter(sys.stderr, _STDERR_TARGET)
+    if not isinstance(sys.stdin, _InputRouter):
+        sys.stdin = _InputRouter(sys.stdin)
+
+
+@contextlib.contextmanager
+def capture_output(stdout, stderr, stdin=None):
+    """Send print() output of the current thread or asyncio task to the given streams.
+
+    Handlers print their results directly, so concurrent commands sharing one process
+    need their output kept apart; route_output() must have been called first. With
+    `stdin`, reads from sys.stdin are served from it as well.
+    """
+    tokens = [(_STDOUT_TARGET, _STDOUT_TARGET.set(stdout)), (_STDERR_TARGET, _STDERR_TARGET.set(stderr))]
+    if stdin is not None:
+        tokens.append((_STDIN_SOURCE, _STDIN_SOURCE.set(stdin)))
+    try:
+        yield
+    finally:
+        for var, token in reversed(tokens):
+            var.reset(token)
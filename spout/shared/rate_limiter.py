@@ -0,0 +1,276 @@
+import asyncio
+import configparser
+import contextlib
+import contextvars
+import threading
+import time
+from collections import OrderedDict, deque
+from pathlib import Path
+from typing import Dict, Optional
+
+# Highest priority first; a waiting interactive request is always admitted before batch work
+PRIORITIES = ("interactive", "batch")
+
+_PRIORITY = contextvars.ContextVar("spout_request_priority", default="interactive")
+_CALLER = contextvars.ContextVar("spout_request_caller", default=None)
+
+
+@contextlib.contextmanager
+def request_context(priority: Optional[str] = None, caller: Optional[str] = None):
+    """Tag the provider requests made inside the block with a priority class and caller"""
+    tokens = []
+    if priority:
+        tokens.append((_PRIORITY, _PRIORITY.set(priority if priority in PRIORITIES else PRIORITIES[-1])))
+    if caller:
+        tokens.append((_CALLER, _CALLER.set(caller)))
+    try:
+        yield
+    finally:
+        for var, token in reversed(tokens):
+            var.reset(token)
+
+
+class TokenBucket:
+    """Refills continuously at `per_minute` units per minute, holding at most one minute's worth"""
+
+    def __init__(self, per_minute: float):
+        self.rate = per_minute / 60.0
+        self.capacity = float(per_minute)
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, amount: float, now: float) -> float:
+        """Seconds until `amount` can be taken (a request larger than the bucket waits for a full one)"""
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        return 0.0 if self.level >= amount else (amount - self.level) / self.rate
+
+    def take(self, amount: float) -> None:
+        self.level -= min(amount, self.capacity)
+
+    def adjust(self, amount: float) -> None:
+        """Give back (positive) or charge (negative) tokens once a request's real cost is known"""
+        self.level = min(self.capacity, self.level + amount)
+
+
+class _Waiter:
+    __slots__ = ("future", "cost", "enqueued")
+
+    def __init__(self, future: asyncio.Future, cost: int):
+        self.future = future
+        self.cost = cost
+        self.enqueued = time.monotonic()
+
+
+class RateLimiter:
+    """Requests/min and tokens/min buckets in front of one provider and model.
+
+    A request that fits both buckets while nothing is queued goes straight through.
+    Otherwise it waits in the queue of its priority class: interactive requests are
+    admitted before any batch request, and within a class callers (plugins, batch
+    jobs) take turns, so one long run cannot hold back another. Token costs are
+    estimates made before the call and corrected with the reported usage after it.
+    """
+
+    def __init__(self, name: str, requests_per_minute: Optional[float] = None,
+                 tokens_per_minute: Optional[float] = None):
+        self.name = name
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self._queues: Dict[str, "OrderedDict[str, deque]"] = {priority: OrderedDict() for priority in PRIORITIES}
+        self._depth = 0
+        self._timer = None
+        self._loop = None
+        self.stats = {
+            "admitted": {priority: 0 for priority in PRIORITIES},
+            "queued": 0,
+            "max_queue_depth": 0,
+            "wait_total": 0.0,
+            "wait_max": 0.0,
+        }
+        self._waits = deque(maxlen=1000)
+
+    @property
+    def limited(self) -> bool:
+        return self.requests is not None or self.tokens is not None
+
+    @property
+    def queue_depth(self) -> int:
+        return self._depth
+
+    def _delay(self, cost: int, now: float) -> float:
+        delay = 0.0
+        if self.requests:
+            delay = self.requests.delay(1, now)
+        if self.tokens:
+            delay = max(delay, self.tokens.delay(cost, now))
+        return delay
+
+    def _take(self, cost: int) -> None:
+        if self.requests:
+            self.requests.take(1)
+        if self.tokens:
+            self.tokens.take(cost)
+
+    def _record(self, priority: str, waited: float) -> None:
+        self.stats["admitted"][priority] += 1
+        self.stats["wait_total"] += waited
+        self.stats["wait_max"] = max(self.stats["wait_max"], waited)
+        self._waits.append(waited)
+
+    async def acquire(self, cost: int) -> None:
+        """Wait until a request estimated at `cost` tokens may be sent"""
+        if not self.limited:
+            return
+        priority = _PRIORITY.get()
+        caller = _CALLER.get() or "default"
+        if not self._depth and self._delay(cost, time.monotonic()) == 0:
+            self._take(cost)
+            self._record(priority, 0.0)
+            return
+
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # Waiters of an earlier event loop (a finished asyncio.run) can never be resumed
+            self._queues = {name: OrderedDict() for name in PRIORITIES}
+            self._depth = 0
+            self._timer = None
+            self._loop = loop
+        waiter = _Waiter(loop.create_future(), cost)
+        self._queues[priority].setdefault(caller, deque()).append(waiter)
+        self._depth += 1
+        self.stats["queued"] += 1
+        self.stats["max_queue_depth"] = max(self.stats["max_queue_depth"], self._depth)
+        self._dispatch()
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # Admitted just before the cancellation; hand its share back
+                self.settle(cost, 0)
+            self._dispatch()
+            raise
+        self._record(priority, time.monotonic() - waiter.enqueued)
+
+    def _head(self):
+        """(caller queue, its waiters) to admit next, dropping cancelled waiters"""
+        for priority in PRIORITIES:
+            queue = self._queues[priority]
+            while queue:
+                caller, waiters = next(iter(queue.items()))
+                while waiters and waiters[0].future.done():
+                    waiters.popleft()
+                    self._depth -= 1
+                if waiters:
+                    return queue, caller, waiters
+                del queue[caller]
+        return None
+
+    def _dispatch(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        while True:
+            head = self._head()
+            if head is None:
+                return
+            queue, caller, waiters = head
+            waiter = waiters[0]
+            delay = self._delay(waiter.cost, time.monotonic())
+            if delay > 0:
+                self._timer = self._loop.call_later(delay, self._dispatch)
+                return
+            self._take(waiter.cost)
+            waiters.popleft()
+            self._depth -= 1
+            # Round robin: the caller just served goes to the back of its class
+            if waiters:
+                queue.move_to_end(caller)
+            else:
+                del queue[caller]
+            waiter.future.set_result(None)
+
+    def settle(self, estimated: int, actual: Optional[int]) -> None:
+        """Correct the tokens/min bucket once the provider reports what a request really used"""
+        if self.tokens and actual is not None:
+            self.tokens.adjust(estimated - actual)
+
+    def summary(self) -> Dict:
+        waits = sorted(self._waits)
+        admitted = sum(self.stats["admitted"].values())
+        return {
+            "name": self.name,
+            "admitted": dict(self.stats["admitted"]),
+            "queued": self.stats["queued"],
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.stats["max_queue_depth"],
+            "wait_mean": self.stats["wait_total"] / admitted if admitted else 0.0,
+            "wait_p95": waits[min(len(waits) - 1, int(len(waits) * 0.95))] if waits else 0.0,
+            "wait_max": self.stats["wait_max"],
+        }
+
+
+class RateLimits:
+    """Limiters per provider and model, configured in the [RateLimits] section of settings.ini.
+
+    Keys are `<provider or model>.RequestsPerMinute` and `<provider or model>.TokensPerMinute`,
+    e.g. `openai.TokensPerMinute=200000` or `gpt-4o.RequestsPerMinute=500`. A model's own
+    keys take precedence over its provider's. Models without limits are not queued.
+    """
+
+    def __init__(self, settings_path: Optional[Path] = None):
+        self.settings_path = settings_path or Path(__file__).resolve().parent.parent / 'config' / 'settings.ini'
+        self._limits: Optional[Dict[str, float]] = None
+        self._limiters: Dict[tuple, RateLimiter] = {}
+        self._lock = threading.Lock()
+
+    def _get_limits(self) -> Dict[str, float]:
+        if self._limits is None:
+            config = configparser.ConfigParser()
+            if self.settings_path.exists():
+                with open(self.settings_path, "r", encoding="utf-8-sig") as config_file:
+                    config.read_file(config_file)
+            limits = {}
+            if config.has_section("RateLimits"):
+                for key, value in config.items("RateLimits"):
+                    try:
+                        limits[key.lower()] = float(value)
+                    except ValueError:
+                        print(f"Warning: ignoring [RateLimits] {key} = {value!r}, expected a number")
+            self._limits = limits
+        return self._limits
+
+    def _limit(self, provider: str, model: str, kind: str) -> Optional[float]:
+        limits = self._get_limits()
+        value = limits.get(f"{model.lower()}.{kind}")
+        if value is None:
+            value = limits.get(f"{provider}.{kind}")
+        return value if value and value > 0 else None
+
+    def get(self, provider: str, model: str) -> RateLimiter:
+        key = (provider, model)
+        limiter = self._limiters.get(key)
+        if limiter is None:
+            with self._lock:
+                limiter = self._limiters.get(key)
+                if limiter is None:
+                    limiter = RateLimiter(
+                        model,
+                        requests_per_minute=self._limit(provider, model, "requestsperminute"),
+                        tokens_per_minute=self._limit(provider, model, "tokensperminute"),
+                    )
+                    self._limiters[key] = limiter
+        return limiter
+
+    def summaries(self):
+        """Wait and queue statistics of every limiter that admitted a request"""
+        return [limiter.summary() for limiter in list(self._limiters.values())
+                if limiter.limited and any(limiter.stats["admitted"].values())]
+
+
+# Shared by every ConnectorService in the process
+RATE_LIMITS = RateLimits()
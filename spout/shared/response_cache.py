@@ -0,0 +1,139 @@
+import configparser
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+
+class ResponseCache:
+    """On-disk SQLite cache of completions keyed by model, formatted prompt and execution settings"""
+
+    def __init__(self, path: str, max_entries: int = 10000, max_size_mb: float = 100,
+                 ttl_hours: float = 168, max_temperature: float = 0.0):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = int(max_size_mb * 1024 * 1024)
+        self.ttl_seconds = ttl_hours * 3600
+        self.max_temperature = max_temperature
+        self._lock = threading.Lock()
+
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=10, check_same_thread=False, isolation_level=None)
+        # WAL lets several spout processes read and write the cache at the same time
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                model TEXT,
+                content TEXT,
+                input_tokens INTEGER,
+                output_tokens INTEGER,
+                size INTEGER,
+                created REAL,
+                accessed REAL
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+
+    @staticmethod
+    def make_key(model: str, prompt: str, execution_settings: Dict[str, Any]) -> str:
+        payload = json.dumps(
+            {"model": model, "prompt": prompt, "settings": execution_settings},
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def accepts(self, config: Dict[str, Any], execution_settings: Dict[str, Any]) -> bool:
+        """Whether a spoutlet's responses may be cached.
+
+        "cache": true or false in config.json decides for a spoutlet. Without it, calls
+        sampling above MaxTemperature (0 unless configured, so only deterministic calls)
+        are not cached, since repeats of those calls are expected to differ.
+        """
+        cache = config.get("cache")
+        if cache is not None:
+            return bool(cache)
+        try:
+            temperature = float(execution_settings.get("temperature", 0))
+        except (TypeError, ValueError):
+            return False
+        return temperature <= self.max_temperature
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT content, input_tokens, output_tokens, created FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            content, input_tokens, output_tokens, created = row
+            if self.ttl_seconds and now - created > self.ttl_seconds:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                return None
+            self._conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+        return {"content": content, "input_tokens": input_tokens, "output_tokens": output_tokens}
+
+    def put(self, key: str, model: str, content: str,
+            input_tokens: Optional[int], output_tokens: Optional[int]) -> None:
+        now = time.time()
+        size = len(content.encode("utf-8"))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, model, content, input_tokens, output_tokens, size, now, now),
+            )
+            self._evict()
+
+    def _evict(self) -> None:
+        """Drop expired entries, then least recently used ones until under the size limits"""
+        if self.ttl_seconds:
+            self._conn.execute("DELETE FROM responses WHERE created < ?", (time.time() - self.ttl_seconds,))
+
+        count, total_size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        while count > self.max_entries or total_size > self.max_bytes:
+            excess = max(count - self.max_entries, 1)
+            self._conn.execute(
+                "DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY accessed LIMIT ?)", (excess,)
+            )
+            count, total_size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+
+
+_RESPONSE_CACHE = None
+_RESPONSE_CACHE_LOADED = False
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """Return the process-wide cache, or None when [Cache] Enabled=0 in settings.ini"""
+    global _RESPONSE_CACHE, _RESPONSE_CACHE_LOADED
+    if not _RESPONSE_CACHE_LOADED:
+        config = configparser.ConfigParser()
+        config_dir = Path(__file__).resolve().parent.parent / 'config'
+        settings_path = config_dir / 'settings.ini'
+        if settings_path.exists():
+            with open(settings_path, "r", encoding="utf-8-sig") as config_file:
+                config.read_file(config_file)
+
+        _RESPONSE_CACHE_LOADED = True
+        if not config.getboolean("Cache", "Enabled", fallback=True):
+            return None
+
+        _RESPONSE_CACHE = ResponseCache(
+            path=config.get("Cache", "Path", fallback=str(config_dir / 'response_cache.sqlite')),
+            max_entries=config.getint("Cache", "MaxEntries", fallback=10000),
+            max_size_mb=config.getfloat("Cache", "MaxSizeMB", fallback=100),
+            ttl_hours=config.getfloat("Cache", "TTLHours", fallback=168),
+            max_temperature=config.getfloat("Cache", "MaxTemperature", fallback=0.0),
+        )
+    return _RESPONSE_CACHE
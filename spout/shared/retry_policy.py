@@ -0,0 +1,224 @@
+import asyncio
+import configparser
+import random
+import sys
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from spout.shared.fake_provider import FakeProviderError
+
+# Provider SDK exceptions worth another attempt, by class name so no SDK has to be imported
+RETRYABLE_ERRORS = {
+    "RateLimitError", "APIConnectionError", "APITimeoutError", "InternalServerError", "OverloadedError",
+    "ServiceUnavailableError", "ServiceUnavailable", "ResourceExhausted", "DeadlineExceeded",
+    "ConnectError", "ReadTimeout", "RemoteProtocolError",
+}
+RETRYABLE_STATUS = {408, 409, 429}
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Rate limits, timeouts, connection failures and 5xx responses; not bad requests or auth errors"""
+    if isinstance(error, (TimeoutError, asyncio.TimeoutError, ConnectionError, FakeProviderError)):
+        return True
+    status = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    if isinstance(status, int):
+        return status in RETRYABLE_STATUS or status >= 500
+    return type(error).__name__ in RETRYABLE_ERRORS
+
+
+class Attempt:
+    """One provider request made for a call; the call's metrics row belongs to the attempt that answered"""
+    __slots__ = ("label", "start", "duration", "error")
+
+    def __init__(self, label: str, start: float):
+        self.label = label
+        self.start = start
+        self.duration = 0.0
+        self.error: Optional[str] = None
+
+
+class HedgeDelays:
+    """Per-model latency samples for choosing when to hedge.
+
+    Seeded from successful, uncached calls in api_metrics.csv the first time a model
+    is hedged, then kept current with the durations of this process's own attempts.
+    """
+
+    def __init__(self, percentile: float = 0.95, min_samples: int = 20, max_samples: int = 500,
+                 window: int = 7 * 86400, metrics_file: Optional[str] = None):
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.max_samples = max_samples
+        self.window = window
+        self.metrics_file = metrics_file
+        self._samples: Optional[Dict[str, deque]] = None
+        self._lock = threading.Lock()
+
+    def _load(self) -> Dict[str, deque]:
+        from spout.shared.api_logging import APIMetricsLogger
+        from spout.shared.metrics_stats import read_csv_rows
+
+        metrics_file = self.metrics_file or APIMetricsLogger().filename
+        since = time.time() - self.window
+        samples: Dict[str, deque] = {}
+        for start, duration, model, _, _, _, cache, _, error, _ in read_csv_rows([metrics_file]):
+            if start < since or error or cache in ("hit", "coalesced") or not duration:
+                continue
+            samples.setdefault(model, deque(maxlen=self.max_samples)).append(duration)
+        return samples
+
+    async def delay(self, model: str) -> Optional[float]:
+        """The model's latency percentile in seconds, or None until there are enough samples"""
+        if self._samples is None:
+            # Reading the log can take a while, so it happens once and off the event loop
+            samples = await asyncio.get_running_loop().run_in_executor(None, self._load)
+            with self._lock:
+                if self._samples is None:
+                    self._samples = samples
+        durations = self._samples.get(model)
+        if not durations or len(durations) < self.min_samples:
+            return None
+        ordered = sorted(durations)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * self.percentile))]
+
+    def observe(self, model: str, duration: float) -> None:
+        if self._samples is not None:
+            with self._lock:
+                self._samples.setdefault(model, deque(maxlen=self.max_samples)).append(duration)
+
+
+class RetryPolicy:
+    """Retries, per-attempt timeouts and hedging around one provider request.
+
+    A retryable failure is tried again after a full-jitter exponential backoff
+    (a random delay up to `base_delay * 2**n`, capped at `max_delay`). With hedging on,
+    an attempt still running after the model's learned latency percentile gets a
+    duplicate, and whichever answers first wins; the other is cancelled. Every
+    attempt is appended to `attempts` so it can be logged.
+    """
+
+    def __init__(self, max_attempts: int = 3, base_delay: float = 0.5, max_delay: float = 8.0,
+                 attempt_timeout: Optional[float] = None, hedge: bool = False,
+                 hedge_delays: Optional[HedgeDelays] = None, min_hedge_delay: float = 0.1, seed=None):
+        self.max_attempts = max(max_attempts, 1)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.attempt_timeout = attempt_timeout if attempt_timeout and attempt_timeout > 0 else None
+        self.hedge = hedge
+        self.hedge_delays = hedge_delays or HedgeDelays()
+        self.min_hedge_delay = min_hedge_delay
+        self._rng = random.Random(seed)
+
+    def backoff(self, retry: int) -> float:
+        """Full jitter: uniform between 0 and the capped exponential delay for this retry"""
+        return self._rng.uniform(0, min(self.max_delay, self.base_delay * 2 ** (retry - 1)))
+
+    async def _attempt(self, request: Callable[[Optional[float]], Awaitable], model: str, label: str,
+                       attempts: List[Attempt]):
+        attempt = Attempt(label, time.time())
+        attempts.append(attempt)
+        started = time.perf_counter()
+        try:
+            result = await request(self.attempt_timeout)
+        except asyncio.CancelledError:
+            attempt.error = "Cancelled"
+            raise
+        except Exception as e:
+            attempt.error = type(e).__name__
+            raise
+        finally:
+            attempt.duration = time.perf_counter() - started
+        if self.hedge:
+            self.hedge_delays.observe(model, attempt.duration)
+        return result
+
+    async def _hedged(self, request, model: str, number: int, attempts: List[Attempt], hedge_delay: float):
+        pending = {asyncio.ensure_future(self._attempt(request, model, str(number), attempts))}
+        error = None
+        try:
+            done, pending = await asyncio.wait(pending, timeout=hedge_delay)
+            if not done:
+                # Still running after the usual latency: race a duplicate against it
+                pending.add(asyncio.ensure_future(self._attempt(request, model, f"{number}h", attempts)))
+            while True:
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+                if not pending:
+                    raise error
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            # The slower attempt, or every attempt when the caller was cancelled
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+
+    async def call(self, request: Callable[[Optional[float]], Awaitable], model: str,
+                   attempts: Optional[List[Attempt]] = None, hedge: bool = True,
+                   can_retry: Callable[[], bool] = lambda: True):
+        """Run request(attempt_timeout) until it succeeds, fails for good or runs out of attempts.
+
+        `hedge=False` disables hedging for this call (e.g. streams, whose output cannot be
+        taken back); `can_retry` is checked before each retry.
+        """
+        attempts = [] if attempts is None else attempts
+        for number in range(1, self.max_attempts + 1):
+            hedge_delay = await self.hedge_delays.delay(model) if self.hedge and hedge else None
+            try:
+                if hedge_delay is not None:
+                    return await self._hedged(request, model, number, attempts,
+                                              max(hedge_delay, self.min_hedge_delay))
+                return await self._attempt(request, model, str(number), attempts)
+            except Exception as e:
+                if number == self.max_attempts or not is_retryable(e) or not can_retry():
+                    raise
+                delay = self.backoff(number)
+                print(f"Retrying {model} in {delay:.2f}s after {type(e).__name__}: {e}", file=sys.stderr)
+                await asyncio.sleep(delay)
+
+
+def load_retry_policy(settings_path: Optional[Path] = None) -> RetryPolicy:
+    """Build the retry policy from the [Retry] section of settings.ini"""
+    config = configparser.ConfigParser()
+    settings_path = settings_path or Path(__file__).resolve().parent.parent / 'config' / 'settings.ini'
+    if settings_path.exists():
+        with open(settings_path, "r", encoding="utf-8-sig") as config_file:
+            config.read_file(config_file)
+
+    return RetryPolicy(
+        max_attempts=config.getint("Retry", "MaxAttempts", fallback=3),
+        base_delay=config.getfloat("Retry", "BaseDelay", fallback=0.5),
+        max_delay=config.getfloat("Retry", "MaxDelay", fallback=8.0),
+        attempt_timeout=config.getfloat("Retry", "AttemptTimeout", fallback=0.0),
+        hedge=config.getboolean("Retry", "Hedge", fallback=False),
+        hedge_delays=HedgeDelays(
+            percentile=config.getfloat("Retry", "HedgePercentile", fallback=95) / 100,
+            min_samples=config.getint("Retry", "HedgeMinSamples", fallback=20),
+        ),
+        min_hedge_delay=config.getfloat("Retry", "MinHedgeDelay", fallback=0.1),
+    )
+
+
+_RETRY_POLICY = None
+_RETRY_LOCK = threading.Lock()
+
+
+def get_retry_policy() -> RetryPolicy:
+    """Return the process-wide retry policy configured in settings.ini"""
+    global _RETRY_POLICY
+    if _RETRY_POLICY is None:
+        with _RETRY_LOCK:
+            if _RETRY_POLICY is None:
+                _RETRY_POLICY = load_retry_policy()
+    return _RETRY_POLICY
+
+
+def set_retry_policy(policy: Optional[RetryPolicy]) -> None:
+    """Replace the process-wide retry policy (None reloads it from settings.ini on next use)"""
+    global _RETRY_POLICY
+    _RETRY_POLICY = policy
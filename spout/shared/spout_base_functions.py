@@ -13,7 +13,7 @@ class SpoutBaseFunctionHandler(BaseHandler):
         self.is_cli = 'pythonw.exe' not in sys.executable.lower()
 
     def show_error_popup(self, message: str):
-        if self.is_cli:
+        if self.is_cli or not self.interactive:
             print(f"Error: {message}", file=sys.stderr)
         else:
             super().show_error_popup(message)
@@ -22,16 +22,19 @@ class SpoutBaseFunctionHandler(BaseHandler):
         try:
             # Use provided input if available, otherwise use clipboard
             if input is None:
-                input = pyperclip.paste()
+                input = await self.run_blocking(pyperclip.paste)
             
+            # Streamed output has already been written chunk by chunk
+            stream = self.is_cli and self.stream_output
             result = await self.process_with_plugin(
                 plugin_name=title,
                 spoutlet=spoutlet,
                 input=input,
-                is_cli=self.is_cli
+                is_cli=self.is_cli,
+                stream=stream
             )
             
-            if self.is_cli:
+            if self.is_cli and not stream:
                 print(result)
             return result
             
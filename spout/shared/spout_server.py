@@ -0,0 +1,340 @@
+import asyncio
+import configparser
+import io
+import json
+import os
+import socket
+import sys
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Optional
+
+from spout.shared.output_capture import capture_output, route_output
+
+DEFAULT_PORT = 47011
+
+def _spout_environment() -> dict:
+    """The SPOUT_ variables that change how a command runs"""
+    return {key: value for key, value in os.environ.items() if key.startswith("SPOUT_") and key != "SPOUT_NO_SERVER"}
+
+
+def get_server_address() -> dict:
+    """Resolve where the daemon listens from the [Server] section of settings.ini"""
+    settings = configparser.ConfigParser()
+    settings_path = Path(__file__).resolve().parent.parent / 'config' / 'settings.ini'
+    if settings_path.exists():
+        with open(settings_path, "r", encoding="utf-8-sig") as settings_file:
+            settings.read_file(settings_file)
+
+    host = settings.get("Server", "Host", fallback="")
+    port = settings.getint("Server", "Port", fallback=DEFAULT_PORT)
+    socket_path = settings.get("Server", "Socket", fallback="")
+
+    # Prefer a Unix socket where the platform supports it, unless a host was configured
+    if not host and not socket_path and hasattr(socket, "AF_UNIX") and os.name != "nt":
+        uid = os.getuid() if hasattr(os, "getuid") else "user"
+        socket_path = os.path.join(tempfile.gettempdir(), f"spout-{uid}.sock")
+
+    if socket_path:
+        return {"socket": socket_path}
+    return {"host": host or "127.0.0.1", "port": port}
+
+
+def _connect(address: dict) -> Optional[socket.socket]:
+    """Open a connection to the daemon, or return None if nothing is listening"""
+    try:
+        if "socket" in address:
+            if not os.path.exists(address["socket"]):
+                return None
+            conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            conn.connect(address["socket"])
+        else:
+            conn = socket.create_connection((address["host"], address["port"]), timeout=0.2)
+            conn.settimeout(None)
+        return conn
+    except OSError:
+        return None
+
+
+def forward_to_server(argv: list, address: Optional[dict] = None) -> Optional[int]:
+    """Send a CLI invocation to a running `spout serve` daemon.
+
+    The working directory and SPOUT_ environment go along with the arguments.
+    Returns the command's exit code, or None so the caller runs the command
+    in-process: when no daemon is reachable, when stdin is piped or redirected
+    (the daemon cannot read it), or when the daemon cannot run the command as
+    this process would.
+    """
+    if os.environ.get("SPOUT_NO_SERVER"):
+        return None
+    if sys.stdin is not None and not sys.stdin.isatty():
+        return None
+
+    conn = _connect(address or get_server_address())
+    if conn is None:
+        return None
+
+    request = {
+        "argv": argv,
+        "cwd": os.getcwd(),
+        "env": _spout_environment(),
+    }
+    with conn:
+        conn.sendall((json.dumps(request) + "\n").encode("utf-8"))
+
+        # Replay the daemon's output as it arrives, one JSON message per line
+        with conn.makefile("r", encoding="utf-8") as replies:
+            for line in replies:
+                message = json.loads(line)
+                if "local" in message:
+                    return None
+                elif "stdout" in message:
+                    sys.stdout.write(message["stdout"])
+                    sys.stdout.flush()
+                elif "stderr" in message:
+                    sys.stderr.write(message["stderr"])
+                    sys.stderr.flush()
+                elif "exit" in message:
+                    return message["exit"]
+
+    print("Error: spout server closed the connection unexpectedly", file=sys.stderr)
+    return 1
+
+
+class _ClientStream(io.TextIOBase):
+    """Forwards text written by a command to the connected client as it is produced"""
+
+    def __init__(self, send, channel: str):
+        self._send = send
+        self._channel = channel
+
+    @property
+    def encoding(self):
+        return "utf-8"
+
+    @property
+    def errors(self):
+        return "strict"
+
+    def writable(self):
+        return True
+
+    def write(self, text):
+        if not isinstance(text, str):
+            raise TypeError("write() argument must be str")
+        if text:
+            self._send({self._channel: text})
+        return len(text)
+
+    def isatty(self):
+        return False
+
+
+class _TerminalInput(io.TextIOBase):
+    """stdin of a forwarded command; the client keeps piped input to itself, so this is its terminal"""
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        raise OSError("The spout server cannot read from your terminal; pipe the input in "
+                      "or set SPOUT_NO_SERVER=1")
+
+    readline = read
+
+    def isatty(self):
+        return True
+
+
+class _CommandExit(Exception):
+    """Carries a SystemExit raised by a handler out of the shared event loop"""
+
+    def __init__(self, code):
+        super().__init__(code)
+        self.code = code
+
+
+class _WorkingDirectory:
+    """The server's working directory, switched to the directory each command came from.
+
+    The working directory belongs to the whole process, so commands from the same
+    directory run together and a command from another directory waits until they
+    have finished. While one is waiting, newly arrived commands queue behind it.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._cwd = os.getcwd()
+        self._running = 0
+        self._waiting = 0
+
+    @contextmanager
+    def use(self, cwd: str):
+        with self._condition:
+            if self._running and (self._cwd != cwd or self._waiting):
+                self._waiting += 1
+                try:
+                    self._condition.wait_for(lambda: not self._running)
+                finally:
+                    self._waiting -= 1
+            if self._cwd != cwd:
+                os.chdir(cwd)
+                self._cwd = cwd
+            self._running += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._running -= 1
+                if not self._running:
+                    self._condition.notify_all()
+
+
+class SpoutServer:
+    """Long-lived process that keeps the CLI, plugin registry and service state warm"""
+
+    def __init__(self, cli, address: Optional[dict] = None, workers: int = 8):
+        self.cli = cli
+        self.address = address or get_server_address()
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="spout-request")
+        self.working_directory = _WorkingDirectory()
+        self.loop = None
+
+    def warm_up(self) -> None:
+        """Load everything a cold CLI start would otherwise pay for on each call"""
+        registry = self.cli.registry
+        from spout.shared.token_counter import get_encoding
+        try:
+            get_encoding()
+        except Exception as e:
+            print(f"Warning: could not preload the token encoding: {e}", file=sys.stderr)
+        print(f"Loaded {len(registry.plugins)} core and {len(registry.addon_plugins)} add-on plugins", file=sys.stderr)
+
+    async def warm_up_connections(self) -> None:
+        """Pre-open provider connections for the preferred model when [Connections] WarmUp=1"""
+        from spout.shared.base_handler import BaseHandler
+        from spout.shared.client_pool import CLIENT_POOL
+
+        if not CLIENT_POOL.should_warm_up():
+            return
+        kernel = await BaseHandler().initialize_kernel()
+        for service in kernel.services.values():
+            await service.warm_up()
+
+    async def serve(self) -> None:
+        self.loop = asyncio.get_running_loop()
+
+        probe = _connect(self.address)
+        if probe is not None:
+            probe.close()
+            raise RuntimeError("A spout server is already running")
+        if "socket" in self.address and os.path.exists(self.address["socket"]):
+            os.unlink(self.address["socket"])  # stale socket left by a server that was killed
+
+        self.warm_up()
+        await self.warm_up_connections()
+
+        # Route print() and click.echo() output to whichever request produced it
+        route_output()
+
+        if "socket" in self.address:
+            socket_path = self.address["socket"]
+            server = await asyncio.start_unix_server(self._handle_client, path=socket_path)
+            location = socket_path
+        else:
+            server = await asyncio.start_server(self._handle_client, self.address["host"], self.address["port"])
+            location = f"{self.address['host']}:{self.address['port']}"
+
+        print(f"Spout server listening on {location}", file=sys.stderr)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            if "socket" in self.address and os.path.exists(self.address["socket"]):
+                os.unlink(self.address["socket"])
+            self.executor.shutdown(wait=False)
+
+    def run_coroutine(self, coro):
+        """Run a handler coroutine on the shared loop from a request thread"""
+        async def contained():
+            # SystemExit escaping a task would stop the whole event loop
+            try:
+                return await coro
+            except SystemExit as e:
+                raise _CommandExit(e.code)
+
+        try:
+            return asyncio.run_coroutine_threadsafe(contained(), self.loop).result()
+        except _CommandExit as e:
+            # Back on the request thread, exit the same way asyncio.run() would have
+            raise SystemExit(e.code)
+
+    async def _handle_client(self, reader, writer) -> None:
+        def send(message):
+            data = (json.dumps(message) + "\n").encode("utf-8")
+            self.loop.call_soon_threadsafe(writer.write, data)
+
+        try:
+            line = await reader.readline()
+            if not line:
+                return
+            request = json.loads(line)
+            reason = self._local_only(request)
+            if reason:
+                writer.write((json.dumps({"local": reason}) + "\n").encode("utf-8"))
+                await writer.drain()
+                return
+            exit_code = await self.loop.run_in_executor(self.executor, self._run_command, request, send)
+            # Output written by the command was queued ahead of this point, so the exit code goes last
+            writer.write((json.dumps({"exit": exit_code}) + "\n").encode("utf-8"))
+            await writer.drain()
+        except (ConnectionError, json.JSONDecodeError) as e:
+            print(f"Dropped client request: {e}", file=sys.stderr)
+        finally:
+            writer.close()
+
+    @staticmethod
+    def _local_only(request: dict) -> Optional[str]:
+        """Why a command has to run in the client's own process, or None if the server can run it.
+
+        Commands run in the client's working directory, but share the server's
+        environment, so a command run under other SPOUT_ settings is handed back.
+        """
+        if not os.path.isdir(request.get("cwd", "")):
+            return "working directory not available to the server"
+        if request.get("env", {}) != _spout_environment():
+            return "different SPOUT_ environment"
+        return None
+
+    def _run_command(self, request: dict, send) -> int:
+        """Execute one CLI invocation in the client's directory, with its output captured for the client"""
+        stdout = _ClientStream(send, "stdout")
+        stderr = _ClientStream(send, "stderr")
+        with self.working_directory.use(request["cwd"]), capture_output(stdout, stderr, _TerminalInput()):
+            return self._invoke_cli(request.get("argv", []), stdout, stderr)
+
+    def _invoke_cli(self, argv: list, stdout, stderr) -> int:
+        import click
+
+        try:
+            result = self.cli.main(
+                args=argv,
+                prog_name="spout",
+                standalone_mode=False,
+                obj={"argv": ["spout"] + list(argv), "run_coroutine": self.run_coroutine},
+            )
+            return result if isinstance(result, int) else 0
+        except click.ClickException as e:
+            e.show(file=stderr)
+            return e.exit_code
+        except click.exceptions.Abort:
+            stderr.write("Aborted!\n")
+            return 1
+        except SystemExit as e:
+            return e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+        except Exception as e:
+            stderr.write(f"Error: {str(e)}\n")
+            return 1
@@ -0,0 +1,173 @@
+import json
+import os
+import re
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+# Spoutlet directories in order of precedence
+SPOUTLET_SOURCES = ["local", "pro", "plugins"]
+
+_VARIABLE_PATTERN = re.compile(r"\{\{\$(.*?)\}\}")
+
+
+class PromptTemplate:
+    """A prompt.txt split once into literal text and {{$variable}} segments"""
+
+    def __init__(self, text: str):
+        self.text = text
+        # Even positions hold literal text, odd positions hold variable names
+        self.segments = _VARIABLE_PATTERN.split(text)
+
+    def render(self, variables: Dict[str, Any]) -> str:
+        parts = self.segments[:]
+        for i in range(1, len(parts), 2):
+            name = parts[i]
+            # Undeclared variables are left in place, as written in the template
+            parts[i] = str(variables[name]) if name in variables else "{{$" + name + "}}"
+        return "".join(parts)
+
+
+class SpoutletEntry:
+    """Everything needed to run one spoutlet, plus the file stamps it was built from"""
+
+    def __init__(self, config: Dict[str, Any], template: PromptTemplate, files: List[str], stamp: List):
+        self.config = config
+        self.template = template
+        self.files = files
+        self.stamp = stamp
+
+
+def _mtime(path: str) -> Optional[float]:
+    try:
+        return os.stat(path).st_mtime
+    except OSError:
+        return None
+
+
+class SpoutletIndex:
+    """Process-wide lookup of spoutlet configs and compiled prompts.
+
+    An entry is keyed by plugin directory and spoutlet name and stamped with the
+    mtimes of every directory that takes part in resolution, so creating, editing or
+    removing a spoutlet in any of the local/pro/plugins directories rebuilds it. The
+    index is saved to disk so later processes skip the directory scan as well.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self._entries: Dict[str, SpoutletEntry] = {}
+        self._lock = threading.Lock()
+        if path:
+            self._load()
+
+    @staticmethod
+    def _key(parent_directory: str, spoutlet: str) -> str:
+        return f"{os.path.abspath(parent_directory)}|{spoutlet}"
+
+    @staticmethod
+    def _candidate_dirs(parent_directory: str, spoutlet: str) -> List[Tuple[str, str, str]]:
+        parent_directory = os.path.abspath(parent_directory)
+        base_name = os.path.basename(parent_directory)
+        dirs = []
+        for suffix in SPOUTLET_SOURCES:
+            plugin_dir = os.path.join(parent_directory, f"{base_name}_{suffix}")
+            dirs.append((suffix, plugin_dir, os.path.join(plugin_dir, spoutlet)))
+        return dirs
+
+    def _current_stamp(self, parent_directory: str, spoutlet: str, files: List[str]) -> List:
+        stamp = []
+        for _, plugin_dir, spoutlet_dir in self._candidate_dirs(parent_directory, spoutlet):
+            stamp += [_mtime(plugin_dir), _mtime(spoutlet_dir)]
+        return stamp + [_mtime(path) for path in files]
+
+    def _build(self, parent_directory: str, spoutlet: str) -> SpoutletEntry:
+        base_name = os.path.basename(os.path.abspath(parent_directory))
+
+        for suffix, _, spoutlet_dir in self._candidate_dirs(parent_directory, spoutlet):
+            if not os.path.isdir(spoutlet_dir):
+                continue
+
+            json_files = sorted(f for f in os.listdir(spoutlet_dir) if f.endswith('.json'))
+            txt_files = sorted(f for f in os.listdir(spoutlet_dir) if f.endswith('.txt'))
+            if not json_files or not txt_files:
+                continue  # Skip if missing required files
+
+            if len(json_files) > 1 or len(txt_files) > 1:
+                print(f"Warning: Multiple JSON or TXT files found in {spoutlet_dir}. Using first files found.")
+
+            config_path = os.path.join(spoutlet_dir, json_files[0])
+            prompt_path = os.path.join(spoutlet_dir, txt_files[0])
+
+            with open(config_path, "r") as config_file:
+                config = json.load(config_file)
+            config["plugin_name"] = base_name
+            config["skill_name"] = spoutlet
+            config["source"] = suffix  # Store where we found the spoutlet
+
+            with open(prompt_path, "r") as prompt_file:
+                template = PromptTemplate(prompt_file.read())
+
+            files = [config_path, prompt_path]
+            return SpoutletEntry(config, template, files, self._current_stamp(parent_directory, spoutlet, files))
+
+        raise FileNotFoundError(f"Plugin {spoutlet} not found in any directory")
+
+    def _is_current(self, parent_directory: str, spoutlet: str, entry: SpoutletEntry) -> bool:
+        return self._current_stamp(parent_directory, spoutlet, entry.files) == entry.stamp
+
+    def get(self, parent_directory: str, spoutlet: str) -> SpoutletEntry:
+        """Resolve a spoutlet (local > pro > plugins), rebuilding it only when its files changed"""
+        key = self._key(parent_directory, spoutlet)
+        entry = self._entries.get(key)
+        if entry is not None and self._is_current(parent_directory, spoutlet, entry):
+            return entry
+
+        entry = self._build(parent_directory, spoutlet)
+        with self._lock:
+            self._entries[key] = entry
+            self._save()
+        return entry
+
+    def _load(self) -> None:
+        try:
+            with open(self.path, "r", encoding="utf-8") as index_file:
+                data = json.load(index_file)
+            for key, item in data.get("entries", {}).items():
+                self._entries[key] = SpoutletEntry(
+                    item["config"], PromptTemplate(item["prompt"]), item["files"], item["stamp"]
+                )
+        except (OSError, ValueError, KeyError, TypeError):
+            # A missing or unreadable index is simply rebuilt as spoutlets are used
+            self._entries = {}
+
+    def _save(self) -> None:
+        if not self.path:
+            return
+        data = {
+            "entries": {
+                key: {"config": entry.config, "prompt": entry.template.text, "files": entry.files, "stamp": entry.stamp}
+                for key, entry in self._entries.items()
+            }
+        }
+        # Write to a temporary file first so concurrent processes never read a partial index
+        temp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with open(temp_path, "w", encoding="utf-8") as index_file:
+                json.dump(data, index_file)
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            print(f"Warning: could not save spoutlet index: {e}")
+
+
+_SPOUTLET_INDEX = None
+
+
+def get_spoutlet_index() -> SpoutletIndex:
+    """Return the process-wide index, persisted next to settings.ini"""
+    global _SPOUTLET_INDEX
+    if _SPOUTLET_INDEX is None:
+        config_dir = Path(__file__).resolve().parent.parent / 'config'
+        config_dir.mkdir(parents=True, exist_ok=True)
+        _SPOUTLET_INDEX = SpoutletIndex(str(config_dir / 'spoutlet_index.json'))
+    return _SPOUTLET_INDEX
@@ -1,19 +1,66 @@
+import asyncio
+import io
 import json
 import os
 import re
-import subprocess
+import time
+import xml.etree.ElementTree as ET
 from configparser import ConfigParser
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, List, Optional
 
+from spout.shared.output_capture import capture_output, route_output
+
+SUCCESS_MARK = " [PASS] "
+FAILURE_MARK = " [FAIL] "
+
+
+class _TimedMetricsLogger:
+    """Wraps a handler's APIMetricsLogger to also keep the timing of every call it logs"""
+
+    def __init__(self, logger):
+        self._logger = logger
+        self.calls: List[Dict] = []
+
+    def __getattr__(self, name):
+        return getattr(self._logger, name)
+
+    def log_kernel_invoke(self, func):
+        logged = self._logger.log_kernel_invoke(func)
+
+        async def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            call = {"duration": None, "first_token": None, "cache": None}
+            self.calls.append(call)
+            try:
+                result = await logged(*args, **kwargs)
+                call["first_token"] = getattr(result, "time_to_first_token", None)
+                call["cache"] = getattr(result, "cache_status", None)
+                return result
+            finally:
+                call["duration"] = time.perf_counter() - start
+
+        return wrapper
+
 
 class SharedSpoutletTester:
-    """Base class for testing Spout modules"""
+    """Base class for testing Spout modules.
+
+    Cases run in-process through the plugin handlers, up to `concurrency` at once and
+    each under its own timeout. Besides test_results.txt, every run writes
+    test_results.json and a JUnit test_results.xml with per-case timings.
+    """
     
-    def __init__(self, module_name: str, test_cases_path: Optional[str | Path] = None):
+    def __init__(self, module_name: str, test_cases_path: Optional[str | Path] = None, registry=None,
+                 concurrency: int = 4, cache_mode: str = "use", semaphore: Optional[asyncio.Semaphore] = None):
         self.module_name = module_name
         self.module_path = self._find_module_path()
+        self.registry = registry
+        self.concurrency = max(concurrency, 1)
+        self.cache_mode = cache_mode
+        # A shared semaphore limits concurrency across several modules tested together
+        self.semaphore = semaphore
         
         # Handle test_cases_path as either a full path or just a filename
         if test_cases_path:
@@ -68,11 +115,16 @@ class SharedSpoutletTester:
         
     def run_module_tests(self, specific_spoutlet: Optional[str] = None, examples: bool = False) -> str:
         """Run tests for the module and return results"""
+        return asyncio.run(self.run_module_tests_async(specific_spoutlet, examples))
+
+    async def run_module_tests_async(self, specific_spoutlet: Optional[str] = None, examples: bool = False) -> str:
+        """Run the module's cases concurrently, save the reports and return the text results"""
         if examples:
             self._clear_sample_files()  # Clear existing sample files if examples flag is set
         
         results = []
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self.case_reports: List[Dict] = []
         
         try:
             test_cases = self._load_test_cases()
@@ -84,15 +136,27 @@ class SharedSpoutletTester:
                 f"Test Model: {default_model}\n"
             ])
             
-            for case in test_cases["test_cases"]:
-                if not specific_spoutlet or case["spoutlet"] == specific_spoutlet:
-                    results.extend(self._run_single_test(case, examples))
+            cases = [case for case in test_cases["test_cases"]
+                     if not specific_spoutlet or case["spoutlet"] == specific_spoutlet]
+            route_output()
+            semaphore = self.semaphore or asyncio.Semaphore(self.concurrency)
+            start = time.perf_counter()
+            self.case_reports = await asyncio.gather(*(self._run_case(case, semaphore) for case in cases))
+            self.duration = time.perf_counter() - start
+
+            # Reports and sample files follow the order of the test cases file, not completion order
+            for case, report in zip(cases, self.case_reports):
+                results.extend(self._format_case(case, report))
+                if examples and case.get('sample', False) and report["passed"]:
+                    self._write_output_to_file(case, self._build_command(case), report["output"])
                     
         except Exception as e:
             results.append(f"Error running tests: {str(e)}")
-            
+            self.duration = 0.0
+
+        self._save_reports(timestamp)
         return self._save_results(results)
-        
+
     def _load_test_cases(self) -> Dict:
         """Load test cases from JSON file"""
         try:
@@ -103,8 +167,102 @@ class SharedSpoutletTester:
         except Exception as e:
             raise Exception(f"Failed to load test cases from {self.test_cases_path}: {str(e)}")
             
-    def _run_single_test(self, case: Dict, examples: bool = False) -> List[str]:
-        """Run a single test case and return results"""
+    def _get_registry(self):
+        if self.registry is None:
+            from spout.spout_cli import PluginRegistry
+            self.registry = PluginRegistry()
+        return self.registry
+
+    def _build_command(self, case: Dict) -> List[str]:
+        """The spout command line equivalent to a test case"""
+        cmd = ["spout", self.module_name]
+        if case.get("spoutlet") != "default":
+            cmd.extend(["-u", case["spoutlet"]])
+            
+        # Add parameters first
+        for param, value in case.get('parameters', {}).items():
+            if param != 'input':  # Skip input parameter as it's handled separately
+                cmd.extend([f"--{param}", str(value)])
+            
+        # Add input as positional argument
+        input = case.get('parameters', {}).get('input') or case.get('input', '')
+        if input:
+            cmd.append(input)
+        return cmd
+
+    def _build_kwargs(self, case: Dict) -> Dict:
+        """Handler arguments for a test case, as the CLI would pass them"""
+        registry = self._get_registry()
+        plugin = registry.plugins.get(self.module_name) or registry.addon_plugins.get(self.module_name)
+        options = plugin.options if plugin else []
+        kwargs = {option.name: None for option in options}
+        for param, value in case.get('parameters', {}).items():
+            # Parameters are named after the option flags; the CLI hands every value over as a string
+            name = next((option.name for option in options if f"--{param}" in option.flags),
+                        param.replace("-", "_"))
+            kwargs[name] = None if value is None else str(value)
+        if not kwargs.get('input') and case.get('input'):
+            kwargs['input'] = case['input']
+        if case.get("spoutlet") and case["spoutlet"] != "default":
+            kwargs['spoutlet'] = case["spoutlet"]
+        return kwargs
+
+    async def _execute(self, handler, case: Dict):
+        try:
+            return await self._get_registry().execute_plugin(self.module_name, handler, **self._build_kwargs(case))
+        except SystemExit as e:
+            # Handlers exit after reporting an error; inside a task that would stop the event loop
+            raise RuntimeError(f"Handler exited with status {e.code}") from None
+
+    async def _run_case(self, case: Dict, semaphore: asyncio.Semaphore) -> Dict:
+        """Run one case through its handler and return its report with a timing breakdown"""
+        registry = self._get_registry()
+        timeout = case.get('timeout', 30)
+        report = {"name": case['name'], "spoutlet": case['spoutlet'], "passed": False,
+                  "output": "", "error": None}
+        queued = time.perf_counter()
+        async with semaphore:
+            started = time.perf_counter()
+            handler = registry.get_handler(self.module_name)()
+            handler.cache_mode = self.cache_mode
+            handler.interactive = False
+            metrics = _TimedMetricsLogger(handler.api_metrics_logger)
+            handler.api_metrics_logger = metrics
+
+            # Handlers print their result as well as returning it, so keep each case's output apart
+            stdout, stderr = io.StringIO(), io.StringIO()
+            try:
+                with capture_output(stdout, stderr):
+                    result = await asyncio.wait_for(self._execute(handler, case), timeout)
+                output = result if isinstance(result, str) else stdout.getvalue()
+                report["output"] = output.rstrip()
+                report["passed"] = bool(re.search(case['expected_pattern'], output))
+                if not report["passed"]:
+                    report["error"] = "Output did not match the expected pattern"
+            except asyncio.TimeoutError:
+                report["output"] = stdout.getvalue().rstrip()
+                report["error"] = f"Timeout after {timeout}s"
+            except Exception as e:
+                report["output"] = stdout.getvalue().rstrip()
+                report["error"] = stderr.getvalue().strip() or str(e) or type(e).__name__
+            finished = time.perf_counter()
+
+        model_time = sum(call["duration"] or 0.0 for call in metrics.calls)
+        first_tokens = [call["first_token"] for call in metrics.calls if call["first_token"] is not None]
+        report["timing"] = {
+            "queued": round(started - queued, 3),
+            "total": round(finished - started, 3),
+            "model": round(model_time, 3),
+            # Handler, prompt and parsing work around the model calls; concurrent calls can overlap
+            "overhead": round(max(finished - started - model_time, 0.0), 3),
+            "first_token": round(first_tokens[0], 3) if first_tokens else None,
+            "calls": len(metrics.calls),
+            "cache_hits": sum(1 for call in metrics.calls if call["cache"] == "hit"),
+        }
+        return report
+
+    def _format_case(self, case: Dict, report: Dict) -> List[str]:
+        """Text results of one case, in the test_results.txt format"""
         results = []
         
         # Start with test name and spoutlet
@@ -121,57 +279,19 @@ class SharedSpoutletTester:
         
         # Add output section
         results.append("Output:")
-        
-        # Build CLI command
-        cmd = ["spout", self.module_name]
-        if case.get("spoutlet") != "default":
-            cmd.extend(["-u", case["spoutlet"]])
-            
-        # Add parameters first
-        for param, value in case.get('parameters', {}).items():
-            if param != 'input':  # Skip input parameter as it's handled separately
-                cmd.extend([f"--{param}", str(value)])
-            
-        # Add input as positional argument
-        input = case.get('parameters', {}).get('input') or case.get('input', '')
-        if input:
-            cmd.append(input)
-            
-        # Run command and capture output
-        try:
-            start_time = datetime.now()
-            output = subprocess.run(
-                cmd, 
-                capture_output=True, 
-                text=True,
-                timeout=case.get('timeout', 30)
-            )
-            end_time = datetime.now()
-            operation_time = (end_time - start_time).total_seconds()
-            
-            results.append(output.stdout.rstrip())  # Remove trailing whitespace
-            results.append("")  # Add exactly one blank line
-            
-            SUCCESS_MARK = " [PASS] "
-            FAILURE_MARK = " [FAIL] "
-            
-            # Check if test passed
-            test_passed = output.returncode == 0 and re.search(case['expected_pattern'], output.stdout)
-            
-            if examples and case.get('sample', False) and test_passed:
-                self._write_output_to_file(case, cmd, output.stdout)
-            
-            if test_passed:
-                results.append(f"{SUCCESS_MARK} {operation_time:.2f}s")
-            else:
-                results.append(f"{FAILURE_MARK} {operation_time:.2f}s")
-                if output.stderr:
-                    results.append(f"Error: {output.stderr}")
-                    
-        except subprocess.TimeoutExpired:
-            results.append(f"{FAILURE_MARK} Test failed - Timeout")
-        except Exception as e:
-            results.append(f"{FAILURE_MARK} Test failed - Error: {str(e)}")
+        results.append(report["output"])
+        results.append("")  # Add exactly one blank line
+
+        timing = report["timing"]
+        if report["passed"]:
+            results.append(f"{SUCCESS_MARK} {timing['total']:.2f}s (model {timing['model']:.2f}s, "
+                           f"{timing['calls']} calls)")
+        elif report["error"] and report["error"].startswith("Timeout"):
+            results.append(f"{FAILURE_MARK} Test failed - {report['error']}")
+        else:
+            results.append(f"{FAILURE_MARK} {timing['total']:.2f}s")
+            if report["error"]:
+                results.append(f"Error: {report['error']}")
             
         results.append("\n---\n")
         return results
@@ -209,6 +329,44 @@ class SharedSpoutletTester:
             f.write("Output:\n")
             f.write(output + "\n")
         
+    def _save_reports(self, timestamp: str) -> None:
+        """Write test_results.json and the JUnit test_results.xml next to test_results.txt"""
+        tests_dir = self.module_path / "tests"
+        tests_dir.mkdir(exist_ok=True)
+        passed = sum(1 for report in self.case_reports if report["passed"])
+        summary = {
+            "module": self.module_name,
+            "run": timestamp,
+            "model": self._get_default_model(),
+            "tests": len(self.case_reports),
+            "passed": passed,
+            "failed": len(self.case_reports) - passed,
+            "duration": round(self.duration, 3),
+            "cases": self.case_reports,
+        }
+        with open(tests_dir / "test_results.json", "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2, ensure_ascii=False)
+
+        suite = ET.Element("testsuite", {
+            "name": f"spout.{self.module_name}",
+            "tests": str(summary["tests"]),
+            "failures": str(summary["failed"]),
+            "errors": "0",
+            "time": f"{self.duration:.3f}",
+            "timestamp": timestamp.replace(" ", "T"),
+        })
+        for report in self.case_reports:
+            testcase = ET.SubElement(suite, "testcase", {
+                "classname": f"spout.{self.module_name}.{report['spoutlet']}",
+                "name": report["name"],
+                "time": f"{report['timing']['total']:.3f}",
+            })
+            if not report["passed"]:
+                failure = ET.SubElement(testcase, "failure", {"message": report["error"] or "Test failed"})
+                failure.text = report["error"]
+            ET.SubElement(testcase, "system-out").text = report["output"]
+        ET.ElementTree(suite).write(tests_dir / "test_results.xml", encoding="utf-8", xml_declaration=True)
+
     def _save_results(self, results: List[str]) -> str:
         """Save results to file and return results string"""
         results_str = "\n".join(results)
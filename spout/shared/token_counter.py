@@ -0,0 +1,54 @@
+import configparser
+import threading
+from pathlib import Path
+from typing import Optional
+
+# Rough characters-per-token ratio of the GPT/Claude tokenizers on English text
+CHARS_PER_TOKEN = 4
+
+_SETTINGS = None
+_ENCODINGS = {}
+_LOCK = threading.Lock()
+
+
+def _get_settings() -> dict:
+    """Read [General] TokenCountModel and TokenCountMode from settings.ini once per process"""
+    global _SETTINGS
+    if _SETTINGS is None:
+        config = configparser.ConfigParser()
+        settings_path = Path(__file__).resolve().parent.parent / 'config' / 'settings.ini'
+        if settings_path.exists():
+            with open(settings_path, "r", encoding="utf-8-sig") as config_file:
+                config.read_file(config_file)
+        _SETTINGS = {
+            "model": config.get("General", "TokenCountModel", fallback="gpt-3.5-turbo"),
+            "approximate": config.get("General", "TokenCountMode", fallback="exact").lower() == "approximate",
+        }
+    return _SETTINGS
+
+
+def get_encoding(model: Optional[str] = None):
+    """Return the shared tiktoken encoding for `model` (default: TokenCountModel)"""
+    model = model or _get_settings()["model"]
+    if model not in _ENCODINGS:
+        with _LOCK:
+            if model not in _ENCODINGS:
+                import tiktoken
+                _ENCODINGS[model] = tiktoken.encoding_for_model(model)
+    return _ENCODINGS[model]
+
+
+def estimate_tokens(text: str) -> int:
+    """Fast approximate count for pre-flight estimates; never loads a tokenizer"""
+    if not text:
+        return 0
+    return max(1, round(len(text) / CHARS_PER_TOKEN))
+
+
+def count_tokens(text: str) -> int:
+    """Count tokens locally, or estimate them when TokenCountMode=approximate"""
+    if not text:
+        return 0
+    if _get_settings()["approximate"]:
+        return estimate_tokens(text)
+    return len(get_encoding().encode(text))
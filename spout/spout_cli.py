@@ -1,6 +1,7 @@
 import asyncio
 import configparser
 import importlib
+import json
 import sys
 import time
 from pathlib import Path
@@ -8,8 +9,11 @@ from typing import Optional, Type
 
 import click
 
-from spout.shared.spout_base_functions import SpoutBaseFunctionHandler
-from spout.shared.test_runner import SharedSpoutletTester
+# Choices for `stats --by` and `bench --stage`, the GROUP_KEYS of metrics_stats and STAGES of bench.
+# Built-in commands import their modules when they run, so forwarding to a server loads none of them.
+STATS_GROUP_KEYS = ['model', 'spoutlet', 'window']
+BENCH_STAGES = ['cli_cold_start', 'registry_load', 'initialize_kernel', 'add_plugin', 'prompt_render',
+                'token_count', 'metrics_write', 'e2e']
 
 # List of plugins that use SpoutBaseFunctionHandler
 BASE_HANDLER_PLUGINS = set(['reduce', 'enhance', 'expand', 'search'])
@@ -101,6 +105,8 @@ class PluginRegistry:
     
     def get_handler(self, plugin_name: str) -> Type:
         """Get the appropriate handler class for a plugin"""
+        from spout.shared.spout_base_functions import SpoutBaseFunctionHandler
+
         if plugin_name in BASE_HANDLER_PLUGINS:
             return SpoutBaseFunctionHandler
         return self.handlers.get(plugin_name, SpoutBaseFunctionHandler)
@@ -125,16 +131,20 @@ class PluginRegistry:
             raise click.ClickException(f"Plugin execution failed: {str(e)}")
 
 def run_module_tests(module_name: str, spoutlet: Optional[str] = None, 
-                    examples: bool = False, test_file: Optional[str] = None) -> None:
+                    examples: bool = False, test_file: Optional[str] = None,
+                    registry: Optional[PluginRegistry] = None, cache_mode: str = 'use',
+                    run_coroutine=asyncio.run) -> None:
     """Run tests for a specific module"""
+    from spout.shared.test_runner import SharedSpoutletTester
+
     try:
         # Convert empty string to None for test_file
         if test_file == '':
             test_file = None
             
         # Create tester instance with optional test file
-        tester = SharedSpoutletTester(module_name, test_cases_path=test_file)
-        results = tester.run_module_tests(spoutlet, examples)
+        tester = SharedSpoutletTester(module_name, test_cases_path=test_file, registry=registry, cache_mode=cache_mode)
+        results = run_coroutine(tester.run_module_tests_async(spoutlet, examples))
         
         click.echo(results)
         
@@ -196,17 +206,333 @@ def update_preferred_model(model_name: str) -> None:
     
     click.echo(f"Preferred model updated to: {model_name}")
 
+@click.command(name='serve', help="""Run a resident server that keeps Spout loaded between calls.
+
+    While the server is running, other `spout` invocations forward their command to it instead of
+    starting up from scratch. Set SPOUT_NO_SERVER=1 to bypass a running server.
+
+    Forwarded commands run in the caller's working directory; commands from different
+    directories take turns. Commands with piped input, and commands run under other SPOUT_
+    environment variables, run in-process instead.
+    """)
+@click.option('--socket', 'socket_path', help='Unix socket path to listen on', default=None)
+@click.option('--host', help='Listen on a TCP host instead of a Unix socket', default=None)
+@click.option('--port', type=int, help='TCP port to listen on (with --host)', default=None)
+@click.option('--workers', type=int, default=8, show_default=True, help='Maximum commands handled at once')
+@click.pass_context
+def serve_command(ctx: click.Context, socket_path: Optional[str], host: Optional[str],
+                  port: Optional[int], workers: int):
+    """Start the resident Spout server"""
+    from spout.shared.spout_server import SpoutServer
+
+    address = None
+    if socket_path:
+        address = {'socket': socket_path}
+    elif host or port:
+        address = {'host': host or '127.0.0.1', 'port': port or 47011}
+
+    server = SpoutServer(ctx.find_root().command, address=address, workers=workers)
+    try:
+        asyncio.run(server.serve())
+    except KeyboardInterrupt:
+        pass
+    except RuntimeError as e:
+        raise click.ClickException(str(e))
+
+@click.command(name='batch', help="""Run many plugin calls from a JSONL file (or stdin) with bounded concurrency.
+
+    Each line is a JSON object such as
+    {"module": "reduce", "spoutlet": "namer", "parameters": {"input": "..."}, "id": "optional"}.
+    One JSONL result with the line number, "output" or "error" is written per request.
+
+    With --checkpoint, successful lines are recorded and skipped when the same command is
+    run again, so a failed or interrupted batch can be resumed.
+    """)
+@click.argument('input_file', required=False, default='-')
+@click.option('--output', '-o', default='-', help='File to write JSONL results to (default: stdout)')
+@click.option('--concurrency', '-c', type=int, default=8, show_default=True, help='Maximum requests in flight')
+@click.option('--completion-order', is_flag=True, help='Write results as they finish instead of in input order')
+@click.option('--checkpoint', help='Checkpoint file used to resume failed or interrupted batches')
+@click.pass_context
+def batch_command(ctx: click.Context, input_file: str, output: str, concurrency: int,
+                  completion_order: bool, checkpoint: Optional[str]):
+    """Run a JSONL batch of plugin calls"""
+    from spout.shared.batch_runner import BatchRunner
+
+    runner = BatchRunner(
+        ctx.find_root().command.registry,
+        concurrency=max(concurrency, 1),
+        ordered=not completion_order,
+        checkpoint_path=checkpoint,
+        cache_mode=ctx.obj.get('cache_mode', 'use'),
+    )
+
+    input_stream = sys.stdin if input_file == '-' else open(input_file, 'r', encoding='utf-8')
+    # Resumed runs append to the results of the earlier attempt
+    output_stream = sys.stdout if output == '-' else open(output, 'a' if checkpoint else 'w', encoding='utf-8')
+    try:
+        run_coroutine = ctx.obj.get('run_coroutine', asyncio.run)
+        summary = run_coroutine(runner.run(input_stream, output_stream))
+    finally:
+        if input_stream is not sys.stdin:
+            input_stream.close()
+        if output_stream is not sys.stdout:
+            output_stream.close()
+
+    click.echo(f"Batch complete: {summary['succeeded']} succeeded, {summary['failed']} failed, "
+               f"{summary['skipped']} skipped", err=True)
+    if summary['failed']:
+        ctx.exit(1)
+
+@click.command(name='stats', help="""Report latency, throughput and error rates from api_metrics.csv.
+
+    Shows call counts, error rate, cache hits, p50/p95/p99 duration and tokens/sec per group.
+    Group by model, spoutlet (module:spoutlet with the * local / ^ pro markers) and/or time window.
+    The CSV is streamed row by row; --index keeps an incremental SQLite sidecar so repeated runs
+    only parse new rows.
+    """)
+@click.option('--by', 'group_by', multiple=True, type=click.Choice(STATS_GROUP_KEYS), help='Group by (repeatable, default: model)')
+@click.option('--window', default='1h', show_default=True, help='Window size when grouping by window (e.g. 15m, 1h, 1d; aligned to local midnight)')
+@click.option('--since', help='Only calls since a duration ago (e.g. 24h, 7d) or a date (YYYY-MM-DD)')
+@click.option('--model', help='Only calls to this model')
+@click.option('--spoutlet', help='Only calls to this module:spoutlet')
+@click.option('--format', 'output_format', type=click.Choice(['table', 'json']), default='table', show_default=True)
+@click.option('--index', 'use_index', is_flag=True, help='Read through the incremental SQLite index next to the CSV')
+@click.option('--include-rotated', is_flag=True, help='Also read rotated logs (api_metrics.csv.1, .2, ...)')
+@click.option('--file', 'metrics_file', help='Metrics CSV to read (default: the configured api_metrics.csv)')
+def stats_command(group_by, window: str, since: Optional[str], model: Optional[str], spoutlet: Optional[str],
+                  output_format: str, use_index: bool, include_rotated: bool, metrics_file: Optional[str]):
+    """Summarise the API metrics log"""
+    from spout.shared.api_logging import APIMetricsLogger
+    from spout.shared.metrics_stats import (
+        MetricsIndex,
+        aggregate,
+        format_table,
+        parse_duration,
+        parse_since,
+        read_csv_rows,
+    )
+
+    try:
+        window_seconds = parse_duration(window)
+        since_time = parse_since(since) if since else None
+    except ValueError as e:
+        raise click.BadParameter(str(e))
+
+    if metrics_file is None:
+        logger = APIMetricsLogger()
+        logger.flush()  # include rows still buffered in this process (e.g. a running server)
+        metrics_file = logger.filename
+    group_by = list(group_by) or ['model']
+
+    rotated = sorted(Path(metrics_file).parent.glob(Path(metrics_file).name + '.[0-9]*'),
+                     key=lambda path: int(path.suffix[1:]) if path.suffix[1:].isdigit() else 0, reverse=True)
+    rotated = [str(path) for path in rotated]
+    paths = rotated + [metrics_file] if include_rotated else [metrics_file]
+
+    index = None
+    if use_index:
+        index = MetricsIndex(str(Path(metrics_file).with_suffix('.sqlite')))
+        # Rotated logs are always brought up to date, so rows appended just before a rotation are kept
+        index.update(rotated + [metrics_file])
+        rows = index.rows(paths, since_time)
+    else:
+        rows = read_csv_rows(paths)
+
+    try:
+        results = aggregate(rows, group_by, window=window_seconds, since=since_time, model=model, spoutlet=spoutlet)
+    finally:
+        if index:
+            index.close()
+
+    if output_format == 'json':
+        click.echo(json.dumps(results, indent=2))
+    elif results:
+        click.echo(format_table(results, group_by))
+    else:
+        click.echo("No API calls recorded for the selected filters.")
+
+@click.command(name='sessions', help="""List, export, import or delete converse sessions.
+
+    Without options, lists the sessions in the store with their turn and token totals.
+    Exports and imports use the same <USER>/<ASSISTANT> text format as converse history files.
+    """)
+@click.option('--export', 'export_session', metavar='SESSION', help='Write a session in the history text format')
+@click.option('--import', 'import_session', metavar='SESSION', help='Append the turns of --file to a session')
+@click.option('--delete', 'delete_session', metavar='SESSION', help='Delete a session and its turns')
+@click.option('--file', 'history_file', help='History file to import from or export to (default: stdout for --export)')
+def sessions_command(export_session: Optional[str], import_session: Optional[str], delete_session: Optional[str],
+                     history_file: Optional[str]):
+    """Manage the converse session store"""
+    from spout.core.converse.session_store import get_session_store
+
+    store = get_session_store()
+    if export_session:
+        if history_file:
+            with open(history_file, 'w', encoding='utf-8') as f:
+                count = store.export_text(export_session, f)
+            click.echo(f"Exported {count} turns to {history_file}", err=True)
+        else:
+            store.export_text(export_session, sys.stdout)
+    elif import_session:
+        if not history_file:
+            raise click.UsageError("--import needs --file")
+        with open(history_file, 'r', encoding='utf-8', errors='replace') as f:
+            count = store.import_text(import_session, f.read())
+        click.echo(f"Imported {count} turns into {import_session}")
+    elif delete_session:
+        store.delete(delete_session)
+        click.echo(f"Deleted {delete_session}")
+    else:
+        sessions = store.sessions()
+        if not sessions:
+            click.echo("No sessions stored.")
+        for entry in sessions:
+            updated = time.strftime('%Y-%m-%d %H:%M', time.localtime(entry['updated']))
+            click.echo(f"{entry['session']}  {entry['turns']} turns  {entry['tokens']} tokens  updated {updated}")
+
+@click.command(name='test', help="""Run the test cases of several modules in one process.
+
+    Cases run in-process, up to --concurrency at once across all modules, each under the
+    timeout from its test case. Every module gets test_results.txt, test_results.json and a
+    JUnit test_results.xml in its tests directory; a summary per module is printed at the end.
+    """)
+@click.argument('modules', nargs=-1)
+@click.option('--all', 'all_modules', is_flag=True, help='Test every core and add-on module that has test cases')
+@click.option('--concurrency', '-c', type=int, default=4, show_default=True, help='Maximum cases running at once')
+@click.option('--examples', '-x', is_flag=True, help='Also regenerate the sample files of passing cases')
+@click.option('--spoutlet', '-u', help='Only run the cases of this spoutlet', default=None)
+@click.pass_context
+def test_command(ctx: click.Context, modules, all_modules: bool, concurrency: int, examples: bool,
+                 spoutlet: Optional[str]):
+    """Run module test suites concurrently"""
+    from spout.shared.test_runner import SharedSpoutletTester
+
+    registry = ctx.find_root().command.registry
+    if all_modules:
+        modules = sorted(list(registry.plugins) + list(registry.addon_plugins))
+    if not modules:
+        raise click.UsageError("Name the modules to test or pass --all")
+
+    testers = []
+    semaphore = asyncio.Semaphore(max(concurrency, 1))
+    for module in modules:
+        module = module.lower()
+        if module not in registry.plugins and module not in registry.addon_plugins:
+            raise click.UsageError(f"Unknown module '{module}'")
+        tester = SharedSpoutletTester(module, registry=registry, cache_mode=ctx.obj.get('cache_mode', 'use'),
+                                      semaphore=semaphore)
+        if tester.test_cases_path.exists():
+            testers.append(tester)
+        elif not all_modules:
+            raise click.ClickException(f"No test cases for module '{module}'")
+
+    async def run_all():
+        return await asyncio.gather(*(tester.run_module_tests_async(spoutlet, examples) for tester in testers))
+
+    start_time = time.perf_counter()
+    run_coroutine = ctx.obj.get('run_coroutine', asyncio.run)
+    run_coroutine(run_all())
+    elapsed = time.perf_counter() - start_time
+
+    failed = 0
+    for tester in testers:
+        passed = sum(1 for report in tester.case_reports if report["passed"])
+        failed += len(tester.case_reports) - passed
+        click.echo(f"{tester.module_name:<12} {passed}/{len(tester.case_reports)} passed  "
+                   f"{tester.duration:.2f}s  {tester.module_path / 'tests' / 'test_results.xml'}")
+    click.echo(f"{len(testers)} modules tested in {elapsed:.2f}s, {failed} failed", err=True)
+    if failed:
+        ctx.exit(1)
+
+@click.command(name='bench', help="""Time each stage of the request pipeline against the fake provider.
+
+    Stages: CLI cold start, plugin registry load, kernel initialisation, spoutlet resolution
+    (add_plugin), prompt rendering, token counting, metrics writes and end-to-end calls per
+    module (e2e, using each module's first test case). The fake provider answers after
+    --latency seconds, so end-to-end times are Spout's own overhead by default.
+
+    With --baseline, medians are compared to an earlier --output file and the command exits
+    with status 1 when a stage slowed down by more than its threshold.
+    """)
+@click.option('--stage', 'stages', multiple=True, type=click.Choice(BENCH_STAGES), help='Stages to run (repeatable, default: all)')
+@click.option('--module', 'modules', multiple=True, help='Modules for the e2e stage (repeatable, default: all with test cases)')
+@click.option('--runs', '-n', type=int, default=20, show_default=True, help='Timed runs per stage')
+@click.option('--latency', type=float, default=0.0, show_default=True, help='Fake provider latency in seconds')
+@click.option('--format', 'output_format', type=click.Choice(['table', 'json']), default='table', show_default=True)
+@click.option('--output', '-o', help='Write the JSON results to this file (use it as a later --baseline)')
+@click.option('--baseline', help='JSON results of an earlier run to compare against')
+@click.option('--threshold', type=float, default=0.2, show_default=True, help='Allowed median slowdown as a ratio')
+@click.option('--stage-threshold', 'stage_thresholds', multiple=True, metavar='STAGE=RATIO',
+              help='Threshold for one stage, or "e2e" for every module (repeatable)')
+@click.option('--min-delta-ms', type=float, default=0.05, show_default=True,
+              help='Ignore slowdowns smaller than this many milliseconds')
+@click.pass_context
+def bench_command(ctx: click.Context, stages, modules, runs: int, latency: float, output_format: str,
+                  output: Optional[str], baseline: Optional[str], threshold: float, stage_thresholds,
+                  min_delta_ms: float):
+    """Run the pipeline microbenchmarks"""
+    from spout.shared.bench import PipelineBench, compare, load_results
+    from spout.shared.bench import format_table as format_bench_table
+
+    limits = {}
+    for entry in stage_thresholds:
+        stage, _, ratio = entry.partition('=')
+        try:
+            limits[stage.strip()] = float(ratio)
+        except ValueError:
+            raise click.BadParameter(f"Expected STAGE=RATIO, got '{entry}'", param_hint='--stage-threshold')
+
+    bench = PipelineBench(PluginRegistry, runs=runs, latency=latency)
+    run_coroutine = ctx.obj.get('run_coroutine', asyncio.run)
+    results = run_coroutine(bench.run(list(stages), [module.lower() for module in modules]))
+
+    comparison = None
+    if baseline:
+        comparison = compare(results, load_results(baseline), threshold, limits, min_delta_ms)
+        results['comparison'] = comparison
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+    if output_format == 'json':
+        click.echo(json.dumps(results, indent=2))
+    else:
+        click.echo(format_bench_table(results, comparison))
+
+    regressed = [row['stage'] for row in comparison or [] if row['regressed']]
+    if regressed:
+        click.echo(f"Regressions: {', '.join(regressed)}", err=True)
+        ctx.exit(1)
+
+# Commands built into the CLI itself rather than provided by a plugin
+BUILTIN_COMMANDS = {
+    'batch': batch_command,
+    'bench': bench_command,
+    'serve': serve_command,
+    'sessions': sessions_command,
+    'stats': stats_command,
+    'test': test_command,
+}
+
 class SpoutCLI(click.MultiCommand):
     """Custom Click MultiCommand for Spout CLI"""
     
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
-        self.registry = PluginRegistry()
+        self._registry = None
         self.show_timer = False
 
+    @property
+    def registry(self) -> PluginRegistry:
+        # Loaded on first use so that forwarding to a running server stays cheap
+        if self._registry is None:
+            self._registry = PluginRegistry()
+        return self._registry
+
     def list_commands(self, ctx: click.Context) -> list:
-        # Return both core and addon commands
-        return sorted(list(self.registry.plugins.keys()) + list(self.registry.addon_plugins.keys()))
+        # Return core, addon and built-in commands
+        return sorted(list(self.registry.plugins.keys()) + list(self.registry.addon_plugins.keys()) + list(BUILTIN_COMMANDS))
 
     def format_commands(self, ctx: click.Context, formatter: click.HelpFormatter) -> None:
         """Override default command formatting to separate core and addon plugins"""
@@ -231,8 +557,14 @@ class SpoutCLI(click.MultiCommand):
             with formatter.section('Add-on Commands'):
                 formatter.write_dl(addon_commands)
 
+        with formatter.section('Utility Commands'):
+            formatter.write_dl([(name, command.get_short_help_str()) for name, command in sorted(BUILTIN_COMMANDS.items())])
+
     def get_command(self, ctx: click.Context, cmd_name: str) -> Optional[click.Command]:
         cmd_name = cmd_name.lower()
+
+        if cmd_name in BUILTIN_COMMANDS:
+            return BUILTIN_COMMANDS[cmd_name]
         
         # Check both core and addon plugins
         plugin = None
@@ -267,7 +599,8 @@ class SpoutCLI(click.MultiCommand):
                 if test is not None or examples is not None:
                     # Use the provided test file name if any, otherwise None for default
                     test_file = test if test is not None else examples
-                    run_module_tests(cmd_name, spoutlet, bool(examples is not None), test_file)
+                    run_module_tests(cmd_name, spoutlet, bool(examples is not None), test_file, self.registry,
+                                     ctx.obj.get('cache_mode', 'use'), ctx.obj.get('run_coroutine', asyncio.run))
                     return
 
                 # Rest of the validation and execution logic...
@@ -283,23 +616,42 @@ class SpoutCLI(click.MultiCommand):
                 if spoutlet:
                     kwargs['spoutlet'] = spoutlet
 
+                handler.cache_mode = ctx.obj.get('cache_mode', 'use')
+                handler.stream_output = ctx.obj.get('stream', True)
+
                 start_time = time.perf_counter()
-                asyncio.run(self.registry.execute_plugin(cmd_name, handler, **kwargs))
+                # A running server executes the coroutine on its own shared event loop
+                run_coroutine = ctx.obj.get('run_coroutine', asyncio.run)
+                run_coroutine(self.registry.execute_plugin(cmd_name, handler, **kwargs))
                 end_time = time.perf_counter()
                 
                 if ctx.obj.get('show_timer'):
+                    from spout.shared.client_pool import CLIENT_POOL
+                    from spout.shared.rate_limiter import RATE_LIMITS
+
                     elapsed_ms = (end_time - start_time) * 1000
                     click.echo(f"\nExecution time: {elapsed_ms:.2f}ms", err=True)
+                    stats = CLIENT_POOL.connection_stats()
+                    click.echo(f"Connections opened: {stats['connections_opened']}, "
+                               f"reused: {stats['connections_reused']}"
+                               + (f" (not measured for {', '.join(stats['unmeasured'])})" if stats['unmeasured'] else ""),
+                               err=True)
+                    for limits in RATE_LIMITS.summaries():
+                        click.echo(f"Rate limit {limits['name']}: {limits['queued']} queued, "
+                                   f"max depth {limits['max_queue_depth']}, "
+                                   f"wait mean {limits['wait_mean']:.2f}s / p95 {limits['wait_p95']:.2f}s", err=True)
 
             except Exception as e:
                 raise click.ClickException(str(e))
 
         # Add plugin-specific options, making them not required if in test mode
+        argv = (ctx.obj or {}).get('argv', sys.argv)
+        test_mode = '--test' in argv or '-t' in argv or '--examples' in argv or '-x' in argv
         for option in plugin.options:
             plugin_command = click.option(
                 *option.flags,
                 help=option.help,
-                required=False if '--test' in sys.argv or '-t' in sys.argv or '--examples' in sys.argv or '-x' in sys.argv else option.required,
+                required=False if test_mode else option.required,
                 default=None
             )(plugin_command)
 
@@ -315,14 +667,19 @@ def create_cli():
     @click.option('-m', '--timer', is_flag=True, help='Display processing time')
     @click.option('-p', '--preferred_model', help='List available models or set preferred model', 
                   is_flag=False, flag_value='', default=None)
+    @click.option('--no-cache', is_flag=True, help='Bypass the response cache')
+    @click.option('--refresh-cache', is_flag=True, help='Ignore cached responses and store fresh ones')
+    @click.option('--no-stream', is_flag=True, help='Print the result only once the completion has finished')
     @click.pass_context
-    def cli(ctx, timer: bool, preferred_model: Optional[str]):
+    def cli(ctx, timer: bool, preferred_model: Optional[str], no_cache: bool, refresh_cache: bool, no_stream: bool):
         """Spout CLI - Command line Interface for Spout plugins
         
         Run 'spout COMMAND --help' for plugin-specific help.
         """
         ctx.ensure_object(dict)
         ctx.obj['show_timer'] = timer
+        ctx.obj['cache_mode'] = 'off' if no_cache else 'refresh' if refresh_cache else 'use'
+        ctx.obj['stream'] = not no_stream
         
         # Handle preferred_model
         if preferred_model is not None:
@@ -343,7 +700,7 @@ def create_cli():
             ctx.exit()
             
         # Only show the plugin list if no command is invoked
-        if ctx.invoked_subcommand is None and len(sys.argv) == 1:
+        if ctx.invoked_subcommand is None and len(ctx.obj.get('argv', sys.argv)) == 1:
             # Don't show help text since it will show commands twice
             click.echo("Spout CLI - Command line Interface for Spout plugins\n")
             click.echo("Run 'spout COMMAND --help' for plugin-specific help.\n")
@@ -363,5 +720,17 @@ def create_cli():
 
 cli = create_cli()
 
+def main():
+    """Console entry point that hands the command to a running Spout server when there is one"""
+    # Imported here, with nothing else, so forwarding to a server stays cheap
+    from spout.shared.spout_server import forward_to_server
+
+    args = sys.argv[1:]
+    if not args or args[0].lower() != 'serve':
+        exit_code = forward_to_server(args)
+        if exit_code is not None:
+            sys.exit(exit_code)
+    cli()
+
 if __name__ == '__main__':
-    cli()
\ No newline at end of file
+    main()
\ No newline at end of file
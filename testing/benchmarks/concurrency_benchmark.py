@@ -0,0 +1,174 @@
+"""
+Concurrency benchmark for ConnectorEngine.invoke
+
+Starts local fake providers that answer OpenAI-, Anthropic- and Replicate-style HTTP
+requests and Gemini gRPC requests after a fixed delay, then fires N concurrent
+invocations of the reduce spoutlet per provider. With non-blocking provider calls,
+N requests should finish in roughly the time of one.
+
+Usage:
+    python testing/benchmarks/concurrency_benchmark.py [--requests 16] [--delay 0.5] [--max-ratio 2.0]
+"""
+import argparse
+import asyncio
+import json
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from spout.shared.client_pool import CLIENT_POOL
+from spout.shared.connector import ConnectorEngine, ConnectorService
+
+SPOUT_ROOT = Path(__file__).resolve().parents[2] / "spout"
+
+
+class FakeProviderHandler(BaseHTTPRequestHandler):
+    """Answers chat completion (OpenAI), messages (Anthropic) and prediction (Replicate) requests after a delay"""
+
+    protocol_version = "HTTP/1.1"
+    delay = 0.5
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_HEAD(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length))
+        time.sleep(self.delay)
+
+        text = "A short summary."
+        if self.path.endswith("/messages"):
+            reply = {
+                "id": "msg_fake", "type": "message", "role": "assistant", "model": body["model"],
+                "content": [{"type": "text", "text": text}], "stop_reason": "end_turn",
+                "usage": {"input_tokens": 1, "output_tokens": 1},
+            }
+        elif self.path.endswith("/predictions"):
+            # Answered within the "Prefer: wait" window, so the client does not poll
+            reply = {
+                "id": "prediction-fake", "model": self.path.split("/models/")[-1].rsplit("/", 1)[0],
+                "version": "fake", "status": "succeeded", "input": body.get("input", {}),
+                "output": ["A short ", "summary."], "logs": "", "error": None,
+                "urls": {"get": "", "cancel": ""},
+            }
+        else:
+            reply = {
+                "id": "chatcmpl-fake", "object": "chat.completion", "created": 0, "model": body["model"],
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+            }
+
+        data = json.dumps(reply).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def start_fake_provider(delay: float) -> ThreadingHTTPServer:
+    FakeProviderHandler.delay = delay
+    ThreadingHTTPServer.request_queue_size = 128  # accept a full burst of concurrent connections
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeProviderHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def start_fake_gemini(delay: float):
+    """gRPC server answering GenerateContent the way the Gemini API does, after a delay"""
+    import google.ai.generativelanguage as glm
+    import grpc
+
+    def generate_content(request, context):
+        time.sleep(delay)
+        return glm.GenerateContentResponse(
+            candidates=[glm.Candidate(content=glm.Content(role="model", parts=[glm.Part(text="A short summary.")]),
+                                      finish_reason=glm.Candidate.FinishReason.STOP)],
+            usage_metadata=glm.GenerateContentResponse.UsageMetadata(prompt_token_count=1, candidates_token_count=1),
+        )
+
+    handler = grpc.method_handlers_generic_handler("google.ai.generativelanguage.v1beta.GenerativeService", {
+        "GenerateContent": grpc.unary_unary_rpc_method_handler(
+            generate_content,
+            request_deserializer=glm.GenerateContentRequest.deserialize,
+            response_serializer=glm.GenerateContentResponse.serialize,
+        ),
+    })
+    server = grpc.server(ThreadPoolExecutor(max_workers=128))
+    server.add_generic_rpc_handlers((handler,))
+    port = server.add_insecure_port("127.0.0.1:0")
+    server.start()
+    return server, f"127.0.0.1:{port}"
+
+
+def use_fake_gemini(address: str) -> None:
+    """Point pooled Gemini clients at the local server (the SDK only speaks TLS to its own endpoint)"""
+    import google.ai.generativelanguage as glm
+    import grpc
+    from google.ai.generativelanguage_v1beta.services.generative_service.transports import (
+        GenerativeServiceGrpcAsyncIOTransport,
+    )
+
+    def factory():
+        transport = GenerativeServiceGrpcAsyncIOTransport(channel=grpc.aio.insecure_channel(address))
+        return glm.GenerativeServiceAsyncClient(transport=transport)
+
+    def get_gemini(api_key: str):
+        return CLIENT_POOL._get_or_create(("gemini", api_key, None), factory, asyncio.get_running_loop())
+
+    CLIENT_POOL.get_gemini = get_gemini
+
+
+async def time_invocations(model: str, base_url: str, count: int) -> float:
+    kernel = ConnectorEngine()
+    kernel.add_service(ConnectorService(service_id="default", model=model, api_token="fake-key", base_url=base_url))
+    plugin = kernel.add_plugin(parent_directory=str(SPOUT_ROOT / "core" / "reduce"), plugin_name="default")
+
+    start = time.perf_counter()
+    await asyncio.gather(*(kernel.invoke(plugin["default"], input=f"Benchmark input {i}") for i in range(count)))
+    return time.perf_counter() - start
+
+
+async def main(args) -> int:
+    server = start_fake_provider(args.delay)
+    gemini_server, gemini_address = start_fake_gemini(args.delay)
+    use_fake_gemini(gemini_address)
+    root = f"http://127.0.0.1:{server.server_address[1]}"
+    providers = {
+        "openai": ("gpt-4o-mini", f"{root}/v1"),
+        "anthropic": ("claude-3-5-haiku-20241022", root),
+        "gemini": ("gemini-1.5-flash", None),
+        "replicate": ("meta/meta-llama-3-8b-instruct", root),
+    }
+
+    failed = False
+    print(f"{'provider':<12}{'1 request':>12}{f'{args.requests} requests':>16}{'ratio':>8}")
+    for name, (model, base_url) in providers.items():
+        single = await time_invocations(model, base_url, 1)
+        many = await time_invocations(model, base_url, args.requests)
+        ratio = many / single
+        failed = failed or ratio > args.max_ratio
+        print(f"{name:<12}{single:>11.2f}s{many:>15.2f}s{ratio:>7.2f}x")
+
+    server.shutdown()
+    gemini_server.stop(None)
+    if failed:
+        print(f"FAIL: concurrent requests took more than {args.max_ratio}x a single request")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark concurrent ConnectorEngine.invoke calls")
+    parser.add_argument("--requests", type=int, default=16, help="Number of concurrent requests")
+    parser.add_argument("--delay", type=float, default=0.5, help="Fake provider response delay in seconds")
+    parser.add_argument("--max-ratio", type=float, default=2.0, help="Allowed N-request / 1-request time ratio")
+    sys.exit(asyncio.run(main(parser.parse_args())))
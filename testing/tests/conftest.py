@@ -0,0 +1,60 @@
+import pytest
+
+from spout.shared import rate_limiter
+from spout.shared.connector import _IN_FLIGHT, ConnectorEngine, ConnectorService
+from spout.shared.fake_provider import FakeProvider, set_fake_provider
+from spout.shared.retry_policy import RetryPolicy, set_retry_policy
+from spout.shared.spoutlet_index import PromptTemplate
+
+
+class CountingFakeProvider(FakeProvider):
+    """FakeProvider that records the prompt of every completion it serves"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prompts = []
+
+    async def complete(self, model, prompt, on_chunk=None, **kwargs):
+        self.prompts.append(prompt)
+        return await super().complete(model, prompt, on_chunk=on_chunk, **kwargs)
+
+
+@pytest.fixture(autouse=True)
+def isolated_providers(monkeypatch):
+    """Keep settings.ini out of the tests: no rate limits, no retries, no shared in-flight calls"""
+    monkeypatch.setattr(rate_limiter, "RATE_LIMITS", rate_limiter.RateLimits())
+    monkeypatch.setattr(rate_limiter.RATE_LIMITS, "_limits", {})
+    monkeypatch.setattr("spout.shared.connector.RATE_LIMITS", rate_limiter.RATE_LIMITS)
+    set_retry_policy(RetryPolicy(max_attempts=1))
+    yield
+    set_fake_provider(None)
+    set_retry_policy(None)
+    _IN_FLIGHT.clear()
+
+
+@pytest.fixture
+def fake_provider():
+    """Install a CountingFakeProvider built from the given keyword arguments"""
+    def install(**kwargs):
+        provider = CountingFakeProvider(**kwargs)
+        set_fake_provider(provider)
+        return provider
+    return install
+
+
+def make_engine(model: str = "fake", **kwargs) -> ConnectorEngine:
+    engine = ConnectorEngine(**kwargs)
+    engine.add_service(ConnectorService("default", model, ""))
+    return engine
+
+
+def make_function(engine: ConnectorEngine, template: str = "Answer: {{$input}}", temperature: float = 0,
+                  **config):
+    """A spoutlet function over an in-memory prompt, as add_plugin would build it"""
+    config = {
+        "plugin_name": "test",
+        "input_variables": [{"name": "input"}],
+        "execution_settings": {"default": {"temperature": temperature}},
+        **config,
+    }
+    return engine.spoutlet_function(config, PromptTemplate(template), "default")
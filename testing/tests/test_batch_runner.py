@@ -0,0 +1,111 @@
+import asyncio
+import io
+import json
+
+from conftest import CountingFakeProvider, make_engine, make_function
+
+from spout.shared.batch_runner import BatchRunner
+from spout.shared.fake_provider import set_fake_provider
+from spout.shared.plugin_options import PluginDefinition, PluginOption
+
+
+class FlakyProvider(CountingFakeProvider):
+    """Echoes the input, failing every prompt that contains one of `failing`"""
+
+    def __init__(self, failing=(), **kwargs):
+        super().__init__(default_response="echo $last_line", **kwargs)
+        self.failing = set(failing)
+
+    async def complete(self, model, prompt, on_chunk=None, **kwargs):
+        if any(word in prompt for word in self.failing):
+            self.prompts.append(prompt)
+            raise RuntimeError(f"Provider failed on: {prompt}")
+        return await super().complete(model, prompt, on_chunk=on_chunk, **kwargs)
+
+
+class _Handler:
+    pass
+
+
+class _Registry:
+    """One "echo" module whose calls go to the fake provider, in place of the plugin registry"""
+
+    plugins = {"echo": PluginDefinition("echo", "Echo the input", [PluginOption("input", ["--input"], "Text")])}
+    addon_plugins = {}
+
+    def __init__(self):
+        self.engine = make_engine()
+        self.function = make_function(self.engine)
+
+    def get_handler(self, module):
+        return _Handler
+
+    async def execute_plugin(self, module, handler, **kwargs):
+        return str(await self.engine.invoke(self.function, input=kwargs["input"]))
+
+
+def _jobs(*inputs):
+    return [json.dumps({"module": "echo", "parameters": {"input": text}}) + "\n" for text in inputs]
+
+
+def _run(lines, **kwargs):
+    output = io.StringIO()
+    summary = asyncio.run(BatchRunner(_Registry(), **kwargs).run(lines, output))
+    return summary, [json.loads(line) for line in output.getvalue().splitlines()]
+
+
+def test_results_keep_their_line_numbers():
+    set_fake_provider(FlakyProvider(failing={"beta"}))
+
+    summary, records = _run(_jobs("alpha", "beta", "gamma"), concurrency=2)
+
+    assert summary == {"succeeded": 2, "failed": 1, "skipped": 0}
+    assert [(record["line"], record.get("output")) for record in records] == [
+        (1, "echo Answer: alpha"), (2, None), (3, "echo Answer: gamma")]
+    assert "beta" in records[1]["error"]
+
+
+def test_a_resumed_batch_only_runs_failed_lines(tmp_path):
+    checkpoint = str(tmp_path / "jobs.ckpt")
+    lines = _jobs("alpha", "beta", "gamma")
+    set_fake_provider(FlakyProvider(failing={"beta"}))
+    _run(lines, checkpoint_path=checkpoint)
+
+    # Only successes are recorded, as line:hash
+    entries = (tmp_path / "jobs.ckpt").read_text().split()
+    assert [entry.split(":")[0] for entry in entries] == ["1", "3"]
+    assert entries[0] == f"1:{BatchRunner._line_hash(lines[0].strip())}"
+
+    provider = FlakyProvider()
+    set_fake_provider(provider)
+    summary, records = _run(lines, checkpoint_path=checkpoint)
+
+    assert summary == {"succeeded": 1, "failed": 0, "skipped": 2}
+    assert [record["line"] for record in records] == [2]
+    assert provider.prompts == ["Answer: beta"]
+
+
+def test_an_edited_line_is_run_again(tmp_path):
+    checkpoint = str(tmp_path / "jobs.ckpt")
+    set_fake_provider(FlakyProvider())
+    _run(_jobs("alpha", "beta"), checkpoint_path=checkpoint)
+
+    provider = FlakyProvider()
+    set_fake_provider(provider)
+    summary, records = _run(_jobs("alpha", "delta"), checkpoint_path=checkpoint)
+
+    # Line 2 has a checkpoint entry, but for different content
+    assert summary == {"succeeded": 1, "failed": 0, "skipped": 1}
+    assert records == [{"line": 2, "module": "echo", "spoutlet": "default", "output": "echo Answer: delta"}]
+    assert provider.prompts == ["Answer: delta"]
+
+
+def test_invalid_lines_fail_without_stopping_the_batch():
+    set_fake_provider(FlakyProvider())
+
+    summary, records = _run(["not json\n", json.dumps({"module": "nope"}) + "\n"] + _jobs("alpha"))
+
+    assert summary == {"succeeded": 1, "failed": 2, "skipped": 0}
+    assert records[0]["error"].startswith("Invalid request")
+    assert records[1]["error"] == "Invalid request: Unknown module 'nope'"
+    assert records[2]["output"] == "echo Answer: alpha"
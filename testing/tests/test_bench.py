@@ -0,0 +1,91 @@
+import asyncio
+
+from spout.shared import fake_provider
+from spout.shared.bench import STAGES, PipelineBench, compare, format_table, summarize
+from spout.spout_cli import BENCH_STAGES, PluginRegistry
+
+
+def _results(**medians):
+    return {"stages": {stage: summarize([median / 1000]) for stage, median in medians.items()}}
+
+
+def test_summarize_reports_milliseconds():
+    summary = summarize([0.001, 0.002, 0.003, 0.010])
+
+    assert summary["runs"] == 4
+    assert summary["median_ms"] == 2.5
+    assert summary["min_ms"] == 1.0
+    assert summary["p95_ms"] == 10.0
+    assert summary["mean_ms"] == 4.0
+
+
+def test_compare_flags_slowdowns_over_the_threshold():
+    baseline = _results(add_plugin=1.0, prompt_render=1.0, token_count=1.0)
+    current = _results(add_plugin=1.5, prompt_render=1.1, token_count=0.5)
+
+    rows = {row["stage"]: row for row in compare(current, baseline, threshold=0.2)}
+
+    assert rows["add_plugin"]["regressed"]
+    assert not rows["prompt_render"]["regressed"]
+    assert not rows["token_count"]["regressed"]
+
+
+def test_compare_ignores_sub_noise_deltas_and_new_stages():
+    baseline = _results(prompt_render=0.01)
+    current = _results(prompt_render=0.03, metrics_write=1.0)
+
+    rows = compare(current, baseline, threshold=0.2, min_delta_ms=0.05)
+
+    assert [row["stage"] for row in rows] == ["prompt_render"]
+    assert not rows[0]["regressed"]
+
+
+def test_stage_thresholds_apply_to_every_module_of_a_stage():
+    baseline = _results(**{"e2e.reduce": 10.0, "e2e.expand": 10.0, "add_plugin": 10.0})
+    current = _results(**{"e2e.reduce": 14.0, "e2e.expand": 16.0, "add_plugin": 14.0})
+
+    rows = {row["stage"]: row for row in compare(current, baseline, threshold=0.2,
+                                                 stage_thresholds={"e2e": 0.5})}
+
+    assert not rows["e2e.reduce"]["regressed"]
+    assert rows["e2e.expand"]["regressed"]
+    assert rows["add_plugin"]["regressed"]
+
+
+def test_table_marks_regressions_and_errors():
+    baseline = _results(add_plugin=1.0)
+    current = _results(add_plugin=2.0)
+    current["stages"]["token_count"] = {"error": "OSError: no encoding"}
+
+    table = format_table(current, compare(current, baseline))
+
+    assert "REGRESSED" in table
+    assert "OSError: no encoding" in table
+
+
+def test_run_times_the_selected_stages_against_the_fake_provider():
+    bench = PipelineBench(PluginRegistry, runs=2, latency=0.05)
+
+    results = asyncio.run(bench.run(["e2e", "add_plugin"], modules=["reduce"]))
+
+    assert list(results["stages"]) == ["add_plugin", "e2e.reduce"]
+    # Every end-to-end call waits for the fake provider's latency
+    assert results["stages"]["e2e.reduce"]["min_ms"] >= 50
+    assert fake_provider._FAKE_PROVIDER is None
+
+
+def test_a_failing_stage_does_not_stop_the_others(monkeypatch):
+    bench = PipelineBench(PluginRegistry, runs=2)
+
+    def fail():
+        raise OSError("no encoding")
+    monkeypatch.setattr(bench, "bench_token_count", fail)
+
+    results = asyncio.run(bench.run(["token_count", "prompt_render"]))
+
+    assert results["stages"]["token_count"] == {"error": "OSError: no encoding"}
+    assert results["stages"]["prompt_render"]["runs"] == 2
+
+
+def test_cli_offers_every_stage():
+    assert BENCH_STAGES == STAGES
@@ -0,0 +1,107 @@
+import asyncio
+import threading
+
+import pytest
+
+from spout.shared.client_pool import CLIENT_POOL, ClientPool
+from spout.shared.connector import ConnectorService
+
+
+def test_gemini_keys_get_clients_of_their_own():
+    pytest.importorskip("google.ai.generativelanguage")
+    pool = ClientPool()
+
+    async def run():
+        return pool.get_gemini("key-a"), pool.get_gemini("key-b"), pool.get_gemini("key-a")
+
+    first, other_key, again = asyncio.run(run())
+
+    assert first is again
+    assert first is not other_key
+    assert first.transport._credentials.token == "key-a"
+    assert other_key.transport._credentials.token == "key-b"
+
+
+class _GeminiClient:
+    """Records the requests a ConnectorService sends to the pooled Gemini client"""
+
+    def __init__(self, glm):
+        self.glm = glm
+        self.requests = []
+
+    async def generate_content(self, request):
+        self.requests.append(request)
+        return self.glm.GenerateContentResponse(
+            candidates=[{"content": {"parts": [{"text": "Hello "}, {"text": "there"}]}}],
+            usage_metadata={"prompt_token_count": 3, "candidates_token_count": 2},
+        )
+
+
+def test_gemini_requests_go_through_the_pooled_client(monkeypatch):
+    glm = pytest.importorskip("google.ai.generativelanguage")
+    client = _GeminiClient(glm)
+    monkeypatch.setattr(CLIENT_POOL, "get_gemini", lambda api_key: client)
+    service = ConnectorService("default", "gemini-1.5-flash", "key")
+
+    result = asyncio.run(service._complete_with_gemini("Say hello", temperature=0.5))
+
+    assert result == ("Hello there", 3, 2)
+    request = client.requests[0]
+    assert request.model == "models/gemini-1.5-flash"
+    assert request.contents[0].parts[0].text == "Say hello"
+    assert request.generation_config.candidate_count == 1
+    assert request.generation_config.temperature == 0.5
+
+
+def test_providers_without_request_hooks_are_reported_unmeasured():
+    pytest.importorskip("replicate")
+    pool = ClientPool()
+
+    async def run():
+        pool.get_replicate("key")
+
+    asyncio.run(run())
+
+    assert pool.connection_stats()["unmeasured"] == ["replicate"]
+
+
+def test_request_counters_are_safe_across_threads():
+    pool = ClientPool()
+
+    class Request:
+        def __init__(self):
+            self.extensions = {}
+
+    def send(count):
+        for _ in range(count):
+            pool._on_request(Request())
+            pool._count_event("connection.connect_tcp.complete", None)
+
+    threads = [threading.Thread(target=send, args=(2000,)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    stats = pool.connection_stats()
+    assert stats["requests_sent"] == stats["connections_opened"] == 16000
+
+
+def test_client_of_a_finished_event_loop_is_closed_when_replaced():
+    pytest.importorskip("openai")
+    pool = ClientPool()
+
+    async def get():
+        return pool.get_openai("key")
+
+    async def replace():
+        client = pool.get_openai("key")
+        await asyncio.gather(*pool._closing)
+        return client
+
+    first = asyncio.run(get())
+    second = asyncio.run(replace())
+
+    assert second is not first
+    assert first.is_closed()
+    assert not second.is_closed()
@@ -0,0 +1,93 @@
+import asyncio
+
+from conftest import make_engine, make_function
+
+from spout.core.mutate.mutate_fanout import MutateFanout
+
+
+async def _invoke_concurrently(function, count, **kwargs):
+    return await asyncio.gather(*(function(input="same", **kwargs) for _ in range(count)))
+
+
+def test_identical_deterministic_requests_share_one_call(fake_provider):
+    provider = fake_provider(latency="fixed:0.05")
+    function = make_function(make_engine())
+
+    results = asyncio.run(_invoke_concurrently(function, 5))
+
+    assert len(provider.prompts) == 1
+    assert len({result.content for result in results}) == 1
+    assert [result.cache_status for result in results].count("coalesced") == 4
+    assert all(not result.attempts for result in results if result.cache_status == "coalesced")
+
+
+def test_requests_at_the_shipped_temperature_are_coalesced(fake_provider):
+    provider = fake_provider(latency="fixed:0.05")
+    function = make_function(make_engine(), temperature=0.1)
+
+    results = asyncio.run(_invoke_concurrently(function, 5))
+
+    assert len(provider.prompts) == 1
+    assert [result.cache_status for result in results].count("coalesced") == 4
+
+
+def test_caller_can_opt_out(fake_provider):
+    provider = fake_provider(latency="fixed:0.05", default_response="Sample $call")
+    function = make_function(make_engine(), temperature=0.9)
+
+    results = asyncio.run(_invoke_concurrently(function, 5, coalesce=False))
+
+    assert len(provider.prompts) == 5
+    assert len({result.content for result in results}) == 5
+
+
+def test_refresh_cache_requests_are_not_coalesced(fake_provider):
+    provider = fake_provider(latency="fixed:0.05")
+    function = make_function(make_engine())
+
+    asyncio.run(_invoke_concurrently(function, 3, refresh_cache=True))
+
+    assert len(provider.prompts) == 3
+
+
+def test_spoutlet_can_opt_out(fake_provider):
+    provider = fake_provider(latency="fixed:0.05")
+    function = make_function(make_engine(), coalesce=False)
+
+    asyncio.run(_invoke_concurrently(function, 3))
+
+    assert len(provider.prompts) == 3
+
+
+def test_leader_error_reaches_every_caller(fake_provider):
+    fake_provider(latency="fixed:0.05", error_rate=1.0)
+    function = make_function(make_engine())
+
+    async def run():
+        return await asyncio.gather(*(function(input="same") for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(run())
+
+    assert all(isinstance(result, Exception) for result in results)
+
+
+class _Handler:
+    async def invoke_logged(self, kernel, function, **kwargs):
+        return await kernel.invoke(function, **kwargs)
+
+
+def test_mutate_fanout_shards_get_their_own_samples(fake_provider):
+    # Every shard sends the same prompt; only separate provider calls make their variants differ
+    variants = ", ".join(f'"{letter}$call"' for letter in "abcdefghij")
+    provider = fake_provider(latency="fixed:0.05", default_response='{"variants": [' + variants + ']}')
+    engine = make_engine()
+    function = make_function(engine, template="{{$input}} {{$substring}} {{$num_variants}}",
+                             input_variables=[{"name": "input"}, {"name": "substring"},
+                                              {"name": "num_variants"}])
+    fanout = MutateFanout(_Handler(), engine, function, {"input": "text", "substring": "text"},
+                          target=80, workers=8)
+
+    merged = asyncio.run(fanout.run())
+
+    assert len(merged["variants"]) == 80
+    assert len(provider.prompts) == fanout.requests
@@ -0,0 +1,142 @@
+import asyncio
+import random
+
+import pytest
+
+from spout.shared.fake_provider import (
+    Cassette,
+    CassetteMiss,
+    FakeProvider,
+    FakeProviderError,
+    FakeRateLimitError,
+    load_fake_provider,
+    parse_latency,
+)
+
+
+@pytest.mark.parametrize("spec, low, high", [
+    ("0.25", 0.25, 0.25),
+    ("fixed:0.2", 0.2, 0.2),
+    ("uniform:0.1,0.5", 0.1, 0.5),
+    ("normal:0.3,0.05", 0.0, 1.0),
+    ("lognormal:-1,0.1", 0.0, 1.0),
+    ("exponential:0.3", 0.0, float("inf")),
+])
+def test_latency_specs(spec, low, high):
+    sample = parse_latency(spec)
+    rng = random.Random(0)
+
+    assert all(low <= sample(rng) <= high for _ in range(100))
+
+
+@pytest.mark.parametrize("spec", ["", "gamma:1,2", "uniform:0.1", "fixed:soon"])
+def test_invalid_latency_spec(spec):
+    with pytest.raises(ValueError):
+        parse_latency(spec)
+
+
+def test_responses_render_the_last_match():
+    provider = FakeProvider(responses=[
+        {"match": r"Input: (?P<text>\w+)", "response": "Echo $text from $model"},
+    ])
+
+    content, _, _ = asyncio.run(provider.complete("fake", "Input: example\nInput: actual"))
+
+    assert content == "Echo actual from fake"
+
+
+def test_responses_limited_to_a_model_fall_through():
+    provider = FakeProvider(default_response="default $call", responses=[
+        {"match": ".", "response": "other", "model": "fake-other"},
+    ])
+
+    first, _, _ = asyncio.run(provider.complete("fake", "prompt"))
+    second, _, _ = asyncio.run(provider.complete("fake", "prompt"))
+
+    assert (first, second) == ("default 1", "default 2")
+
+
+def _outcomes(provider, prompts):
+    async def run():
+        outcomes = []
+        for prompt in prompts:
+            try:
+                outcomes.append((await provider.complete("fake", prompt))[0])
+            except FakeProviderError:
+                outcomes.append("error")
+        return outcomes
+    return asyncio.run(run())
+
+
+def test_injected_errors_are_reproducible_from_the_seed():
+    prompts = [f"prompt {i}" for i in range(40)]
+
+    first = _outcomes(FakeProvider(error_rate=0.5, seed="7"), prompts)
+    again = _outcomes(FakeProvider(error_rate=0.5, seed="7"), prompts)
+    other_seed = _outcomes(FakeProvider(error_rate=0.5, seed="8"), prompts)
+
+    assert first == again
+    assert first != other_seed
+    assert 0 < first.count("error") < len(prompts)
+
+
+@pytest.mark.parametrize("kind, error", [
+    ("timeout", TimeoutError),
+    ("ratelimit", FakeRateLimitError),
+    ("error", FakeProviderError),
+])
+def test_error_kinds(kind, error):
+    provider = FakeProvider(error_rate=1.0, error_kinds=(kind,))
+
+    with pytest.raises(error):
+        asyncio.run(provider.complete("fake", "prompt"))
+
+
+def test_max_tokens_truncates_at_a_chunk_boundary():
+    provider = FakeProvider(default_response="one two three four five six")
+
+    content, _, output_tokens = asyncio.run(provider.complete("fake", "prompt", max_tokens=3))
+
+    assert content == "one two "
+    assert output_tokens > 0
+
+
+def test_streamed_chunks_make_up_the_completion():
+    provider = FakeProvider(default_response="Streamed in a few words")
+    chunks = []
+
+    content, _, _ = asyncio.run(provider.complete("fake", "prompt", on_chunk=chunks.append))
+
+    assert len(chunks) == 5
+    assert "".join(chunks) == content
+
+
+def test_cassette_replays_recordings_in_turn(tmp_path):
+    path = tmp_path / "cassette.jsonl"
+    recorder = Cassette(str(path))
+    recorder.record("gpt-4o", "prompt", "first", 3, 1, 0.5, 0.1)
+    recorder.record("gpt-4o", "prompt", "second", 3, 1, 0.5, 0.1)
+
+    provider = FakeProvider(cassette=Cassette(str(path), speed=0), cassette_mode="replay")
+
+    async def run():
+        return [await provider.complete("gpt-4o", "prompt") for _ in range(3)]
+
+    assert asyncio.run(run()) == [("first", 3, 1), ("second", 3, 1), ("first", 3, 1)]
+    with pytest.raises(CassetteMiss):
+        asyncio.run(provider.complete("gpt-4o", "another prompt"))
+
+
+def test_settings_configure_the_provider(tmp_path):
+    responses = tmp_path / "responses.json"
+    responses.write_text('[{"match": "ping", "response": "pong"}]')
+    settings = tmp_path / "settings.ini"
+    settings.write_text(f"[Fake]\nLatency = uniform:0,0.01\nErrorRate = 0.25\nErrorKinds = timeout, ratelimit\n"
+                        f"Seed = abc\nResponses = {responses}\nResponse = none for $model\n")
+
+    provider = load_fake_provider(settings)
+
+    assert provider.error_rate == 0.25
+    assert provider.error_kinds == ("timeout", "ratelimit")
+    assert provider.render("fake", "ping") == "pong"
+    assert provider.render("fake", "other") == "none for fake"
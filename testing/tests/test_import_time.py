@@ -0,0 +1,102 @@
+"""
+Import-time checks for the spout CLI
+
+Runs `spout --help` in fresh interpreters under `python -X importtime` and checks
+the cumulative import time of spout.spout_cli against a budget. It also fails if
+any provider SDK is imported, since those should only load once a model from that
+provider is actually called. Collected by pytest; run it directly for a report of
+the slowest modules.
+
+Usage:
+    python testing/tests/test_import_time.py [--runs 5] [--budget-ms 300] [--top 10]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+# Modules that must not be imported just to start the CLI
+HEAVY_MODULES = ["anthropic", "google.ai.generativelanguage", "google.generativeai", "grpc", "openai", "replicate",
+                 "tiktoken", "tkinter"]
+BUDGET_MS = 300
+# Modules of the built-in commands, which a client forwarding to `spout serve` does not need
+COMMAND_MODULES = ["spout.core.converse.session_store", "spout.shared.batch_runner", "spout.shared.bench",
+                   "spout.shared.client_pool", "spout.shared.metrics_stats", "spout.shared.rate_limiter", "sqlite3"]
+
+HELP_SCRIPT = "import sys; sys.argv = ['spout', '--help']; from spout.spout_cli import main; main()"
+FORWARD_SCRIPT = ("import sys; from spout.spout_cli import main; "
+                  "from spout.shared.spout_server import forward_to_server; print(' '.join(sys.modules))")
+
+
+def profile_startup():
+    """Return {module: (self_us, cumulative_us)} for one `spout --help` run"""
+    env = dict(os.environ, SPOUT_NO_SERVER="1")
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", HELP_SCRIPT],
+        capture_output=True, text=True, env=env,
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"spout --help failed:\n{completed.stderr}")
+
+    modules = {}
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        if not self_us.strip().isdigit():
+            continue  # header line
+        modules[name.strip()] = (int(self_us), int(cumulative_us))
+    return modules
+
+
+def test_cli_starts_without_provider_sdks():
+    modules = profile_startup()
+
+    assert [name for name in HEAVY_MODULES if name in modules] == []
+
+
+def test_forwarding_client_skips_command_modules():
+    completed = subprocess.run([sys.executable, "-c", FORWARD_SCRIPT], capture_output=True, text=True, check=True)
+
+    assert [name for name in COMMAND_MODULES if name in completed.stdout.split()] == []
+
+
+def test_cli_imports_within_budget():
+    profile_startup()  # the first run also writes bytecode caches
+    timings = [profile_startup()["spout.spout_cli"][1] / 1000 for _ in range(3)]
+
+    assert statistics.median(timings) <= BUDGET_MS
+
+
+def main(args) -> int:
+    timings = []
+    modules = {}
+    for _ in range(args.runs):
+        modules = profile_startup()
+        timings.append(modules.get("spout.spout_cli", (0, 0))[1] / 1000)
+
+    median = statistics.median(timings)
+    print(f"spout.spout_cli import: median {median:.1f}ms over {args.runs} runs (budget {args.budget_ms:.0f}ms)")
+
+    print("\nSlowest modules by self time (last run):")
+    for name, (self_us, _) in sorted(modules.items(), key=lambda item: item[1][0], reverse=True)[:args.top]:
+        print(f"  {self_us / 1000:>8.1f}ms  {name}")
+
+    failed = False
+    loaded = [name for name in HEAVY_MODULES if name in modules]
+    if loaded:
+        print(f"FAIL: provider or GUI modules imported at startup: {', '.join(loaded)}")
+        failed = True
+    if median > args.budget_ms:
+        print(f"FAIL: startup imports took {median:.1f}ms, over the {args.budget_ms:.0f}ms budget")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark spout CLI import time")
+    parser.add_argument("--runs", type=int, default=5, help="Number of fresh interpreter runs")
+    parser.add_argument("--budget-ms", type=float, default=BUDGET_MS, help="Allowed median import time of spout.spout_cli")
+    parser.add_argument("--top", type=int, default=10, help="Number of slowest modules to list")
+    sys.exit(main(parser.parse_args()))
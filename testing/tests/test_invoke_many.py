@@ -0,0 +1,86 @@
+import asyncio
+
+from conftest import CountingFakeProvider, make_engine, make_function
+
+from spout.shared.fake_provider import set_fake_provider
+
+
+class ActiveProvider(CountingFakeProvider):
+    """Tracks how many completions are in progress at once"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.active = 0
+        self.max_active = 0
+
+    async def complete(self, model, prompt, on_chunk=None, **kwargs):
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            return await super().complete(model, prompt, on_chunk=on_chunk, **kwargs)
+        finally:
+            self.active -= 1
+
+
+def _collect(engine, calls, concurrency, ordered=True):
+    async def run():
+        return [pair async for pair in engine.invoke_many(calls, concurrency, ordered=ordered)]
+    return asyncio.run(run())
+
+
+def test_no_more_than_concurrency_calls_run_at_once():
+    provider = ActiveProvider(latency="uniform:0.005,0.02", default_response="echo $last_line")
+    set_fake_provider(provider)
+    engine = make_engine()
+    function = make_function(engine)
+
+    results = _collect(engine, ((engine.invoke, {"function": function, "input": f"item {i}"}) for i in range(20)), 3)
+
+    assert provider.max_active == 3
+    assert [index for index, _ in results] == list(range(20))
+    assert [str(result) for _, result in results] == [f"echo Answer: item {i}" for i in range(20)]
+
+
+def test_unordered_results_arrive_as_they_finish():
+    async def wait(delay):
+        await asyncio.sleep(delay)
+        return delay
+
+    results = _collect(make_engine(), ((wait, {"delay": delay}) for delay in (0.05, 0.0, 0.02)), 3, ordered=False)
+
+    assert [index for index, _ in results] == [1, 2, 0]
+
+
+def test_failures_are_yielded_in_place():
+    async def check(value):
+        if value == 1:
+            raise ValueError("bad value")
+        return value
+
+    results = _collect(make_engine(), ((check, {"value": value}) for value in range(3)), 2)
+
+    assert results[0] == (0, 0) and results[2] == (2, 2)
+    assert isinstance(results[1][1], ValueError)
+
+
+def test_a_slow_call_holds_back_only_a_bounded_read_ahead():
+    started = []
+
+    async def call(index):
+        await asyncio.sleep(0.05 if index == 0 else 0)
+        return index
+
+    def calls():
+        for index in range(100):
+            started.append(index)
+            yield call, {"index": index}
+
+    async def first_result():
+        async for pair in make_engine().invoke_many(calls(), 2, ordered=True):
+            return pair, len(started)
+
+    (index, _), read = asyncio.run(first_result())
+
+    assert index == 0
+    # At most concurrency * 4 finished results wait behind the slow one, plus the calls in flight
+    assert read <= 2 * 4 + 2
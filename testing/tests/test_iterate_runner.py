@@ -0,0 +1,147 @@
+import asyncio
+import io
+import json
+
+import pytest
+from conftest import CountingFakeProvider, make_engine, make_function
+
+from spout.core.iterate.iterate_runner import BatchSizer, IterateFileRunner
+from spout.shared import token_counter
+from spout.shared.fake_provider import set_fake_provider
+
+TEMPLATE = "Process {{$lines_per_call}} lines:\n{{$preprocessed_lines}}"
+
+
+class IterateProvider(CountingFakeProvider):
+    """Upper-cases each line of the prompt, dropping the last item of batches over `max_lines`"""
+
+    def __init__(self, max_lines: int = 100, garbled: bool = False, **kwargs):
+        super().__init__(**kwargs)
+        self.max_lines = max_lines
+        self.garbled = garbled
+
+    def render(self, model, prompt, call=1):
+        if self.garbled:
+            return "Sorry, here are the lines:"
+        lines = prompt.split("\n")[1:]
+        items = [line.upper() for line in lines]
+        if len(items) > self.max_lines:
+            items = items[:-1]
+        return json.dumps({"processed_items": items})
+
+
+@pytest.fixture
+def approximate_tokens(monkeypatch):
+    """Count tokens without loading a tokenizer, which may need a download"""
+    monkeypatch.setattr(token_counter, "_SETTINGS", {"model": "gpt-3.5-turbo", "approximate": True})
+
+
+class _Handler:
+    async def invoke_logged(self, kernel, function, **kwargs):
+        return await kernel.invoke(function, **kwargs)
+
+
+def _runner(tmp_path, lines_per_call=2, **kwargs) -> IterateFileRunner:
+    engine = make_engine()
+    function = make_function(engine, TEMPLATE,
+                             input_variables=[{"name": "lines_per_call"}, {"name": "preprocessed_lines"}])
+    return IterateFileRunner(_Handler(), engine, function, {}, lines_per_call=lines_per_call,
+                             checkpoint_path=str(tmp_path / "checkpoint.json"), **kwargs)
+
+
+def _input(tmp_path, count=7):
+    path = tmp_path / "input.txt"
+    path.write_text("".join(f"line {i}\n" for i in range(1, count + 1)) + "\n")
+    return str(path)
+
+
+def test_results_are_written_in_input_order(tmp_path):
+    provider = IterateProvider(latency="uniform:0,0.02")
+    set_fake_provider(provider)
+    output = io.StringIO()
+
+    summary = asyncio.run(_runner(tmp_path).run(_input(tmp_path), output))
+
+    assert output.getvalue() == "".join(f"LINE {i}\n" for i in range(1, 8))
+    assert summary == {"lines": 7, "batches": 4, "splits": 0, "resumed_from": 0}
+    assert len(provider.prompts) == 4
+
+
+def test_a_run_resumes_after_the_checkpointed_line(tmp_path):
+    set_fake_provider(IterateProvider())
+    path = _input(tmp_path)
+    output = tmp_path / "output.txt"
+    output.write_text("LINE 1\nLINE 2\nLINE 3\nLINE 4\npartial")
+    (tmp_path / "checkpoint.json").write_text(json.dumps(
+        {"input": path, "lines_done": 4, "output_offset": len("LINE 1\nLINE 2\nLINE 3\nLINE 4\n")}))
+
+    with open(output, "r+") as file:
+        file.seek(0, 2)
+        summary = asyncio.run(_runner(tmp_path).run(path, file))
+
+    assert output.read_text() == "".join(f"LINE {i}\n" for i in range(1, 8))
+    assert summary["resumed_from"] == 4
+    assert json.loads((tmp_path / "checkpoint.json").read_text())["lines_done"] == 8
+
+
+def test_miscounted_batches_are_halved_until_they_come_back_whole(tmp_path):
+    provider = IterateProvider(max_lines=1)
+    set_fake_provider(provider)
+    output = io.StringIO()
+    runner = _runner(tmp_path, lines_per_call=4)
+
+    asyncio.run(runner.run(_input(tmp_path, count=4), output))
+
+    assert output.getvalue() == "LINE 1\nLINE 2\nLINE 3\nLINE 4\n"
+    # 4 lines -> 2 + 2 -> 1 + 1 + 1 + 1
+    assert runner.splits == 3
+    assert len(provider.prompts) == 7
+
+
+def test_a_re_split_keeps_later_batches_to_half_its_size(tmp_path, approximate_tokens):
+    set_fake_provider(IterateProvider(max_lines=2))
+    # One batch at a time, so every batch after the first is packed after the re-split
+    runner = _runner(tmp_path, workers=1)
+    runner.sizer = BatchSizer.for_function(runner.function, {}, max_lines=4)
+    output = io.StringIO()
+
+    asyncio.run(runner.run(_input(tmp_path, count=12), output))
+
+    assert output.getvalue() == "".join(f"LINE {i}\n" for i in range(1, 13))
+    # Only the first 4-line batch is re-split; later batches are packed to its 2-line half
+    assert runner.splits == 1
+    assert runner.sizer.max_batch_tokens == 2 * runner.sizer.line_tokens("line 1")
+
+
+def test_sizer_reads_the_spoutlet_preamble_and_output_limit(approximate_tokens):
+    engine = make_engine()
+    function = make_function(engine, TEMPLATE, execution_settings={"default": {"max_tokens": 300}},
+                             input_variables=[{"name": "lines_per_call"}, {"name": "preprocessed_lines"}])
+
+    sizer = BatchSizer.for_function(function, {"example_preprocessed_line": "a b c d",
+                                               "example_processed_line": "a b"})
+
+    assert sizer.max_tokens == 300
+    assert sizer.fixed_input_tokens > 0
+    assert sizer.initial_ratio < 1
+
+
+def test_provider_errors_are_not_retried_by_the_runner(tmp_path):
+    provider = IterateProvider(error_rate=1.0)
+    set_fake_provider(provider)
+
+    with pytest.raises(RuntimeError, match="input lines 1-2 failed"):
+        asyncio.run(_runner(tmp_path, workers=1).run(_input(tmp_path, count=2), io.StringIO()))
+
+    assert len(provider.prompts) == 1
+    assert not (tmp_path / "checkpoint.json").exists()
+
+
+def test_unparseable_answers_are_sent_again_up_to_the_retry_limit(tmp_path):
+    provider = IterateProvider(garbled=True)
+    set_fake_provider(provider)
+
+    with pytest.raises(RuntimeError, match="input lines 1-1 failed"):
+        asyncio.run(_runner(tmp_path, lines_per_call=1, retries=2).run(_input(tmp_path, count=1), io.StringIO()))
+
+    assert len(provider.prompts) == 3
@@ -0,0 +1,96 @@
+import csv
+
+from spout.shared.api_logging import METRICS_HEADER
+from spout.shared.metrics_stats import aggregate, read_csv_rows
+from spout.shared.metrics_writer import MetricsWriter
+
+LEGACY_HEADER = METRICS_HEADER[:8]
+
+
+def _row(duration, cache="", error=""):
+    row = ["2026-01-01 10:00:00", duration, "gpt-4o", "reduce", 10, 5, "aaaa", "bbbb", cache, "", "", error, ""]
+    return row[:len(METRICS_HEADER)]
+
+
+def _write(path, header, rows):
+    with open(path, "w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(header)
+        writer.writerows(rows)
+
+
+def test_rows_under_a_legacy_header_are_read_by_position(tmp_path):
+    path = tmp_path / "api_metrics.csv"
+    _write(path, LEGACY_HEADER, [
+        _row(1.0)[:8],  # written by the version that created the file
+        _row(2.0),
+        _row(0, cache="hit"),
+        _row(3.0, error="RateLimitError"),
+    ])
+
+    [stats] = aggregate(read_csv_rows([str(path)]), ["model"])
+
+    assert stats["calls"] == 4
+    assert stats["errors"] == 1
+    assert stats["cache_hits"] == 1
+    # The zero-duration cache hit stays out of the latency percentiles
+    assert stats["p50"] == 1.0
+
+
+def test_writer_appends_to_a_file_with_a_legacy_header(tmp_path):
+    path = tmp_path / "api_metrics.csv"
+    _write(path, LEGACY_HEADER, [_row(1.0)[:8]])
+
+    writer = MetricsWriter(str(path), METRICS_HEADER, flush_rows=1, backup_count=0)
+    writer.write(_row(2.0, error="RateLimitError"))
+    writer.flush()
+
+    with open(path, newline="") as file:
+        rows = list(csv.reader(file))
+    assert rows[0] == LEGACY_HEADER
+    assert len(rows) == 3
+    assert not (tmp_path / "api_metrics.csv.1").exists()
+    [stats] = aggregate(read_csv_rows([str(path)]), ["model"])
+    assert (stats["calls"], stats["errors"]) == (2, 1)
+
+
+def test_writer_keeps_a_file_with_an_unrelated_header(tmp_path):
+    path = tmp_path / "api_metrics.csv"
+    _write(path, ["Date", "Notes"], [["2026-01-01", "kept"]])
+
+    writer = MetricsWriter(str(path), METRICS_HEADER, flush_rows=1, backup_count=0)
+    writer.write(_row(2.0))
+    writer.flush()
+
+    with open(path, newline="") as file:
+        assert next(csv.reader(file)) == METRICS_HEADER
+    with open(f"{path}.1", newline="") as file:
+        assert list(csv.reader(file)) == [["Date", "Notes"], ["2026-01-01", "kept"]]
+
+
+def test_writer_checks_the_header_once(tmp_path, monkeypatch):
+    writer = MetricsWriter(str(tmp_path / "api_metrics.csv"), METRICS_HEADER, flush_rows=1)
+    reads = []
+    header_on_disk = writer._header_on_disk
+    monkeypatch.setattr(writer, "_header_on_disk", lambda: reads.append(1) or header_on_disk())
+
+    for duration in (1.0, 2.0, 3.0):
+        writer.write(_row(duration))
+        writer.flush()
+
+    assert len(reads) == 1
+
+
+def test_writer_appends_under_a_matching_header(tmp_path):
+    path = tmp_path / "api_metrics.csv"
+    writer = MetricsWriter(str(path), METRICS_HEADER, flush_rows=1)
+    writer.write(_row(1.0))
+    writer.flush()
+    writer.write(_row(2.0))
+    writer.flush()
+
+    with open(path, newline="") as file:
+        rows = list(csv.reader(file))
+    assert rows[0] == METRICS_HEADER
+    assert len(rows) == 3
+    assert not (tmp_path / "api_metrics.csv.1").exists()
@@ -0,0 +1,87 @@
+import csv
+import os
+import time
+
+import pytest
+
+from spout.shared.api_logging import METRICS_HEADER
+from spout.shared.metrics_stats import GROUP_KEYS, MetricsIndex, aggregate, read_csv_rows
+from spout.spout_cli import STATS_GROUP_KEYS
+
+
+def _row(start, duration=1.0):
+    return [start, duration, "gpt-4o", "reduce:default", 10, 5, "aaaa", "bbbb", "", "", "", "", "1"]
+
+
+def _write(path, rows, mode="w"):
+    with open(path, mode, newline="") as file:
+        writer = csv.writer(file)
+        if mode == "w":
+            writer.writerow(METRICS_HEADER)
+        writer.writerows(rows)
+
+
+@pytest.fixture
+def new_york(monkeypatch):
+    if not hasattr(time, "tzset"):
+        pytest.skip("needs time.tzset")
+    monkeypatch.setenv("TZ", "America/New_York")
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+
+def test_day_windows_start_at_local_midnight(tmp_path, new_york):
+    path = tmp_path / "api_metrics.csv"
+    # 03:30 and 04:30 UTC on the same UTC day, but on either side of local midnight
+    _write(path, [_row("2026-03-10 23:30:00"), _row("2026-03-11 00:30:00")])
+
+    results = aggregate(read_csv_rows([str(path)]), ["window"], window=86400)
+
+    assert [(entry["window"], entry["calls"]) for entry in results] == [
+        ("2026-03-10 00:00", 1), ("2026-03-11 00:00", 1)]
+
+
+def test_index_only_parses_new_rows(tmp_path):
+    path = str(tmp_path / "api_metrics.csv")
+    index = MetricsIndex(str(tmp_path / "api_metrics.sqlite"))
+    _write(path, [_row("2026-01-01 10:00:00"), _row("2026-01-01 10:01:00")])
+
+    assert index.update([path]) == 2
+    _write(path, [_row("2026-01-01 10:02:00")], mode="a")
+    assert index.update([path]) == 1
+    assert len(list(index.rows([path]))) == 3
+    index.close()
+
+
+def test_rows_appended_just_before_a_rotation_are_indexed(tmp_path):
+    path = str(tmp_path / "api_metrics.csv")
+    index = MetricsIndex(str(tmp_path / "api_metrics.sqlite"))
+    _write(path, [_row("2026-01-01 10:00:00")])
+    index.update([path])
+
+    _write(path, [_row("2026-01-01 10:01:00")], mode="a")
+    os.replace(path, f"{path}.1")
+    _write(path, [_row("2026-01-01 10:02:00")])
+    index.update([f"{path}.1", path])
+
+    assert len(list(index.rows([f"{path}.1", path]))) == 3
+    index.close()
+
+
+def test_index_rows_follow_the_selected_logs(tmp_path):
+    path = str(tmp_path / "api_metrics.csv")
+    _write(f"{path}.1", [_row("2026-01-01 09:00:00"), _row("2026-01-01 09:01:00")])
+    _write(path, [_row("2026-01-01 10:00:00")])
+    index = MetricsIndex(str(tmp_path / "api_metrics.sqlite"))
+    index.update([f"{path}.1", path])
+
+    assert len(list(index.rows([path]))) == 1
+    assert len(list(index.rows([f"{path}.1", path]))) == 3
+    assert len(list(index.rows([f"{path}.1", path], since=time.mktime((2026, 1, 1, 9, 1, 0, 0, 0, -1))))) == 2
+    index.close()
+
+
+def test_cli_offers_every_group_key():
+    assert STATS_GROUP_KEYS == GROUP_KEYS
@@ -0,0 +1,55 @@
+import asyncio
+import json
+
+from conftest import make_engine, make_function
+
+from spout.core.mutate.mutate_fanout import MutateFanout
+
+ORIGINAL = "The quick brown fox jumps over the lazy sleeping dog today"
+VARIANTS = [
+    "The quick brown fox leaps over the lazy sleeping dog today",
+    "The quick brown fox jumps over the idle sleeping dog today",
+    "The swift brown fox jumps over the lazy sleeping dog today",
+    "A quick brown fox jumps over the lazy sleeping dog today",
+]
+
+
+class _Handler:
+    async def invoke_logged(self, kernel, function, **kwargs):
+        return await kernel.invoke(function, **kwargs)
+
+
+def _fanout(temperature: float, target: int) -> MutateFanout:
+    engine = make_engine()
+    function = make_function(engine, "Mutate {{$substring}} into {{$num_variants}} variants",
+                             temperature=temperature,
+                             input_variables=[{"name": "substring"}, {"name": "num_variants"}])
+    return MutateFanout(_Handler(), engine, function, {"substring": ORIGINAL}, target, shard_size=2)
+
+
+def test_low_level_mutations_of_a_long_text_are_kept(fake_provider):
+    provider = fake_provider(default_response=json.dumps({"variants": [ORIGINAL] + VARIANTS}))
+    fanout = _fanout(temperature=0.1, target=4)
+
+    merged = asyncio.run(fanout.run())
+
+    assert merged["variants"] == VARIANTS
+    assert fanout.index.near_duplicates == 0
+    assert len(provider.prompts) == fanout.requests
+
+
+def test_shards_keep_the_configured_temperature(fake_provider, monkeypatch):
+    fake_provider(default_response=json.dumps({"variants": VARIANTS}))
+    fanout = _fanout(temperature=0.1, target=4)
+    temperatures = []
+    service = fanout.kernel.services["default"]
+    complete = service.complete
+
+    async def record(prompt, attempts=None, **kwargs):
+        temperatures.append(kwargs.get("temperature"))
+        return await complete(prompt, attempts=attempts, **kwargs)
+    monkeypatch.setattr(service, "complete", record)
+
+    asyncio.run(fanout.run())
+
+    assert temperatures and set(temperatures) == {0.1}
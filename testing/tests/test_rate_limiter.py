@@ -0,0 +1,114 @@
+import asyncio
+
+from spout.shared.rate_limiter import RateLimiter, RateLimits, TokenBucket, request_context
+
+
+def _drained_limiter() -> RateLimiter:
+    """100 requests/s, with nothing left in the bucket so every request queues"""
+    limiter = RateLimiter("test", requests_per_minute=6000)
+    limiter.requests.level = 0
+    return limiter
+
+
+async def _admission_order(limiter: RateLimiter, requests):
+    order = []
+
+    async def request(name, priority, caller):
+        with request_context(priority, caller):
+            await limiter.acquire(1)
+        order.append(name)
+
+    await asyncio.gather(*(request(*args) for args in requests))
+    return order
+
+
+def test_interactive_requests_go_ahead_of_batch_work():
+    limiter = _drained_limiter()
+    requests = [("batch 1", "batch", "job"), ("batch 2", "batch", "job"), ("batch 3", "batch", "job"),
+                ("interactive 1", "interactive", "cli"), ("interactive 2", "interactive", "cli")]
+
+    order = asyncio.run(_admission_order(limiter, requests))
+
+    assert order == ["interactive 1", "interactive 2", "batch 1", "batch 2", "batch 3"]
+    assert limiter.stats["admitted"] == {"interactive": 2, "batch": 3}
+
+
+def test_callers_of_a_priority_class_take_turns():
+    limiter = _drained_limiter()
+    requests = [(f"a{i}", "batch", "a") for i in range(1, 5)] + [(f"b{i}", "batch", "b") for i in range(1, 3)]
+
+    order = asyncio.run(_admission_order(limiter, requests))
+
+    assert order == ["a1", "b1", "a2", "b2", "a3", "a4"]
+
+
+def test_cancelled_waiters_give_up_their_place():
+    limiter = _drained_limiter()
+
+    async def run():
+        first = asyncio.ensure_future(limiter.acquire(1))
+        second = asyncio.ensure_future(limiter.acquire(1))
+        await asyncio.sleep(0)
+        first.cancel()
+        await second
+        return first
+
+    first = asyncio.run(run())
+
+    assert first.cancelled()
+    assert limiter.queue_depth == 0
+    assert sum(limiter.stats["admitted"].values()) == 1
+
+
+def test_requests_through_an_unlimited_limiter_do_not_queue():
+    limiter = RateLimiter("test")
+
+    asyncio.run(limiter.acquire(10 ** 6))
+
+    assert not limiter.limited
+    assert limiter.stats["queued"] == 0
+
+
+def test_settle_corrects_the_token_estimate():
+    limiter = RateLimiter("test", tokens_per_minute=1000)
+
+    asyncio.run(limiter.acquire(400))
+    assert round(limiter.tokens.level) == 600
+
+    limiter.settle(400, 100)
+    assert round(limiter.tokens.level) == 900
+
+    limiter.settle(400, None)  # no usage reported: keep the estimate
+    assert round(limiter.tokens.level) == 900
+
+    limiter.settle(100, 500)
+    assert round(limiter.tokens.level) == 500
+
+
+def test_bucket_refills_and_never_holds_more_than_a_minute():
+    bucket = TokenBucket(60)  # one per second
+    bucket.take(60)
+
+    assert bucket.delay(1, bucket.updated) == 1.0
+    assert bucket.delay(1, bucket.updated + 1.0) == 0.0
+    # A request bigger than the bucket waits for a full bucket, not forever
+    assert bucket.delay(600, bucket.updated) == 59.0
+
+    bucket.adjust(1000)
+    assert bucket.level == bucket.capacity
+
+
+def test_model_limits_take_precedence_over_provider_limits(tmp_path):
+    settings = tmp_path / "settings.ini"
+    settings.write_text("[RateLimits]\nopenai.RequestsPerMinute = 500\nopenai.TokensPerMinute = 200000\n"
+                        "gpt-4o.TokensPerMinute = 30000\n")
+    limits = RateLimits(settings)
+
+    gpt4o = limits.get("openai", "gpt-4o")
+    mini = limits.get("openai", "gpt-4o-mini")
+
+    assert gpt4o.tokens.capacity == 30000
+    assert gpt4o.requests.capacity == 500
+    assert mini.tokens.capacity == 200000
+    assert not limits.get("anthropic", "claude-3-5-haiku").limited
+    assert limits.get("openai", "gpt-4o") is gpt4o
@@ -0,0 +1,98 @@
+import asyncio
+
+import pytest
+from conftest import make_engine, make_function
+
+from spout.shared import response_cache
+from spout.shared.response_cache import ResponseCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = ResponseCache(str(tmp_path / "response_cache.sqlite"), max_entries=3)
+    yield cache
+    cache._conn.close()
+
+
+def _put(cache, key, content="answer"):
+    cache.put(key, "gpt-4o", content, 10, 5)
+
+
+def test_least_recently_used_entries_are_evicted_first(cache, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(response_cache.time, "time", lambda: now[0])
+    for key in ("a", "b", "c"):
+        _put(cache, key)
+        now[0] += 1
+    cache.get("a")
+    now[0] += 1
+
+    _put(cache, "d")
+
+    assert cache.get("b") is None
+    assert all(cache.get(key) for key in ("a", "c", "d"))
+
+
+def test_entries_over_the_size_limit_are_evicted(tmp_path):
+    cache = ResponseCache(str(tmp_path / "response_cache.sqlite"), max_size_mb=1 / 1024)
+    _put(cache, "a", "x" * 600)
+    _put(cache, "b", "y" * 600)
+
+    assert cache.get("a") is None
+    assert cache.get("b")["content"] == "y" * 600
+
+
+def test_expired_entries_are_not_returned(tmp_path, monkeypatch):
+    cache = ResponseCache(str(tmp_path / "response_cache.sqlite"), ttl_hours=1)
+    now = [1000.0]
+    monkeypatch.setattr(response_cache.time, "time", lambda: now[0])
+    _put(cache, "a")
+
+    now[0] += 3599
+    assert cache.get("a") == {"content": "answer", "input_tokens": 10, "output_tokens": 5}
+    now[0] += 2
+    assert cache.get("a") is None
+
+
+@pytest.mark.parametrize("config, temperature, accepted", [
+    ({}, 0, True),
+    ({}, 0.1, False),
+    ({"cache": True}, 0.7, True),
+    ({"cache": False}, 0, False),
+    ({}, "hot", False),
+])
+def test_accepts(cache, config, temperature, accepted):
+    assert cache.accepts(config, {"temperature": temperature}) == accepted
+
+
+def test_hits_skip_the_provider_and_refreshes_replace_the_entry(cache, fake_provider):
+    provider = fake_provider(default_response="answer $call")
+    function = make_function(make_engine(cache=cache), temperature=0.1, cache=True)
+
+    async def run():
+        return [await function(input="same"), await function(input="same"),
+                await function(input="same", refresh_cache=True), await function(input="same")]
+
+    miss, hit, refreshed, after_refresh = asyncio.run(run())
+
+    assert len(provider.prompts) == 2
+    assert (miss.content, miss.cache_status) == ("answer 1", "miss")
+    assert (hit.content, hit.cache_status) == ("answer 1", "hit")
+    assert (refreshed.content, refreshed.cache_status) == ("answer 2", "miss")
+    assert (after_refresh.content, after_refresh.cache_status) == ("answer 2", "hit")
+
+
+def test_disabled_cache_reads_settings_once(tmp_path, monkeypatch):
+    reads = []
+
+    class Parser(response_cache.configparser.ConfigParser):
+        def getboolean(self, *args, **kwargs):
+            reads.append(args)
+            return False
+    monkeypatch.setattr(response_cache.configparser, "ConfigParser", Parser)
+    monkeypatch.setattr(response_cache, "_RESPONSE_CACHE", None)
+    monkeypatch.setattr(response_cache, "_RESPONSE_CACHE_LOADED", False)
+
+    assert response_cache.get_response_cache() is None
+    assert response_cache.get_response_cache() is None
+    assert len(reads) == 1
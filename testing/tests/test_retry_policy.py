@@ -0,0 +1,227 @@
+import asyncio
+import csv
+import time
+from collections import deque
+
+import pytest
+
+from spout.shared import rate_limiter
+from spout.shared.api_logging import METRICS_HEADER
+from spout.shared.connector import ConnectorService
+from spout.shared.fake_provider import FakeProvider, FakeProviderError, set_fake_provider
+from spout.shared.metrics_stats import aggregate, read_csv_rows
+from spout.shared.retry_policy import HedgeDelays, RetryPolicy, is_retryable, set_retry_policy
+
+
+class _StatusError(Exception):
+    def __init__(self, status_code):
+        super().__init__(status_code)
+        self.status_code = status_code
+
+
+class RateLimitError(Exception):
+    """Named like the provider SDKs' rate-limit errors"""
+
+
+@pytest.mark.parametrize("error, retryable", [
+    (TimeoutError(), True),
+    (ConnectionResetError(), True),
+    (FakeProviderError(), True),
+    (RateLimitError(), True),
+    (_StatusError(429), True),
+    (_StatusError(503), True),
+    (_StatusError(400), False),
+    (_StatusError(401), False),
+    (ValueError(), False),
+])
+def test_retryable_errors(error, retryable):
+    assert is_retryable(error) == retryable
+
+
+def test_backoff_stays_within_the_capped_exponential_bound():
+    policy = RetryPolicy(base_delay=0.5, max_delay=4.0, seed=1)
+
+    for retry in range(1, 10):
+        bound = min(4.0, 0.5 * 2 ** (retry - 1))
+        delays = [policy.backoff(retry) for _ in range(200)]
+        assert all(0 <= delay <= bound for delay in delays)
+        # Full jitter spreads retries over the whole interval
+        assert max(delays) > bound * 0.8
+
+
+def _flaky(errors):
+    """A request that raises the given errors in turn, then answers"""
+    errors = list(errors)
+
+    async def request(timeout):
+        if errors:
+            raise errors.pop(0)
+        return "answer"
+    return request
+
+
+def test_retryable_failures_are_retried():
+    policy = RetryPolicy(max_attempts=3, base_delay=0.001)
+    attempts = []
+
+    result = asyncio.run(policy.call(_flaky([TimeoutError(), _StatusError(503)]), "m", attempts))
+
+    assert result == "answer"
+    assert [(attempt.label, attempt.error) for attempt in attempts] == [
+        ("1", "TimeoutError"), ("2", "_StatusError"), ("3", None)]
+
+
+def test_permanent_failures_are_not_retried():
+    policy = RetryPolicy(max_attempts=3, base_delay=0.001)
+    attempts = []
+
+    with pytest.raises(_StatusError):
+        asyncio.run(policy.call(_flaky([_StatusError(400)]), "m", attempts))
+
+    assert len(attempts) == 1
+
+
+def test_retries_stop_at_max_attempts_or_when_refused():
+    policy = RetryPolicy(max_attempts=2, base_delay=0.001)
+
+    with pytest.raises(TimeoutError):
+        asyncio.run(policy.call(_flaky([TimeoutError()] * 3), "m"))
+
+    attempts = []
+    with pytest.raises(TimeoutError):
+        asyncio.run(policy.call(_flaky([TimeoutError()]), "m", attempts, can_retry=lambda: False))
+    assert len(attempts) == 1
+
+
+def test_attempt_timeout_fails_a_slow_attempt():
+    policy = RetryPolicy(max_attempts=1, attempt_timeout=0.05)
+
+    async def request(timeout):
+        return await asyncio.wait_for(asyncio.sleep(5), timeout)
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(policy.call(request, "m"))
+
+
+def _hedging_policy(model: str = "m", **kwargs) -> RetryPolicy:
+    delays = HedgeDelays(min_samples=5)
+    delays._samples = {model: deque([0.05] * 5)}
+    return RetryPolicy(max_attempts=1, hedge=True, hedge_delays=delays, min_hedge_delay=0.01, **kwargs)
+
+
+def _first_call_slow():
+    calls = []
+
+    async def request(timeout):
+        calls.append(len(calls) + 1)
+        await asyncio.sleep(5 if len(calls) == 1 else 0)
+        return f"call {len(calls)}"
+    return request
+
+
+def test_slow_attempt_is_hedged_and_the_loser_cancelled():
+    policy = _hedging_policy()
+    attempts = []
+
+    started = time.perf_counter()
+    result = asyncio.run(policy.call(_first_call_slow(), "m", attempts))
+
+    assert result == "call 2"
+    assert time.perf_counter() - started < 1
+    assert [(attempt.label, attempt.error) for attempt in attempts] == [("1", "Cancelled"), ("1h", None)]
+
+
+def test_no_hedge_without_enough_samples_or_when_disabled():
+    policy = _hedging_policy()
+
+    attempts = []
+    asyncio.run(policy.call(_flaky([]), "unseen model", attempts))
+    assert [attempt.label for attempt in attempts] == ["1"]
+
+    async def request(timeout):
+        await asyncio.sleep(0.1)
+        return "streamed"
+
+    attempts = []
+    asyncio.run(policy.call(request, "m", attempts, hedge=False))
+    assert [attempt.label for attempt in attempts] == ["1"]
+
+
+def _metrics_row(start, duration, model="gpt-4o", cache="", error="", attempt="1"):
+    start = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(start))
+    return [start, duration, model, "reduce:default", 10, 5, "aaaa", "bbbb", cache, "", "", error, attempt]
+
+
+def test_hedge_delay_is_learned_from_successful_uncached_calls(tmp_path):
+    path = tmp_path / "api_metrics.csv"
+    now = time.time()
+    rows = [_metrics_row(now, 0.1 * i) for i in range(1, 21)]
+    rows += [_metrics_row(now, 9.0, error="RateLimitError"), _metrics_row(now, 9.0, cache="hit"),
+             _metrics_row(now - 30 * 86400, 9.0)]
+    with open(path, "w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(METRICS_HEADER)
+        writer.writerows(rows)
+
+    delays = HedgeDelays(percentile=0.9, min_samples=20, metrics_file=str(path))
+
+    assert asyncio.run(delays.delay("gpt-4o")) == pytest.approx(1.9)
+    assert asyncio.run(delays.delay("claude-3-5-haiku")) is None
+
+
+def test_superseded_attempts_stay_out_of_stats_totals(tmp_path):
+    path = tmp_path / "api_metrics.csv"
+    now = time.time()
+    with open(path, "w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(METRICS_HEADER)
+        writer.writerows([
+            _metrics_row(now, 30.0, error="APITimeoutError", attempt="1 failed"),
+            _metrics_row(now, 2.0, attempt="2"),
+            _metrics_row(now, 8.0, error="Cancelled", attempt="1 cancelled"),
+            _metrics_row(now, 1.0, attempt="1h"),
+        ])
+
+    [stats] = aggregate(read_csv_rows([str(path)]), ["model"])
+
+    assert stats["calls"] == 2
+    assert stats["errors"] == 0
+    assert stats["superseded"] == 2
+    assert stats["p99"] == 2.0
+
+
+class _FirstCallSlowProvider(FakeProvider):
+    async def complete(self, model, prompt, on_chunk=None, **kwargs):
+        slow = not self._calls
+        result = await super().complete(model, prompt, on_chunk=on_chunk, **kwargs)
+        if slow:
+            await asyncio.sleep(5)
+        return result
+
+
+def _limited_service() -> ConnectorService:
+    rate_limiter.RATE_LIMITS._limits["fake.tokensperminute"] = 10000
+    return ConnectorService("default", "fake", "")
+
+
+def test_failed_attempts_only_keep_their_prompt_charged():
+    set_fake_provider(FakeProvider(error_rate=1.0))
+    service = _limited_service()
+
+    with pytest.raises(FakeProviderError):
+        asyncio.run(service.complete("A short prompt", max_tokens=1000))
+
+    # Without settling, the attempt's 1000-token output reservation would stay charged
+    assert service.rate_limiter.tokens.capacity - service.rate_limiter.tokens.level < 50
+
+
+def test_cancelled_hedges_return_their_reservation():
+    set_fake_provider(_FirstCallSlowProvider())
+    set_retry_policy(_hedging_policy("fake"))
+    service = _limited_service()
+    attempts = []
+
+    asyncio.run(service.complete("A short prompt", attempts, max_tokens=1000))
+
+    assert [attempt.error for attempt in attempts] == ["Cancelled", None]
+    assert service.rate_limiter.tokens.capacity - service.rate_limiter.tokens.level < 50
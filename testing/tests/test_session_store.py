@@ -0,0 +1,99 @@
+import io
+import threading
+
+import pytest
+
+from spout.core.converse.session_store import SessionStore, parse_turns
+from spout.shared import token_counter
+
+
+@pytest.fixture(autouse=True)
+def approximate_tokens(monkeypatch):
+    """Count tokens without loading a tokenizer, which may need a download"""
+    monkeypatch.setattr(token_counter, "_SETTINGS", {"model": "gpt-3.5-turbo", "approximate": True})
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = SessionStore(str(tmp_path / "sessions.sqlite"))
+    yield store
+    store.close()
+
+
+def _conversation(count):
+    return [("USER" if i % 2 == 0 else "ASSISTANT", f"turn {i}") for i in range(count)]
+
+
+def test_appends_add_up_in_the_session_totals(store):
+    store.append("chat", [("USER", "hello there"), ("ASSISTANT", "hi")])
+    first = store.totals("chat")
+    store.append("chat", [("USER", "how are you")])
+    second = store.totals("chat")
+
+    assert first["turns"] == 2 and second["turns"] == 3
+    assert second["tokens"] > first["tokens"] > 0
+    assert second["created"] == first["created"]
+    assert second["updated"] >= first["updated"]
+    assert [entry["session"] for entry in store.sessions()] == ["chat"]
+    assert store.totals("other") == {"turns": 0, "tokens": 0, "created": None, "updated": None}
+
+
+def test_recent_pages_through_long_sessions(store):
+    store.append("chat", _conversation(120))
+    store.append("other", _conversation(5))
+
+    turns, truncated = store.recent("chat")
+    assert turns == _conversation(120) and not truncated
+
+    turns, truncated = store.recent("chat", limit=75)
+    assert turns == _conversation(120)[45:] and truncated
+
+
+def test_recent_stops_at_the_token_budget(store):
+    store.append("chat", _conversation(120))
+    per_turn = store.totals("chat")["tokens"] // 120
+
+    turns, truncated = store.recent("chat", token_budget=per_turn * 60)
+
+    assert truncated
+    assert 0 < len(turns) <= 60
+    assert turns == _conversation(120)[-len(turns):]
+
+
+def test_text_export_round_trips(store):
+    text = "Primer line\n<USER> first question\n<ASSISTANT> an answer\nover two lines\n"
+    assert store.import_text("chat", text) == 3
+
+    exported = io.StringIO()
+    assert store.export_text("chat", exported) == 3
+    assert parse_turns(exported.getvalue()) == parse_turns(text)
+
+
+def test_connections_share_the_store_through_wal(tmp_path):
+    path = str(tmp_path / "sessions.sqlite")
+    stores = [SessionStore(path) for _ in range(4)]
+    errors = []
+
+    def write(store, name):
+        try:
+            for i in range(25):
+                store.append(name, [("USER", f"question {i}"), ("ASSISTANT", f"answer {i}")])
+                store.recent("shared", limit=10)
+                store.append("shared", [("USER", f"{name} {i}")])
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=write, args=(store, f"writer-{n}")) for n, store in enumerate(stores)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert stores[0]._conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    for n in range(4):
+        turns, _ = stores[0].recent(f"writer-{n}")
+        assert turns == [turn for i in range(25) for turn in (("USER", f"question {i}"), ("ASSISTANT", f"answer {i}"))]
+    assert stores[1].totals("shared")["turns"] == 100
+    for store in stores:
+        store.close()
@@ -0,0 +1,120 @@
+import io
+import os
+import threading
+
+import pytest
+
+from spout.shared import spout_server
+from spout.shared.spout_server import SpoutServer, _TerminalInput, _WorkingDirectory, forward_to_server
+
+
+class _Terminal(io.StringIO):
+    def isatty(self):
+        return True
+
+
+def test_piped_stdin_runs_in_process(monkeypatch):
+    monkeypatch.delenv("SPOUT_NO_SERVER", raising=False)
+    monkeypatch.setattr("sys.stdin", io.StringIO("line\n"))
+    monkeypatch.setattr(spout_server, "_connect", pytest.fail)
+
+    assert forward_to_server(["batch"]) is None
+
+
+def test_unreachable_server_runs_in_process(monkeypatch, tmp_path):
+    monkeypatch.delenv("SPOUT_NO_SERVER", raising=False)
+    monkeypatch.setattr("sys.stdin", _Terminal())
+
+    assert forward_to_server(["reduce", "text"], {"socket": str(tmp_path / "missing.sock")}) is None
+
+
+def test_same_directory_is_served(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    request = {"argv": ["iterate", "-f", "names.txt"], "cwd": str(tmp_path), "env": spout_server._spout_environment()}
+
+    assert SpoutServer._local_only(request) is None
+
+
+def test_commands_from_another_directory_are_served(monkeypatch, tmp_path):
+    client = tmp_path / "client"
+    client.mkdir()
+    monkeypatch.chdir(tmp_path)
+    request = {"argv": ["iterate", "-f", "names.txt"], "cwd": str(client), "env": spout_server._spout_environment()}
+
+    assert SpoutServer._local_only(request) is None
+
+
+def test_missing_working_directory_runs_in_process(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    request = {"argv": ["reduce", "text"], "cwd": str(tmp_path / "gone"), "env": spout_server._spout_environment()}
+
+    assert SpoutServer._local_only(request)
+
+
+class _DirectoryCLI:
+    """Stands in for the click group, recording the directory each command ran in"""
+
+    def __init__(self):
+        self.directories = []
+
+    def main(self, args, prog_name, standalone_mode, obj):
+        self.directories.append(os.getcwd())
+        return 0
+
+
+def test_commands_run_in_the_client_directory(monkeypatch, tmp_path):
+    client = tmp_path / "client"
+    client.mkdir()
+    monkeypatch.chdir(tmp_path)
+    cli = _DirectoryCLI()
+    server = SpoutServer(cli, address={"socket": str(tmp_path / "spout.sock")}, workers=1)
+
+    assert server._run_command({"argv": ["batch", "jobs.jsonl"], "cwd": str(client)}, lambda message: None) == 0
+    assert cli.directories == [str(client)]
+    server.executor.shutdown()
+
+
+def test_commands_from_other_directories_take_turns(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    first, second = tmp_path / "first", tmp_path / "second"
+    first.mkdir()
+    second.mkdir()
+    working_directory = _WorkingDirectory()
+    entered = threading.Event()
+    release = threading.Event()
+    seen = []
+
+    def hold_first():
+        with working_directory.use(str(first)):
+            entered.set()
+            release.wait(5)
+            seen.append(os.getcwd())
+
+    def run_second():
+        with working_directory.use(str(second)):
+            seen.append(os.getcwd())
+
+    holder = threading.Thread(target=hold_first)
+    holder.start()
+    entered.wait(5)
+    waiter = threading.Thread(target=run_second)
+    waiter.start()
+    waiter.join(0.1)
+    assert waiter.is_alive() and seen == []
+
+    release.set()
+    holder.join(5)
+    waiter.join(5)
+    assert seen == [str(first), str(second)]
+
+
+def test_other_spout_environment_runs_in_process(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    request = {"argv": ["reduce", "text"], "cwd": str(tmp_path), "env": {"SPOUT_TEST_SETTING": "1"}}
+
+    assert SpoutServer._local_only(request)
+
+
+def test_forwarded_command_cannot_read_the_terminal():
+    with pytest.raises(OSError):
+        _TerminalInput().readline()
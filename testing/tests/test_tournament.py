@@ -0,0 +1,99 @@
+import asyncio
+import json
+import re
+
+import pytest
+from conftest import CountingFakeProvider, make_engine, make_function
+
+from spout.core.evaluate.tournament import EvaluateTournament, shard
+from spout.shared.fake_provider import set_fake_provider
+from spout.shared.response_cache import ResponseCache
+
+
+class JudgeProvider(CountingFakeProvider):
+    """Scores each --label-- input by the number in its text"""
+
+    def render(self, model, prompt, call=1):
+        rankings = [{"Name": name, "Score": int(score), "Explanation": f"scored {score}"}
+                    for name, score in re.findall(r"--(\w+)-- value (\d+)", prompt)]
+        return json.dumps({"Rankings": rankings})
+
+
+def _candidates(count):
+    return [f"--c{i}-- value {i}" for i in range(count)]
+
+
+@pytest.fixture
+def judge():
+    provider = JudgeProvider()
+    set_fake_provider(provider)
+    return provider
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = ResponseCache(str(tmp_path / "response_cache.sqlite"))
+    yield cache
+    cache._conn.close()
+
+
+class _Handler:
+    async def invoke_logged(self, kernel, function, **kwargs):
+        return await kernel.invoke(function, **kwargs)
+
+
+def _tournament(merge="bracket", cache=None, config=None) -> EvaluateTournament:
+    engine = make_engine()
+    function = make_function(engine, "Rank by {{$JudgingCriteria}}: {{$CombinedInputs}}", temperature=0.1,
+                             input_variables=[{"name": "CombinedInputs"}, {"name": "JudgingCriteria"}],
+                             **(config or {}))
+    settings = {"Separator": "@@", "JudgingCriteria": "value", "Explanation": "True"}
+    return EvaluateTournament(_Handler(), engine, function, settings, group_size=4, merge=merge, cache=cache)
+
+
+def test_shards_stay_put_when_a_candidate_is_added():
+    candidates = _candidates(40)
+
+    before = [{candidates[i] for i in group} for group in shard(candidates, 8)]
+    after = [{(candidates + ["--new-- value 99"])[i] for i in group}
+             for group in shard(candidates + ["--new-- value 99"], 8)]
+
+    assert all(len(group) <= 8 for group in after)
+    assert sum(group in before for group in after) >= len(before) - 2
+
+
+@pytest.mark.parametrize("merge", ["bracket", "normalize"])
+def test_the_best_candidate_wins(judge, merge):
+    rankings = asyncio.run(_tournament(merge).run(_candidates(16)))["Rankings"]
+
+    assert [entry["Rank"] for entry in rankings] == list(range(1, 17))
+    assert sorted(entry["Name"] for entry in rankings) == sorted(f"c{i}" for i in range(16))
+    assert rankings[0]["Explanation"].startswith("scored")
+    if merge == "bracket":
+        assert rankings[0] == {"Rank": 1, "Name": "c15", "Score": 15, "Explanation": "scored 15"}
+
+
+def test_unchanged_groups_come_from_the_cache(judge, cache):
+    # As the shipped evaluate spoutlets are marked
+    first = _tournament(cache=cache, config={"cache": True})
+    asyncio.run(first.run(_candidates(12)))
+    calls = len(judge.prompts)
+
+    again = _tournament(cache=cache, config={"cache": True})
+    asyncio.run(again.run(_candidates(12)))
+
+    assert len(judge.prompts) == calls
+    assert again.groups_cached == first.groups_judged
+    stored = cache._conn.execute("SELECT input_tokens, output_tokens FROM responses").fetchall()
+    assert stored and all(input_tokens and output_tokens for input_tokens, output_tokens in stored)
+
+
+def test_spoutlets_that_opt_out_of_the_cache_are_judged_again(judge, cache):
+    asyncio.run(_tournament(cache=cache, config={"cache": False}).run(_candidates(12)))
+    calls = len(judge.prompts)
+
+    again = _tournament(cache=cache, config={"cache": False})
+    asyncio.run(again.run(_candidates(12)))
+
+    assert again.groups_cached == 0
+    assert len(judge.prompts) == 2 * calls